@@ -0,0 +1,228 @@
+import asyncio
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from records import RestError
+from rest import Rest
+
+
+class AsyncRest:
+    """
+    An asyncio twin of the Rest client with the same endpoints and return shapes.
+
+    Every call is dispatched to a small thread pool that shares the pooled
+    keep-alive session of the wrapped Rest client, so awaiting a request never
+    blocks the event loop.
+
+    Attributes
+    ----------
+    rest : Rest
+        The synchronous client doing the actual HTTP work.
+    executor : ThreadPoolExecutor
+        The worker threads the blocking calls run on.
+    """
+
+    def __init__(self, rest=None, max_workers=8, **rest_kwargs):
+        """
+        Initializes the async client.
+
+        Parameters
+        ----------
+        rest : Rest, optional
+            An existing client to wrap. A new one is created from rest_kwargs otherwise.
+        max_workers : int, optional
+            The number of requests that may be in flight at once. Defaults to 8.
+        **rest_kwargs
+            Keyword arguments passed to Rest when rest is not given.
+        """
+        self.rest = rest if rest is not None else Rest(**rest_kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-rest')
+
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def _gather(self, lookup, keys):
+        unique_keys = list(dict.fromkeys(keys))
+        results = await asyncio.gather(*(lookup(key) for key in unique_keys), return_exceptions=True)
+        return {
+            key: RestError(f"Error - lookup of {key!r}: {result}") if isinstance(result, Exception) else result
+            for key, result in zip(unique_keys, results)
+        }
+
+    def close(self):
+        """Shuts down the worker threads and closes the wrapped client."""
+        self.executor.shutdown(wait=False)
+        self.rest.close()
+
+    async def search_for_item_by_name(self, item_name):
+        """Async version of Rest.search_for_item_by_name."""
+        return await self._call(self.rest.search_for_item_by_name, item_name)
+
+    async def find_item_by_id(self, item_id):
+        """Async version of Rest.find_item_by_id."""
+        return await self._call(self.rest.find_item_by_id, item_id)
+
+    async def insert_new_item(self, new_item):
+        """Async version of Rest.insert_new_item."""
+        return await self._call(self.rest.insert_new_item, new_item)
+
+    async def update_item(self, updated_item):
+        """Async version of Rest.update_item."""
+        return await self._call(self.rest.update_item, updated_item)
+
+    async def search_for_box_with_rfid(self, box_rfid):
+        """Async version of Rest.search_for_box_with_rfid."""
+        return await self._call(self.rest.search_for_box_with_rfid, box_rfid)
+
+    async def find_box_by_id(self, box_id):
+        """Async version of Rest.find_box_by_id."""
+        return await self._call(self.rest.find_box_by_id, box_id)
+
+    async def insert_new_box(self, new_box):
+        """Async version of Rest.insert_new_box."""
+        return await self._call(self.rest.insert_new_box, new_box)
+
+    async def update_box(self, updated_box):
+        """Async version of Rest.update_box."""
+        return await self._call(self.rest.update_box, updated_box)
+
+    async def find_items_by_ids(self, item_ids):
+        """Async fan-out version of Rest.find_items_by_ids."""
+        return await self._gather(self.find_item_by_id, item_ids)
+
+    async def find_boxes_by_ids(self, box_ids):
+        """Async fan-out version of Rest.find_boxes_by_ids."""
+        return await self._gather(self.find_box_by_id, box_ids)
+
+    async def search_boxes_by_rfids(self, box_rfids):
+        """Async fan-out version of Rest.search_boxes_by_rfids."""
+        return await self._gather(self.search_for_box_with_rfid, box_rfids)
+
+    async def update_boxes(self, updated_boxes):
+        """Async fan-out version of Rest.update_boxes."""
+        latest = {str(box['box_id']): box for box in updated_boxes}
+        return await self._gather(lambda box_id: self.update_box(latest[box_id]), latest)
+
+    async def get_location_by_id(self, location_id):
+        """Async version of Rest.get_location_by_id."""
+        return await self._call(self.rest.get_location_by_id, location_id)
+
+    async def search_for_location_by_id(self, location_id):
+        """Async version of Rest.search_for_location_by_id."""
+        return await self._call(self.rest.search_for_location_by_id, location_id)
+
+    async def upload_picture(self, item_id, image_path, picture_name=None):
+        """Async version of Rest.upload_picture."""
+        return await self._call(self.rest.upload_picture, item_id, image_path, picture_name)
+
+    async def upload_datasheet(self, item_id, datasheet_path, datasheet_name=None):
+        """Async version of Rest.upload_datasheet."""
+        return await self._call(self.rest.upload_datasheet, item_id, datasheet_path, datasheet_name)
+
+    async def upload_trainings_picture(self, item_id, segmented_images_path):
+        """Async version of Rest.upload_trainings_picture."""
+        return await self._call(self.rest.upload_trainings_picture, item_id, segmented_images_path)
+
+    async def upload_preprocessed_trainings_pictures(self, item_id, image_paths, preprocessor=None):
+        """Async version of Rest.upload_preprocessed_trainings_pictures."""
+        return await self._call(self.rest.upload_preprocessed_trainings_pictures, item_id, image_paths, preprocessor)
+
+
+class TkAsyncBridge:
+    """
+    Runs an asyncio loop on a background thread next to root.mainloop().
+
+    Coroutines are submitted from the Tk thread, and their results are handed
+    back to the Tk thread by a short root.after poll, because Tk widgets must
+    only be touched from the thread running the mainloop.
+
+    Attributes
+    ----------
+    root : tkinter.Misc
+        The Tk root whose mainloop receives the results.
+    loop : asyncio.AbstractEventLoop
+        The event loop running on the background thread.
+    """
+
+    POLL_INTERVAL_MS = 16  # one frame at 60 fps
+
+    def __init__(self, root):
+        """
+        Starts the background event loop.
+
+        Parameters
+        ----------
+        root : tkinter.Misc
+            The Tk root whose mainloop receives the results.
+        """
+        self.root = root
+        self.loop = asyncio.new_event_loop()
+        self._results = queue.SimpleQueue()
+        self._poll_job = None
+        self._thread = threading.Thread(target=self._run_loop, name='tk-async-bridge', daemon=True)
+        self._thread.start()
+        self._poll()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro, callback=None, errback=None):
+        """
+        Schedules a coroutine on the background loop.
+
+        Parameters
+        ----------
+        coro : coroutine
+            The coroutine to run.
+        callback : callable, optional
+            Called on the Tk thread with the coroutine's result.
+        errback : callable, optional
+            Called on the Tk thread with the exception if the coroutine raised.
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The future of the scheduled coroutine.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        future.add_done_callback(lambda done: self._results.put((done, callback, errback)))
+        return future
+
+    def _poll(self):
+        """
+        Delivers finished results on the Tk thread.
+
+        A callback that raises is reported through root.report_callback_exception,
+        like any Tk callback, and does not stop the delivery of later results.
+        """
+        try:
+            while True:
+                try:
+                    future, callback, errback = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                if future.cancelled():
+                    continue
+                try:
+                    error = future.exception()
+                    if error is not None:
+                        if errback is not None:
+                            errback(error)
+                    elif callback is not None:
+                        callback(future.result())
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def close(self):
+        """Stops polling and shuts down the background loop."""
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=1)
@@ -0,0 +1,359 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mock_server import FaultConfig, MockInventoryServer
+from rest import Rest
+
+# Results where a higher value is better; for every other number lower is better.
+HIGHER_IS_BETTER = ('per_s', 'mb_per_s', 'success_rate')
+# Results that describe the run rather than its performance, or that a single slow sample decides.
+NOT_COMPARED = ('count', 'injected_errors', 'throttled', 'max_ms', 'p99_ms')
+# Options that change how a report is written or compared, but not its results.
+REPORT_OPTIONS = ('output', 'compare', 'tolerance', 'noise_floor_ms')
+
+
+def percentile(ordered, fraction):
+    """Return the sample at fraction (0..1) of a sorted list."""
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def latency_summary(samples):
+    """Return count, mean, p50, p99 and max of latencies in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        'p50_ms': percentile(ordered, 0.50) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'max_ms': ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def timed_calls(call, args, concurrency):
+    """Run call(arg) for every arg on concurrency threads; return wall time, latencies and results."""
+    def run(arg):
+        start = time.perf_counter()
+        result = call(arg)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(run, args))
+    return time.perf_counter() - start, [seconds for seconds, _ in outcomes], [result for _, result in outcomes]
+
+
+def bench_lookups(server, requests, concurrency):
+    """Uncached and cached lookup throughput and latency."""
+    results = {}
+    item_ids = [str(1 + i % len(server.items)) for i in range(requests)]
+    rfids = [box['box_rfid'] for box in server.boxes.values()]
+    with Rest(server=server.url, pool_size=concurrency, cache_ttl=0) as rest:  # every lookup misses the cache
+        scenarios = {
+            'find_item_by_id': (rest.find_item_by_id, item_ids),
+            'search_for_box_with_rfid': (rest.search_for_box_with_rfid,
+                                         [rfids[i % len(rfids)] for i in range(requests)]),
+            'get_location_by_id': (rest.get_location_by_id,
+                                   [str(1 + i % len(server.locations)) for i in range(requests)]),
+        }
+        for name, (call, args) in scenarios.items():
+            wall, latencies, outcomes = timed_calls(call, args, concurrency)
+            results[name] = {'per_s': len(args) / wall, 'errors': sum(isinstance(r, str) for r in outcomes),
+                             **latency_summary(latencies)}
+    with Rest(server=server.url, pool_size=concurrency, cache_size=len(item_ids)) as rest:
+        timed_calls(rest.find_item_by_id, item_ids, concurrency)  # warm the cache
+        wall, latencies, _ = timed_calls(rest.find_item_by_id, item_ids, concurrency)
+        results['find_item_by_id_cached'] = {'per_s': len(item_ids) / wall, **latency_summary(latencies)}
+    return results
+
+
+def bench_faults(server, requests, concurrency, latency, error_rate, rate_limit):
+    """Lookups against injected latency, errors and throttling, with the client's retries."""
+    server.faults = FaultConfig(latency=latency, jitter=latency, error_rate=error_rate, rate_limit=rate_limit,
+                                burst=concurrency)
+    try:
+        with Rest(server=server.url, pool_size=concurrency, backoff_factor=0.01, cache_ttl=0) as rest:
+            item_ids = [str(1 + i % len(server.items)) for i in range(requests)]
+            stats_before = dict(server.stats)
+            wall, latencies, outcomes = timed_calls(rest.find_item_by_id, item_ids, concurrency)
+        failures = sum(isinstance(r, str) for r in outcomes)
+        return {
+            'per_s': len(item_ids) / wall,
+            'success_rate': 1 - failures / len(item_ids),
+            'injected_errors': server.stats['errors'] - stats_before['errors'],
+            'throttled': server.stats['throttled'] - stats_before['throttled'],
+            **latency_summary(latencies),
+        }
+    finally:
+        server.faults = FaultConfig()
+
+
+def bench_uploads(server, workdir, size_mb, repeats):
+    """Upload throughput of upload_file and upload_stream."""
+    path = os.path.join(workdir, 'upload.bin')
+    with open(path, 'wb') as file:
+        file.write(os.urandom(int(size_mb * 1024 * 1024)))
+    chunk = 64 * 1024
+    results = {}
+    with Rest(server=server.url) as rest:
+        for name, upload in (
+                ('upload_file', lambda: rest.upload_file(1, path, '/item/{}/uploadPicture')),
+                ('upload_stream', lambda: rest.upload_stream(1, _read_chunks(path, chunk), 'upload.bin',
+                                                             '/item/{}/uploadDatasheet'))):
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = upload()
+                samples.append(time.perf_counter() - start)
+                if isinstance(result, str):
+                    raise RuntimeError(result)
+            results[name] = {'mb_per_s': size_mb / (sum(samples) / len(samples)), **latency_summary(samples)}
+    return results
+
+
+def _read_chunks(path, chunk_size):
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def bench_zip(workdir, files, file_kb):
+    """zipdir build time, serial and parallel, on a mix of compressible and incompressible files."""
+    source = os.path.join(workdir, 'zip_source', 'segmented')
+    os.makedirs(source)
+    for index in range(files):
+        if index % 2:
+            data = os.urandom(file_kb * 1024)  # like PNG or JPEG content
+            name = f'{index:04d}.bin'
+        else:
+            data = (b'inventory station benchmark %d\n' % index) * (file_kb * 1024 // 32)
+            name = f'{index:04d}.txt'
+        with open(os.path.join(source, name), 'wb') as file:
+            file.write(data)
+    megabytes = files * file_kb / 1024
+    rest = Rest(server='http://127.0.0.1:9')  # zipdir does not touch the network
+    results = {}
+    for mode in ('serial', 'parallel'):
+        start = time.perf_counter()
+        rest.zipdir(source, f'{mode}.zip', output_dir=workdir, parallel=mode == 'parallel')
+        seconds = time.perf_counter() - start
+        results[mode] = {'seconds': seconds, 'mb_per_s': megabytes / seconds,
+                         'zip_bytes': os.path.getsize(os.path.join(workdir, f'{mode}.zip'))}
+    rest.close()
+    return results
+
+
+def bench_gui(transitions):
+    """Screen build and transition times of InventoryApp; skipped without a display."""
+    try:
+        import tkinter
+        import customtkinter as ctk
+    except ImportError as e:
+        return {'skipped': str(e)}
+    try:
+        root = ctk.CTk()
+    except tkinter.TclError as e:
+        return {'skipped': str(e)}
+    from main import InventoryApp
+
+    try:
+        app = InventoryApp(root)
+        start = time.perf_counter()
+        app.screens.prebuild()
+        build = time.perf_counter() - start
+        names = list(app.screens._builders)
+        for index in range(transitions):
+            app.screens.show(names[index % len(names)])
+            root.update_idletasks()
+        samples = [seconds for timings in app.screens._timings.values() for seconds in timings]
+        return {'prebuild_seconds': build, 'transition': latency_summary(samples),
+                'screens': app.screens.transition_stats()}
+    finally:
+        root.destroy()
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def flatten(results, prefix=''):
+    """Flatten nested results into {'a.b.c': number}."""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{name}.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def best_of(runs):
+    """Merge the results of several runs, keeping the best value of every result."""
+    best = {}
+    for key, value in runs[0].items():
+        values = [run[key] for run in runs if key in run]
+        if isinstance(value, dict):
+            best[key] = best_of(values)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and not key.endswith(NOT_COMPARED):
+            best[key] = max(values) if key.endswith(HIGHER_IS_BETTER) else min(values)
+        else:
+            best[key] = value
+    return best
+
+
+def spread(runs):
+    """Return the relative spread (worst - best) / best of every flattened result over several runs."""
+    flat = [flatten(run) for run in runs]
+    spreads = {}
+    for name in flat[0]:
+        values = [run[name] for run in flat if name in run]
+        if min(values) > 0 and not name.endswith(NOT_COMPARED):
+            spreads[name] = (max(values) - min(values)) / min(values)
+    return spreads
+
+
+def milliseconds(name, value):
+    """Return a timing result in milliseconds, per operation for rates; None for other results."""
+    if name.endswith('_ms'):
+        return value
+    if name.endswith('seconds'):
+        return value * 1000
+    if name.endswith('per_s'):
+        return 1000 / value if value else None
+    return None
+
+
+def comparable_parameters(report):
+    return {key: value for key, value in report.get('parameters', {}).items() if key not in REPORT_OPTIONS}
+
+
+def compare(baseline, current, tolerance, noise_floor_ms=0.1):
+    """
+    Compare two benchmark reports.
+
+    A result only regresses if it got worse by more than tolerance plus
+    the spread its rounds showed in either report, so results that vary a
+    lot from round to round need a larger change. Timings that changed by
+    less than noise_floor_ms are never regressions, however large the
+    relative change: a cached lookup taking 10 instead of 5 microseconds is
+    noise.
+
+    Returns
+    -------
+    list of dict
+        One entry per shared result with the relative change; regression is
+        True where the result got worse by more than tolerance.
+
+    Raises
+    ------
+    ValueError
+        If the reports were run with different parameters.
+    """
+    before_parameters, after_parameters = comparable_parameters(baseline), comparable_parameters(current)
+    if before_parameters != after_parameters:
+        differing = sorted(key for key in before_parameters.keys() | after_parameters.keys()
+                           if before_parameters.get(key) != after_parameters.get(key))
+        raise ValueError(f"Error - The reports were run with different parameters: {', '.join(differing)}")
+    before, after = flatten(baseline['results']), flatten(current['results'])
+    before_spread, after_spread = baseline.get('spread', {}), current.get('spread', {})
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        if not before[name] or name.endswith(NOT_COMPARED):
+            continue
+        change = (after[name] - before[name]) / abs(before[name])
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        before_ms, after_ms = milliseconds(name, before[name]), milliseconds(name, after[name])
+        noise = before_ms is not None and after_ms is not None and abs(after_ms - before_ms) < noise_floor_ms
+        allowed = tolerance + max(before_spread.get(name, 0.0), after_spread.get(name, 0.0))
+        rows.append({'name': name, 'baseline': before[name], 'current': after[name], 'change': change,
+                     'regression': worse > allowed and not noise})
+    return rows
+
+
+def run(args):
+    rounds = []
+    with tempfile.TemporaryDirectory() as workdir, \
+            MockInventoryServer(items=args.items, boxes=args.items, locations=50) as server:
+        for round_number in range(args.rounds):
+            results = {}
+            if 'lookups' in args.only:
+                results['lookups'] = bench_lookups(server, args.requests, args.concurrency)
+            if 'faults' in args.only:
+                results['faults'] = bench_faults(server, args.requests, args.concurrency, args.fault_latency,
+                                                 args.fault_error_rate, args.fault_rate_limit)
+            if 'uploads' in args.only:
+                results['uploads'] = bench_uploads(server, workdir, args.upload_mb, args.repeats)
+            if 'zip' in args.only:
+                results['zip'] = bench_zip(os.path.join(workdir, f'round{round_number}'), args.zip_files,
+                                           args.zip_file_kb)
+            if 'gui' in args.only:
+                results['gui'] = bench_gui(args.transitions)
+            rounds.append(results)
+    return {
+        'format': 1,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in REPORT_OPTIONS},
+        'results': best_of(rounds),
+        'spread': spread(rounds),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the Rest client and GUI against a local mock server")
+    parser.add_argument('--only', nargs='+', default=['lookups', 'faults', 'uploads', 'zip', 'gui'],
+                        choices=['lookups', 'faults', 'uploads', 'zip', 'gui'], help="Benchmarks to run")
+    parser.add_argument('--requests', type=int, default=2000, help="Lookups per scenario")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent lookups")
+    parser.add_argument('--items', type=int, default=5000, help="Items and boxes served by the mock server")
+    parser.add_argument('--fault-latency', type=float, default=0.005, help="Injected latency in seconds")
+    parser.add_argument('--fault-error-rate', type=float, default=0.05, help="Fraction of injected 503 errors")
+    parser.add_argument('--fault-rate-limit', type=float, default=500, help="Requests per second before 429s")
+    parser.add_argument('--upload-mb', type=float, default=8, help="Size of the uploaded file")
+    parser.add_argument('--repeats', type=int, default=5, help="Uploads per method")
+    parser.add_argument('--zip-files', type=int, default=200, help="Files in the zip benchmark")
+    parser.add_argument('--zip-file-kb', type=int, default=256, help="Size of each zipped file")
+    parser.add_argument('--transitions', type=int, default=200, help="Screen transitions in the GUI benchmark")
+    parser.add_argument('--rounds', type=int, default=3, help="Runs of every benchmark; the best result counts")
+    parser.add_argument('--output', metavar='FILE', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--compare', metavar='BASELINE', help="Compare with an earlier JSON report")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Relative change that counts as a regression")
+    parser.add_argument('--noise-floor-ms', type=float, default=0.1,
+                        help="Timing changes below this many milliseconds are never regressions")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    report = run(args)
+    if baseline is not None:
+        try:
+            report['comparison'] = compare(baseline, report, args.tolerance, args.noise_floor_ms)
+        except ValueError as e:
+            sys.exit(str(e))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    if args.compare and any(row['regression'] for row in report['comparison']):
+        sys.exit(1)
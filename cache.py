@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries also expire after a fixed time.
+
+    Attributes
+    ----------
+    maxsize : int
+        The maximum number of entries kept.
+    ttl : float
+        The number of seconds an entry stays valid.
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups that found no valid entry.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=256, ttl=300, clock=time.monotonic):
+        """
+        Initializes an empty cache.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            The maximum number of entries kept. Defaults to 256.
+        ttl : float, optional
+            The number of seconds an entry stays valid. Defaults to 300.
+        clock : callable, optional
+            The time source, replaceable for testing. Defaults to time.monotonic.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key, or default if it is missing or expired.
+
+        Parameters
+        ----------
+        key : hashable
+            The cache key.
+        default : object, optional
+            The value returned on a miss. Defaults to None.
+
+        Returns
+        -------
+        object
+            The cached value or default.
+        """
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is not self._MISSING:
+                expires, value = entry
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """
+        Stores value under key, evicting the least recently used entry if full.
+
+        Parameters
+        ----------
+        key : hashable
+            The cache key.
+        value : object
+            The value to store.
+        """
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """
+        Removes entries from the cache.
+
+        Parameters
+        ----------
+        predicate : callable, optional
+            Called with each key; matching entries are removed. Removes all
+            entries when omitted.
+
+        Returns
+        -------
+        int
+            The number of removed entries.
+        """
+        with self._lock:
+            if predicate is None:
+                removed = len(self._data)
+                self._data.clear()
+                return removed
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def stats(self):
+        """
+        Returns the cache counters.
+
+        Returns
+        -------
+        dict
+            The hits, misses, hit rate and current size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._data),
+            }
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,299 @@
+import multiprocessing
+import os
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# Quality of one captured frame; brightness and clipped are fractions of 0..1.
+FrameQuality = namedtuple('FrameQuality', 'index sharpness brightness clipped ok path')
+
+
+class V4L2Source:
+    """
+    Grabs RGB frames from a V4L2 camera. Requires OpenCV, imported only when the source is opened.
+    """
+
+    def __init__(self, device=0, width=None, height=None):
+        """
+        Parameters
+        ----------
+        device : int or str
+            The camera index or device path, e.g. '/dev/video0'.
+        width, height : int, optional
+            The requested frame size; the camera default is used when omitted.
+        """
+        self.device = device
+        self.width = width
+        self.height = height
+        self._capture = None
+
+    def open(self):
+        import cv2  # OpenCV is only needed when a real camera is attached
+
+        self._capture = cv2.VideoCapture(self.device, cv2.CAP_V4L2)
+        if not self._capture.isOpened():
+            raise OSError(f"Camera {self.device} could not be opened.")
+        if self.width:
+            self._capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self._capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+    def read(self):
+        """Return the next frame as an (height, width, 3) uint8 RGB array."""
+        ok, frame = self._capture.read()
+        if not ok:
+            raise OSError(f"Camera {self.device} did not deliver a frame.")
+        return frame[:, :, ::-1]  # OpenCV delivers BGR
+
+    def close(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+
+class DirectorySource:
+    """
+    Serves the images of a directory as frames, in name order and in a loop; meant for tests.
+
+    Requires Pillow, imported only when the source is opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._files = []
+        self._next = 0
+
+    def open(self):
+        self._files = sorted(os.path.join(self.path, name) for name in os.listdir(self.path)
+                             if name.lower().endswith(IMAGE_EXTENSIONS))
+        if not self._files:
+            raise OSError(f"No images found in {self.path}.")
+        self._next = 0
+
+    def read(self):
+        """Return the next image as an (height, width, 3) uint8 RGB array."""
+        from PIL import Image
+
+        file_path = self._files[self._next % len(self._files)]
+        self._next += 1
+        with Image.open(file_path) as image:
+            return np.asarray(image.convert('RGB'))
+
+    def close(self):
+        pass
+
+
+def frame_quality(frame):
+    """
+    Measure the sharpness and exposure of an RGB frame.
+
+    Returns
+    -------
+    tuple
+        (sharpness, brightness, clipped): the variance of the Laplacian of the
+        luminance, the mean luminance (0..1) and the fraction of pixels that
+        are nearly black or white.
+    """
+    gray = frame[..., 0] * np.float32(0.299) + frame[..., 1] * np.float32(0.587) + frame[..., 2] * np.float32(0.114)
+    laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]) - 4 * gray[1:-1, 1:-1]
+    clipped = np.count_nonzero((gray < 5) | (gray > 250)) / gray.size
+    return float(laplacian.var()), float(gray.mean() / 255), float(clipped)
+
+
+def evaluation_pool(workers=None):
+    """
+    Create the process pool that evaluates the frames of every CapturePipeline of a station.
+
+    The workers are spawned rather than forked, so the pool can be created
+    from the threaded GUI process; they start on the first evaluation.
+    """
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+# Ring buffer views of an evaluation worker process by shared memory name; only the current capture's is kept.
+_worker_rings = {}
+
+
+def _attach_ring(name, shape, dtype):
+    """Return the ring buffer called name inside a worker process, attaching it on first use."""
+    if name not in _worker_rings:
+        for old_name in list(_worker_rings):
+            _worker_rings.pop(old_name)[0].close()  # the ring of an earlier capture
+        memory = shared_memory.SharedMemory(name=name)
+        _worker_rings[name] = (memory, np.ndarray(shape, dtype=dtype, buffer=memory.buf))
+    return _worker_rings[name][1]
+
+
+def _evaluate_slot(ring, slot, index, thresholds, output_dir):
+    """Evaluate the frame in one ring buffer slot inside a worker process; ring is (name, shape, dtype)."""
+    min_sharpness, min_brightness, max_brightness, max_clipped = thresholds
+    frame = _attach_ring(*ring)[slot]
+    sharpness, brightness, clipped = frame_quality(frame)
+    ok = (sharpness >= min_sharpness and min_brightness <= brightness <= max_brightness
+          and clipped <= max_clipped)
+    path = None
+    if ok and output_dir:
+        from PIL import Image
+
+        path = os.path.join(output_dir, f'frame_{index:04d}.png')
+        Image.fromarray(frame).save(path)
+    return FrameQuality(index, sharpness, brightness, clipped, ok, path)
+
+
+class CapturePipeline:
+    """
+    Captures frames on a worker thread and evaluates them in a process pool while capturing continues.
+
+    Frames are written into a preallocated ring buffer in shared memory, so
+    the evaluation processes read them without copying. The ring also bounds
+    memory: when every slot is waiting for evaluation, capturing pauses.
+    Usable frames are saved as frame_<index>.png in output_dir, so every
+    capture needs a directory of its own.
+
+    Attributes
+    ----------
+    count : int
+        The number of frames to capture.
+    results : list of FrameQuality
+        The evaluated frames in capture order, filled when the pipeline is done.
+    captured, evaluated : int
+        Progress counters.
+    error : str or None
+        Why the pipeline stopped early, if it did.
+    """
+
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, source, count=10, capacity=4, workers=None, output_dir=None, min_sharpness=100.0,
+                 min_brightness=0.2, max_brightness=0.85, max_clipped=0.05, frame_interval=0.0, pool=None):
+        """
+        Parameters
+        ----------
+        source : object
+            A frame source with open(), read() and close(), e.g. V4L2Source.
+        count : int, optional
+            The number of frames to capture. Defaults to 10.
+        capacity : int, optional
+            The number of ring buffer slots. Defaults to 4.
+        workers : int, optional
+            The number of evaluation processes when no pool is given. Defaults to the number of cores.
+        output_dir : str, optional
+            Where usable frames are saved as PNG. They are not saved when omitted.
+        min_sharpness : float, optional
+            The smallest Laplacian variance of a sharp frame. Defaults to 100.
+        min_brightness, max_brightness : float, optional
+            The accepted range of mean luminance. Defaults to 0.2 and 0.85.
+        max_clipped : float, optional
+            The largest accepted fraction of black or white pixels. Defaults to 0.05.
+        frame_interval : float, optional
+            Seconds to wait between frames, e.g. while a turntable rotates. Defaults to 0.
+        pool : concurrent.futures.ProcessPoolExecutor, optional
+            The evaluation processes, e.g. from evaluation_pool(), shared with later
+            pipelines. A pool is created and shut down for this capture when omitted.
+        """
+        self.source = source
+        self.count = count
+        self.capacity = capacity
+        self.workers = workers
+        self.output_dir = output_dir
+        self.thresholds = (min_sharpness, min_brightness, max_brightness, max_clipped)
+        self.frame_interval = frame_interval
+        self.pool = pool
+        self.results = []
+        self.captured = 0
+        self.evaluated = 0
+        self.error = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def start(self):
+        """Start capturing on a background thread."""
+        self._thread = threading.Thread(target=self._run, name='capture-pipeline', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop capturing; frames waiting for evaluation are dropped and those being evaluated are discarded."""
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        """Block until the pipeline is done; return whether it is."""
+        return self._done.wait(timeout)
+
+    def _run(self):
+        memory = None
+        pool = None
+        futures = []
+        try:
+            if self.output_dir:
+                os.makedirs(self.output_dir, exist_ok=True)
+            self.source.open()
+            first = self.source.read()
+            shape = (self.capacity, *first.shape)
+            memory = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * first.dtype.itemsize)
+            ring = np.ndarray(shape, dtype=first.dtype, buffer=memory.buf)
+            free_slots = queue.Queue()
+            for slot in range(self.capacity):
+                free_slots.put(slot)
+
+            results = [None] * self.count
+            pool = self.pool or evaluation_pool(self.workers)
+            ring_spec = (memory.name, shape, first.dtype.str)
+            for index in range(self.count):
+                if self._cancelled.is_set():
+                    break
+                frame = first if index == 0 else self.source.read()
+                if frame.shape != first.shape:
+                    raise ValueError(f"Frame {index} has shape {frame.shape}, expected {first.shape}.")
+                slot = free_slots.get()  # blocks while every slot is being evaluated
+                ring[slot] = frame
+                self.captured += 1
+                future = pool.submit(_evaluate_slot, ring_spec, slot, index, self.thresholds, self.output_dir)
+                future.add_done_callback(lambda done, slot=slot: self._on_evaluated(done, slot, free_slots, results))
+                futures.append(future)
+                if self.frame_interval:
+                    self._cancelled.wait(self.frame_interval)
+            for future in futures:
+                if self._cancelled.is_set():
+                    break
+                future.result()
+            self.results = [result for result in results if result is not None]
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            for future in futures:
+                future.cancel()  # a no-op for the frames already evaluated
+            if pool is not None and pool is not self.pool:
+                pool.shutdown(wait=not self._cancelled.is_set(), cancel_futures=True)
+            self.source.close()
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+            self._done.set()
+
+    def _on_evaluated(self, future, slot, free_slots, results):
+        free_slots.put(slot)
+        if future.cancelled():
+            return
+        if future.exception() is None:
+            quality = future.result()
+            results[quality.index] = quality
+        self.evaluated += 1
+
+    def progress(self):
+        """Return the fraction of work done; capturing and evaluating count half each."""
+        return (self.captured + self.evaluated) / (2 * self.count) if self.count else 1.0
+
+    def usable(self):
+        """Return the frames that passed the sharpness and exposure checks."""
+        return [result for result in self.results if result.ok]
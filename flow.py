@@ -0,0 +1,292 @@
+import time
+from collections import Counter, deque, namedtuple
+
+# One entry of the transition trace; elapsed is the time spent in source.
+Transition = namedtuple('Transition', 'time source event target elapsed')
+
+# Upper bounds in seconds of the phase latency histogram buckets.
+HISTOGRAM_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class State:
+    """
+    A declarative state of a FlowMachine.
+
+    Attributes
+    ----------
+    name : str
+        The name of the state.
+    transitions : dict
+        Maps event names to the names of target states.
+    timeout : float or None
+        Seconds after which the 'timeout' event is dispatched while in this state.
+    on_enter : callable or None
+        Called without arguments when the state is entered, e.g. to show a page.
+    task : callable or None
+        Called as task(emit) after on_enter to start asynchronous work. The
+        work reports back with emit(event, **data); emits that arrive after the
+        state was left are ignored.
+    """
+
+    def __init__(self, name, transitions=None, timeout=None, on_enter=None, task=None):
+        self.name = name
+        self.transitions = dict(transitions or {})
+        self.timeout = timeout
+        self.on_enter = on_enter
+        self.task = task
+
+
+class FlowMachine:
+    """
+    Runs a set of States, records every transition and times every phase.
+
+    Events are processed run-to-completion: an event dispatched while another
+    transition is in progress (for example from an on_enter callback) is
+    queued and handled right after it.
+
+    Attributes
+    ----------
+    states : dict
+        The states by name.
+    current : str
+        The name of the current state.
+    context : dict
+        Data carried by the events so far, e.g. the scanned RFID.
+    trace : collections.deque
+        The most recent Transitions.
+    """
+
+    def __init__(self, states, initial, after, cancel, global_transitions=None, clock=time.monotonic,
+                 trace_size=1000):
+        """
+        Parameters
+        ----------
+        states : iterable of State
+            The states of the machine.
+        initial : str
+            The name of the initial state.
+        after : callable
+            after(delay_ms, callback) schedules a timeout and returns a handle,
+            e.g. Scheduler.after or a Tk root's after.
+        cancel : callable
+            cancel(handle) cancels a scheduled timeout.
+        global_transitions : dict, optional
+            Transitions valid in every state, e.g. {'cancel': 'idle'}.
+        clock : callable, optional
+            The time source. Defaults to time.monotonic.
+        trace_size : int, optional
+            The number of transitions kept in the trace. Defaults to 1000.
+        """
+        self.states = {state.name: state for state in states}
+        self.global_transitions = dict(global_transitions or {})
+        self.current = initial
+        self.context = {}
+        self.trace = deque(maxlen=trace_size)
+        self._initial = initial
+        self._after = after
+        self._cancel = cancel
+        self._clock = clock
+        self._entered_at = clock()
+        self._visit = 0
+        self._timeout_handle = None
+        self._queue = deque()
+        self._dispatching = False
+        self._durations = {}
+        self._endings = Counter()
+
+    def start(self, **data):
+        """Enter the initial state."""
+        self.context.update(data)
+        self._enter(self._initial)
+
+    def can_handle(self, event):
+        """Return whether event causes a transition in the current state."""
+        return event in self.states[self.current].transitions or event in self.global_transitions
+
+    def dispatch(self, event, **data):
+        """
+        Dispatch an event; events without a transition in the current state are ignored.
+
+        Returns
+        -------
+        bool
+            Whether the event was accepted (or queued behind a running transition).
+        """
+        self._queue.append((event, data, None))
+        return True if self._dispatching else self._drain()
+
+    def emitter(self):
+        """Return an emit(event, **data) function that only works while the current state lasts."""
+        visit = self._visit
+
+        def emit(event, **data):
+            if visit != self._visit:
+                return False
+            self._queue.append((event, data, visit))
+            return True if self._dispatching else self._drain()
+
+        return emit
+
+    def _drain(self):
+        accepted = False
+        self._dispatching = True
+        try:
+            while self._queue:
+                event, data, visit = self._queue.popleft()
+                if visit is not None and visit != self._visit:
+                    continue
+                target = self.states[self.current].transitions.get(event, self.global_transitions.get(event))
+                if target is None:
+                    continue
+                self.context.update(data)
+                self._transition(event, target)
+                accepted = True
+        finally:
+            self._dispatching = False
+        return accepted
+
+    def _transition(self, event, target):
+        now = self._clock()
+        elapsed = now - self._entered_at
+        self.trace.append(Transition(time.time(), self.current, event, target, elapsed))
+        self._durations.setdefault(self.current, deque(maxlen=1000)).append(elapsed)
+        if target == self._initial:
+            self._endings[(self.current, event)] += 1
+        self._enter(target)
+
+    def _enter(self, name):
+        if self._timeout_handle is not None:
+            self._cancel(self._timeout_handle)
+            self._timeout_handle = None
+        self._visit += 1
+        self.current = name
+        self._entered_at = self._clock()
+        state = self.states[name]
+        if state.on_enter is not None:
+            state.on_enter()
+        if state.timeout is not None:
+            self._timeout_handle = self._after(int(state.timeout * 1000), self._timeout_callback())
+        if state.task is not None:
+            state.task(self.emitter())
+
+    def _timeout_callback(self):
+        emit = self.emitter()
+
+        def on_timeout():
+            self._timeout_handle = None
+            emit('timeout')
+
+        return on_timeout
+
+    # ---- Statistics ----
+
+    def phase_stats(self):
+        """Return count, mean, p50, p95 and max seconds spent per state."""
+        stats = {}
+        for name, samples in self._durations.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+            stats[name] = {
+                'count': count,
+                'mean': sum(ordered) / count,
+                'p50': ordered[int(0.50 * (count - 1))],
+                'p95': ordered[int(0.95 * (count - 1))],
+                'max': ordered[-1],
+            }
+        return stats
+
+    def phase_histograms(self, bounds=HISTOGRAM_BOUNDS):
+        """Return per state the number of visits whose duration fell into each bucket ('+Inf' last)."""
+        histograms = {}
+        for name, samples in self._durations.items():
+            counts = dict.fromkeys([*map(str, bounds), '+Inf'], 0)
+            for elapsed in samples:
+                bucket = next((str(bound) for bound in bounds if elapsed <= bound), '+Inf')
+                counts[bucket] += 1
+            histograms[name] = counts
+        return histograms
+
+    def flow_endings(self):
+        """Return how often flows returned to the initial state, by (last state, event)."""
+        return dict(self._endings)
+
+
+def inventory_flow(actions, after, cancel, simulate_reader=False, simulate_lookup=False,
+                   lookup_timeout=15, evaluation_timeout=60, clock=time.monotonic):
+    """
+    Build the state machine of the Scan Object, Scan Box, New Object and Change Box Location flows.
+
+    Parameters
+    ----------
+    actions : object
+        Provides the on_enter callbacks (starting_page, scanning_page,
+        taking_pictures_page, evaluating_pictures_page, scan_box_page,
+        searching_for_box_page, box_not_found_page, box_found_page,
+        localization_page, new_object_page, registering_page,
+        registration_done_page, relocation_page, relocation_done_page) and
+        the tasks capture_pictures(emit), evaluate_pictures(emit),
+        lookup_box(emit), register_item(emit), start_relocation(emit) and
+        finish_relocation(emit); the first four emit 'captured',
+        'evaluated', 'found'/'not_found' and 'registered'.
+        InventoryApp is the real implementation; tests can pass a recorder.
+        A 'tag' read on the starting page starts the box search right away,
+        so a box can be looked up without pressing Scan Box first.
+    after, cancel : callable
+        Timer functions, see FlowMachine.
+    simulate_reader : bool, optional
+        Pretend a tag is read 2 seconds after the Scan Box page opens.
+    simulate_lookup : bool, optional
+        Pretend every box lookup and registration succeeds after 2 seconds
+        instead of calling lookup_box and register_item, and skip the
+        relocation tasks.
+    lookup_timeout : float, optional
+        Seconds after which a box lookup counts as not found. Defaults to 15.
+    evaluation_timeout : float, optional
+        Seconds after which the flow stops waiting for the picture evaluation. Defaults to 60.
+    clock : callable, optional
+        The time source. Defaults to time.monotonic.
+
+    Returns
+    -------
+    FlowMachine
+        The machine; call start() to show the starting page.
+    """
+    states = [
+        State('idle', {'tag': 'searching_for_box'}, on_enter=actions.starting_page),  # a tag skips Scan Box
+
+        # ---- Scan Object Flow ----
+        State('object_countdown', {'timeout': 'taking_pictures'}, timeout=3, on_enter=actions.scanning_page),
+        State('taking_pictures', {'captured': 'evaluating_pictures'},
+              on_enter=actions.taking_pictures_page, task=actions.capture_pictures),
+        State('evaluating_pictures', {'evaluated': 'idle', 'timeout': 'idle'}, timeout=evaluation_timeout,
+              on_enter=actions.evaluating_pictures_page, task=actions.evaluate_pictures),
+
+        # ---- Scan Box Flow ----
+        State('waiting_for_tag', {'tag': 'searching_for_box', 'timeout': 'searching_for_box'},
+              timeout=2 if simulate_reader else None, on_enter=actions.scan_box_page),
+        State('searching_for_box',
+              {'found': 'box_found', 'not_found': 'box_not_found',
+               'timeout': 'box_found' if simulate_lookup else 'box_not_found'},
+              timeout=2 if simulate_lookup else lookup_timeout, on_enter=actions.searching_for_box_page,
+              task=None if simulate_lookup else actions.lookup_box),
+        State('box_not_found', {'tag': 'searching_for_box'}, on_enter=actions.box_not_found_page),
+        State('box_found', {'timeout': 'localization'}, timeout=3, on_enter=actions.box_found_page),
+        State('localization', {'timeout': 'idle', 'go_now': 'idle'}, timeout=60,
+              on_enter=actions.localization_page),
+
+        # ---- New Object Flow ----
+        State('new_object', {'register': 'registering'}, on_enter=actions.new_object_page),
+        State('registering', {'registered': 'registration_done', 'timeout': 'registration_done'},
+              timeout=2 if simulate_lookup else None, on_enter=actions.registering_page,
+              task=None if simulate_lookup else actions.register_item),
+        State('registration_done', {'timeout': 'idle'}, timeout=5, on_enter=actions.registration_done_page),
+
+        # ---- Change Box Location Flow ----
+        State('relocating', {'done': 'relocation_done'}, on_enter=actions.relocation_page,
+              task=None if simulate_lookup else actions.start_relocation),
+        State('relocation_done', {'timeout': 'idle'}, timeout=10, on_enter=actions.relocation_done_page,
+              task=None if simulate_lookup else actions.finish_relocation),
+    ]
+    global_transitions = {'cancel': 'idle', 'scan_object': 'object_countdown', 'scan_box': 'waiting_for_tag',
+                          'new_object': 'new_object', 'change_location': 'relocating'}
+    return FlowMachine(states, 'idle', after, cancel, global_transitions, clock=clock)
@@ -0,0 +1,297 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+
+class ImageCache:
+    """
+    Caches item pictures as ready-to-show thumbnails, in memory and on disk.
+
+    Pictures are looked up by (item ID, picture name) in three tiers:
+
+    1. an in-memory LRU of decoded, resized thumbnails (and their CTkImage),
+    2. a content-addressed directory holding the original files, named by
+       the SHA-256 of their content, plus one small ref file per key that
+       names the content,
+    3. the server.
+
+    Loading runs on a small thread pool, so prefetch() can be called as soon
+    as the box record arrives and the picture is usually decoded before the
+    Box Found page is shown. Identical pictures of different items share one
+    file on disk.
+
+    The disk tier holds at most max_disk_bytes; when it grows past that, the
+    least recently used files are deleted until it is back under 90 % of the
+    limit. Only pictures that decode are stored, and a stored file that no
+    longer decodes is deleted and downloaded again.
+
+    Attributes
+    ----------
+    rest : Rest
+        The client pictures are downloaded with.
+    cache_dir : str
+        The root of the disk tier.
+    size : tuple
+        The largest (width, height) of a thumbnail.
+    """
+
+    def __init__(self, rest, cache_dir='image_cache', maxsize=64, size=(320, 240), max_workers=2,
+                 max_disk_bytes=256 * 1024 * 1024):
+        """
+        Initializes the cache.
+
+        Parameters
+        ----------
+        rest : Rest
+            The client pictures are downloaded with.
+        cache_dir : str, optional
+            The root of the disk tier. Defaults to 'image_cache'.
+        maxsize : int, optional
+            The number of thumbnails kept in memory. Defaults to 64.
+        size : tuple, optional
+            The largest (width, height) of a thumbnail. Defaults to (320, 240).
+        max_workers : int, optional
+            The number of loading threads. Defaults to 2.
+        max_disk_bytes : int, optional
+            The size limit of the disk tier. Defaults to 256 MiB.
+        """
+        self.rest = rest
+        self.cache_dir = cache_dir
+        self.size = size
+        self._maxsize = maxsize
+        self._thumbnails = OrderedDict()  # (item_id, picture_name) -> [PIL image, CTkImage or None]
+        self._pending = {}  # (item_id, picture_name) -> Future
+        self._lock = threading.RLock()  # prefetch() may run a done callback while holding it
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-cache')
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'downloads': 0, 'errors': 0, 'evictions': 0,
+                       'load_seconds': 0.0}
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_lock = threading.Lock()  # guards _disk_bytes and pruning, without blocking thumbnail()
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'refs'), exist_ok=True)
+        self._disk_bytes = sum(entry.stat().st_size for entry in self._objects())
+
+    @staticmethod
+    def _key(item_id, picture_name):
+        return str(item_id), picture_name
+
+    def _ref_path(self, key):
+        name = hashlib.sha256('\0'.join(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'refs', name)
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest)
+
+    def _objects(self):
+        """Yields the os.DirEntry of every file of the disk tier."""
+        with os.scandir(os.path.join(self.cache_dir, 'objects')) as directories:
+            for directory in directories:
+                if directory.is_dir():
+                    with os.scandir(directory.path) as files:
+                        yield from (entry for entry in files if not entry.name.endswith('.tmp'))
+
+    def _read_disk(self, key):
+        """Returns the cached file of key, or None; reading it marks it as recently used."""
+        try:
+            with open(self._ref_path(key)) as ref:
+                digest = ref.read().strip()
+        except OSError:
+            return None
+        object_path = self._object_path(digest)
+        try:
+            with open(object_path, 'rb') as file:
+                data = file.read()
+            os.utime(object_path)
+            return data
+        except OSError:
+            self._remove(self._ref_path(key))  # the file was pruned
+            return None
+
+    def _write_disk(self, key, data):
+        """Stores data under its content hash and points the ref of key at it."""
+        digest = hashlib.sha256(data).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            self._write_atomically(object_path, data)
+            with self._disk_lock:
+                self._disk_bytes += len(data)
+        self._write_atomically(self._ref_path(key), digest.encode('ascii'))
+        if self._disk_bytes > self.max_disk_bytes:
+            self._prune()
+
+    def _evict_disk(self, key):
+        """Deletes the cached file of key, e.g. because it no longer decodes."""
+        try:
+            with open(self._ref_path(key)) as ref:
+                object_path = self._object_path(ref.read().strip())
+        except OSError:
+            return
+        with self._disk_lock:
+            self._disk_bytes -= self._remove(object_path)
+        self._remove(self._ref_path(key))
+        self._count('evictions')
+
+    def _prune(self):
+        """Deletes the least recently used files until the disk tier is under 90 % of its limit."""
+        with self._disk_lock:
+            if self._disk_bytes <= self.max_disk_bytes:
+                return  # another thread pruned meanwhile
+            entries = []
+            for entry in self._objects():
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+            target = 0.9 * self.max_disk_bytes
+            removed = 0
+            for _, path in sorted(entries):
+                if self._disk_bytes <= target:
+                    break
+                self._disk_bytes -= self._remove(path)
+                removed += 1  # refs to the file are dropped when they are next read
+        self._count('evictions', removed)
+
+    @staticmethod
+    def _remove(path):
+        """Deletes a file if it exists; returns its size."""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _write_atomically(path, data):
+        temporary_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(data)
+        os.replace(temporary_path, path)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _remember(self, key, thumbnail):
+        with self._lock:
+            self._thumbnails[key] = [thumbnail, None]
+            self._thumbnails.move_to_end(key)
+            while len(self._thumbnails) > self._maxsize:
+                self._thumbnails.popitem(last=False)
+
+    def _decode(self, data):
+        """Returns the thumbnail of an image file; raises OSError or ValueError if it is corrupt."""
+        from PIL import Image  # Pillow is only needed once pictures are shown
+
+        with Image.open(BytesIO(data)) as image:
+            image.draft('RGB', self.size)  # lets JPEG decode at a reduced scale
+            thumbnail = image.convert('RGB')
+        thumbnail.thumbnail(self.size)
+        return thumbnail
+
+    def load(self, item_id, picture_name):
+        """
+        Returns the thumbnail of a picture, loading it from disk or the server if necessary.
+
+        Blocks while loading; use prefetch() from the UI thread.
+
+        Returns
+        -------
+        PIL.Image.Image or str
+            The thumbnail, or an error message.
+        """
+        key = self._key(item_id, picture_name)
+        with self._lock:
+            entry = self._thumbnails.get(key)
+            if entry is not None:
+                self._thumbnails.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry[0]
+
+        start = time.perf_counter()
+        thumbnail = None
+        data = self._read_disk(key)
+        if data is not None:
+            try:
+                thumbnail = self._decode(data)
+                self._count('disk_hits')
+            except (OSError, ValueError):
+                self._evict_disk(key)  # corrupt or truncated; download it again
+        if thumbnail is None:
+            data = self.rest.download_picture(item_id, picture_name)
+            if isinstance(data, str):
+                self._count('errors')
+                return data
+            self._count('downloads')
+            try:
+                thumbnail = self._decode(data)
+            except (OSError, ValueError) as e:
+                self._count('errors')
+                return f"Error - Picture {picture_name} of item {item_id} could not be decoded: {e}"
+            self._write_disk(key, data)
+        self._remember(key, thumbnail)
+        self._count('load_seconds', time.perf_counter() - start)
+        return thumbnail
+
+    def prefetch(self, item_id, picture_name):
+        """
+        Loads a picture in the background unless it is in memory or already being loaded.
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            The load, or None if the thumbnail is already in memory.
+        """
+        key = self._key(item_id, picture_name)
+        with self._lock:
+            if key in self._thumbnails:
+                return None
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self.load, item_id, picture_name)
+                self._pending[key] = future
+                future.add_done_callback(lambda done: self._forget_pending(key, done))
+            return future
+
+    def _forget_pending(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def thumbnail(self, item_id, picture_name):
+        """
+        Returns the CTkImage of a picture if its thumbnail is in memory, without blocking.
+
+        Call from the UI thread only.
+
+        Returns
+        -------
+        customtkinter.CTkImage or None
+            The image, or None if it has not been loaded yet.
+        """
+        import customtkinter as ctk
+
+        key = self._key(item_id, picture_name)
+        with self._lock:
+            entry = self._thumbnails.get(key)
+            if entry is None:
+                return None
+            self._thumbnails.move_to_end(key)
+            if entry[1] is None:
+                entry[1] = ctk.CTkImage(light_image=entry[0], size=entry[0].size)
+            return entry[1]
+
+    def stats(self):
+        """Returns the hit, download, error and eviction counts, the memory and disk tier sizes and the load time."""
+        with self._lock:
+            return {**self._stats, 'in_memory': len(self._thumbnails), 'pending': len(self._pending),
+                    'disk_bytes': self._disk_bytes}
+
+    def close(self):
+        """Stops the loading threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
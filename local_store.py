@@ -0,0 +1,573 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from records import Box, Item, Location, Record
+
+log = logging.getLogger(__name__)
+
+
+class LocalStore:
+    """
+    An embedded SQLite copy of the items, boxes and locations known to the station.
+
+    Every record is kept as its full JSON next to the columns that are looked
+    up (box_rfid, item_name, location_id), which are indexed. Writes made while
+    offline are journaled in pending_writes until they are replayed.
+
+    Attributes
+    ----------
+    db_path : str
+        The path of the SQLite database.
+    """
+
+    TABLES = {
+        'item': ('items', 'item_id'),
+        'box': ('boxes', 'box_id'),
+        'location': ('locations', 'location_id'),
+    }
+    WRITES = {
+        'item': ('insert_new_item', 'update_item'),
+        'box': ('insert_new_box', 'update_box'),
+        'location': (),
+    }
+
+    def __init__(self, db_path='inventory_store.sqlite3'):
+        """
+        Opens (and if necessary creates) the store.
+
+        Parameters
+        ----------
+        db_path : str, optional
+            The path of the SQLite database. Defaults to 'inventory_store.sqlite3'.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                item_id TEXT PRIMARY KEY, item_name TEXT, data TEXT NOT NULL, synced_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS boxes (
+                box_id TEXT PRIMARY KEY, box_rfid TEXT, item_id TEXT, location_id TEXT,
+                data TEXT NOT NULL, synced_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS locations (
+                location_id TEXT PRIMARY KEY, data TEXT NOT NULL, synced_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS pending_writes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, operation TEXT NOT NULL, payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0, error TEXT, failed INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS items_item_name ON items (item_name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS boxes_box_rfid ON boxes (box_rfid);
+            CREATE INDEX IF NOT EXISTS boxes_location_id ON boxes (location_id);
+            CREATE INDEX IF NOT EXISTS items_synced_at ON items (synced_at);
+            CREATE INDEX IF NOT EXISTS boxes_synced_at ON boxes (synced_at);
+            CREATE INDEX IF NOT EXISTS locations_synced_at ON locations (synced_at);
+        """)
+
+    def _fetch_one(self, query, args):
+        with self._lock:
+            row = self._connection.execute(query, args).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _fetch_all(self, query, args):
+        with self._lock:
+            rows = self._connection.execute(query, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def upsert(self, kind, record, synced_at=None):
+        """
+        Inserts or replaces a record.
+
+        Parameters
+        ----------
+        kind : str
+            'item', 'box' or 'location'.
+        record : dict or Record
+            The record as returned by the server.
+        synced_at : float, optional
+            When the record was last confirmed by the server. Defaults to now.
+
+        Returns
+        -------
+        bool
+            False if the record has no ID and was not stored.
+        """
+        if isinstance(record, Record):
+            record = record.to_json()
+        if record.get(self.TABLES[kind][1]) in (None, ''):
+            return False
+        with self._lock:
+            self._replace(kind, record, synced_at)
+        return True
+
+    def refresh(self, kind, record):
+        """
+        Replaces a record with the server's copy unless a local write of it is still pending.
+
+        The check and the replacement are atomic, so a local change journaled
+        while the copy was on its way is never overwritten.
+
+        Returns
+        -------
+        bool
+            Whether the record was stored.
+        """
+        id_field = self.TABLES[kind][1]
+        if isinstance(record, Record):
+            record = record.to_json()
+        if record.get(id_field) in (None, ''):
+            return False
+        operations = self.WRITES[kind]
+        with self._lock:
+            if operations and self._connection.execute(
+                    f'SELECT 1 FROM pending_writes WHERE failed = 0 AND operation IN ({", ".join("?" * len(operations))})'
+                    f" AND CAST(json_extract(payload, '$.{id_field}') AS TEXT) = ? LIMIT 1",
+                    (*operations, str(record[id_field]))).fetchone():
+                return False
+            self._replace(kind, record, None)
+        return True
+
+    def _replace(self, kind, record, synced_at):
+        """Inserts or replaces a record; the caller holds the lock."""
+        synced_at = time.time() if synced_at is None else synced_at
+        data = json.dumps(record, sort_keys=True)
+        if kind == 'item':
+            self._connection.execute(
+                'INSERT OR REPLACE INTO items (item_id, item_name, data, synced_at) VALUES (?, ?, ?, ?)',
+                (str(record['item_id']), record.get('item_name'), data, synced_at))
+        elif kind == 'box':
+            self._connection.execute(
+                'INSERT OR REPLACE INTO boxes (box_id, box_rfid, item_id, location_id, data, synced_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?)',
+                (str(record['box_id']), record.get('box_rfid'), _text(record.get('item_id')),
+                 _text(record.get('location_id')), data, synced_at))
+        else:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO locations (location_id, data, synced_at) VALUES (?, ?, ?)',
+                (str(record['location_id']), data, synced_at))
+
+    def get(self, kind, record_id):
+        """Returns the record of the given kind and ID, or None."""
+        table, id_field = self.TABLES[kind]
+        return self._fetch_one(f'SELECT data FROM {table} WHERE {id_field} = ?', (str(record_id),))
+
+    def all_records(self, kind):
+        """Returns every stored record of the given kind, e.g. to build an ItemSearchIndex."""
+        table, _ = self.TABLES[kind]
+        return self._fetch_all(f'SELECT data FROM {table}', ())
+
+    def find_box_by_rfid(self, box_rfid):
+        """Returns the box with the given RFID, or None."""
+        return self._fetch_one('SELECT data FROM boxes WHERE box_rfid = ?', (box_rfid,))
+
+    def find_items_by_name(self, item_name):
+        """Returns the items with the given name, ignoring case."""
+        return self._fetch_all('SELECT data FROM items WHERE item_name = ? COLLATE NOCASE', (item_name,))
+
+    def find_boxes_by_location(self, location_id):
+        """Returns the boxes currently at the given location."""
+        return self._fetch_all('SELECT data FROM boxes WHERE location_id = ?', (str(location_id),))
+
+    def stalest(self, kind, older_than, limit):
+        """
+        Returns the IDs of records not confirmed by the server since older_than.
+
+        Parameters
+        ----------
+        kind : str
+            'item', 'box' or 'location'.
+        older_than : float
+            A POSIX timestamp.
+        limit : int
+            The maximum number of IDs returned, oldest first.
+
+        Returns
+        -------
+        list of str
+            The record IDs.
+        """
+        table, id_field = self.TABLES[kind]
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT {id_field} FROM {table} WHERE synced_at < ? ORDER BY synced_at LIMIT ?',
+                (older_than, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def queue_write(self, operation, payload):
+        """Journals a write ('insert_new_item', 'update_item' or 'insert_new_box') for replay."""
+        with self._lock:
+            return self._connection.execute('INSERT INTO pending_writes (operation, payload) VALUES (?, ?)',
+                                            (operation, json.dumps(payload))).lastrowid
+
+    def write_locally(self, kind, operation, record):
+        """
+        Stores a local change as unconfirmed and journals it for replay, in one transaction.
+
+        Returns
+        -------
+        int
+            The ID of the journaled write.
+        """
+        if isinstance(record, Record):
+            record = record.to_json()
+        with self._lock:
+            self._connection.execute('BEGIN')
+            try:
+                self._replace(kind, record, 0)
+                write_id = self._connection.execute('INSERT INTO pending_writes (operation, payload) VALUES (?, ?)',
+                                                    (operation, json.dumps(record))).lastrowid
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+        return write_id
+
+    def pending_writes(self, limit=100):
+        """Returns the writes waiting for replay, oldest first, as (id, operation, payload, attempts)."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT id, operation, payload, attempts FROM pending_writes WHERE failed = 0 ORDER BY id LIMIT ?',
+                (limit,)).fetchall()
+        return [(write_id, operation, json.loads(payload), attempts) for write_id, operation, payload, attempts in rows]
+
+    def finish_write(self, write_id):
+        """Removes a replayed write from the journal."""
+        with self._lock:
+            self._connection.execute('DELETE FROM pending_writes WHERE id = ?', (write_id,))
+
+    def fail_write(self, write_id, error, give_up=False):
+        """Records a failed replay; given-up writes stay in the journal but are no longer replayed."""
+        with self._lock:
+            self._connection.execute('UPDATE pending_writes SET attempts = attempts + 1, error = ?, failed = ?'
+                                     ' WHERE id = ?', (error, int(give_up), write_id))
+
+    def counts(self):
+        """Returns the number of stored items, boxes and locations and of pending writes."""
+        with self._lock:
+            return {
+                table: self._connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('items', 'boxes', 'locations', 'pending_writes')
+            }
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+class OfflineRest:
+    """
+    An offline-first front for Rest that answers reads from a LocalStore.
+
+    Reads are served locally and only go to the server for records the store
+    has never seen, or when fresh=True. Updates are applied locally at once
+    and journaled. New records without an ID are sent at once, since only the
+    server can assign their ID. A background sync replays the journal and
+    refreshes the stalest records in small batches. The inventory API has no
+    change feed, so refreshing what the station already knows, oldest first,
+    is the delta that is synced.
+
+    Everything else, e.g. the uploads and download_picture, goes straight to
+    rest, so an OfflineRest can be used wherever a Rest is.
+
+    Attributes
+    ----------
+    rest : Rest
+        The client used to reach the server.
+    store : LocalStore
+        The local copy of the inventory.
+    last_sync_error : str or None
+        The error of the last sync round, or None if it succeeded.
+    """
+
+    def __init__(self, rest, store, refresh_age=600, sync_interval=30, batch_size=50, max_write_attempts=10):
+        """
+        Initializes the offline-first client; call start_sync() for background syncing.
+
+        Parameters
+        ----------
+        rest : Rest
+            The client used to reach the server.
+        store : LocalStore
+            The local copy of the inventory.
+        refresh_age : float, optional
+            Seconds after which a record is re-fetched from the server. Defaults to 600.
+        sync_interval : float, optional
+            Seconds between background sync rounds. Defaults to 30.
+        batch_size : int, optional
+            The number of records refreshed per kind and round. Defaults to 50.
+        max_write_attempts : int, optional
+            How often a journaled write is replayed before it is given up. Defaults to 10.
+        """
+        self.rest = rest
+        self.store = store
+        self.refresh_age = refresh_age
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self.max_write_attempts = max_write_attempts
+        self.last_sync_error = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def __getattr__(self, name):
+        # Only called for what OfflineRest does not define itself
+        if name == 'rest':
+            raise AttributeError(name)
+        return getattr(self.rest, name)
+
+    def close(self):
+        """Stops the background sync and closes the client and the store."""
+        self.stop_sync()
+        self.rest.close()
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ---- Reads ----
+
+    def _refresh(self, kind, record):
+        """Stores a record from the server unless a local write of it is pending; returns whether it was."""
+        if not self.store.refresh(kind, record):
+            return False
+        if kind == 'item' and self.rest.search_index is not None:
+            self.rest.search_index.add(record)
+        return True
+
+    def _store_response(self, kind, response):
+        """Stores a server response, which may be a single record or a list of them."""
+        for record in response if isinstance(response, list) else [response]:
+            if isinstance(record, (dict, Record)):
+                self._refresh(kind, record)
+        return response
+
+    def _find(self, kind, local, remote, key, fresh):
+        """Returns the local record, or the server's if there is none or fresh is set."""
+        return (None if fresh else local(key)) or self._store_response(kind, remote(key, fresh=fresh))
+
+    def _find_many(self, kind, local, remote, keys, max_workers, fresh):
+        """Looks up many records, locally where possible and the others with one concurrent batch."""
+        keys = list(dict.fromkeys(keys))
+        results = {} if fresh else {key: local(key) for key in keys}
+        missing = [key for key in keys if results.get(key) is None]
+        if missing:
+            results.update({key: self._store_response(kind, response)
+                            for key, response in remote(missing, max_workers, fresh=fresh).items()})
+        return {key: results[key] for key in keys}
+
+    def _local_item(self, item_id):
+        return Item.decode(self.store.get('item', item_id))
+
+    def _local_box(self, box_id):
+        return Box.decode(self.store.get('box', box_id))
+
+    def _local_box_with_rfid(self, box_rfid):
+        return Box.decode(self.store.find_box_by_rfid(box_rfid))
+
+    def _local_location(self, location_id):
+        return Location.decode(self.store.get('location', location_id))
+
+    def find_item_by_id(self, item_id, fresh=False):
+        """Finds an item by ID, locally if possible."""
+        return self._find('item', self._local_item, self.rest.find_item_by_id, item_id, fresh)
+
+    def search_for_item_by_name(self, item_name):
+        """Searches for items by name, locally if possible."""
+        return (Item.decode(self.store.find_items_by_name(item_name))
+                or self._store_response('item', self.rest.search_for_item_by_name(item_name)))
+
+    def find_box_by_id(self, box_id, fresh=False):
+        """Finds a box by ID, locally if possible."""
+        return self._find('box', self._local_box, self.rest.find_box_by_id, box_id, fresh)
+
+    def search_for_box_with_rfid(self, box_rfid, fresh=False):
+        """Searches for a box by RFID, locally if possible."""
+        return self._find('box', self._local_box_with_rfid, self.rest.search_for_box_with_rfid, box_rfid, fresh)
+
+    def get_location_by_id(self, location_id, fresh=False):
+        """Gets a location by ID, locally if possible."""
+        return self._find('location', self._local_location, self.rest.get_location_by_id, location_id, fresh)
+
+    def search_for_location_by_id(self, location_id, fresh=False):
+        """Searches for a location by ID, locally if possible."""
+        return self._find('location', self._local_location, self.rest.search_for_location_by_id, location_id, fresh)
+
+    def find_items_by_ids(self, item_ids, max_workers=None, fresh=False):
+        """Finds many items by ID, locally if possible; see Rest.find_items_by_ids."""
+        return self._find_many('item', self._local_item, self.rest.find_items_by_ids, item_ids, max_workers, fresh)
+
+    def find_boxes_by_ids(self, box_ids, max_workers=None, fresh=False):
+        """Finds many boxes by ID, locally if possible; see Rest.find_boxes_by_ids."""
+        return self._find_many('box', self._local_box, self.rest.find_boxes_by_ids, box_ids, max_workers, fresh)
+
+    def search_boxes_by_rfids(self, box_rfids, max_workers=None, fresh=False):
+        """Searches for many boxes by RFID, locally if possible; see Rest.search_boxes_by_rfids."""
+        return self._find_many('box', self._local_box_with_rfid, self.rest.search_boxes_by_rfids, box_rfids,
+                               max_workers, fresh)
+
+    # ---- Writes ----
+
+    def _write(self, operation, kind, record):
+        # The local copy counts as unconfirmed until the replay succeeds.
+        self.store.write_locally(kind, operation, record)
+        if kind == 'item' and self.rest.search_index is not None:
+            self.rest.search_index.add(record)
+        self._wakeup.set()
+        return record
+
+    def _insert(self, operation, kind, record):
+        """Journals a new record that has its ID; one without is sent at once, as only the server can assign it."""
+        if record.get(LocalStore.TABLES[kind][1]) not in (None, ''):
+            return self._write(operation, kind, record)
+        return self._store_response(kind, getattr(self.rest, operation)(record))
+
+    def insert_new_item(self, new_item):
+        """Inserts a new item locally and queues it for the server."""
+        return self._insert('insert_new_item', 'item', new_item)
+
+    def update_item(self, updated_item):
+        """Updates an item locally and queues the update for the server."""
+        return self._write('update_item', 'item', updated_item)
+
+    def insert_new_box(self, new_box):
+        """Inserts a new box locally and queues it for the server."""
+        return self._insert('insert_new_box', 'box', new_box)
+
+    def update_box(self, updated_box):
+        """Updates a box locally and queues the update for the server."""
+        return self._write('update_box', 'box', updated_box)
+
+    def update_boxes(self, updated_boxes, max_workers=None):
+        """
+        Updates many boxes locally and queues the updates for the server.
+
+        Returns
+        -------
+        dict
+            Maps each distinct box ID to the box as stored; see Rest.update_boxes.
+        """
+        latest = {str(box['box_id']): box for box in updated_boxes}
+        return {box_id: self.update_box(box) for box_id, box in latest.items()}
+
+    # ---- Sync ----
+
+    def replay_writes(self):
+        """
+        Sends journaled writes to the server in order.
+
+        Writes the server rejects for good (a 4xx error) are given up at
+        once, and writes that keep failing after max_write_attempts. Replay
+        goes on with the next write after a failure, but skips the later
+        writes of a record whose write will be retried, so they never
+        overtake it. It stops when the server cannot be reached.
+
+        Returns
+        -------
+        int
+            The number of writes replayed successfully.
+        """
+        replayed = 0
+        blocked = set()  # records with a write waiting for a retry
+        for write_id, operation, payload, attempts in self.store.pending_writes():
+            kind = operation.rsplit('_', 1)[1]
+            record = (kind, str(payload.get(self.store.TABLES[kind][1])))
+            if record in blocked:
+                continue
+            result = getattr(self.rest, operation)(payload)
+            if isinstance(result, str):
+                retryable = getattr(result, 'retryable', True)
+                give_up = not retryable or attempts + 1 >= self.max_write_attempts
+                self.store.fail_write(write_id, result, give_up=give_up)
+                if retryable and getattr(result, 'status', None) is None:
+                    break  # the server is unreachable; the next round starts here again
+                if not give_up:
+                    blocked.add(record)
+                continue
+            self.store.finish_write(write_id)
+            replayed += 1
+        return replayed
+
+    def refresh_stale(self):
+        """
+        Re-fetches the records that have not been confirmed for refresh_age seconds.
+
+        The records are read from the server, never from the cache of rest,
+        and records with a pending local write are left alone, also if the
+        write was journaled while the refresh was running.
+
+        Returns
+        -------
+        int
+            The number of records refreshed.
+        """
+        older_than = time.time() - self.refresh_age
+        batches = (
+            ('item', self.rest.find_items_by_ids),
+            ('box', self.rest.find_boxes_by_ids),
+            ('location', lambda ids, fresh: {location_id: self.rest.get_location_by_id(location_id, fresh=fresh)
+                                             for location_id in ids}),
+        )
+        refreshed = 0
+        for kind, lookup in batches:
+            ids = self.store.stalest(kind, older_than, self.batch_size)
+            if not ids:
+                continue
+            for record_id, record in lookup(ids, fresh=True).items():
+                if isinstance(record, (dict, Record)) and self._refresh(kind, record):
+                    refreshed += 1
+        return refreshed
+
+    def sync_once(self):
+        """
+        Runs one sync round.
+
+        Records are only refreshed once every journaled write has been
+        replayed, so a refresh never overwrites a local change with the
+        server's older copy.
+
+        Returns
+        -------
+        dict
+            The number of replayed writes and refreshed records.
+        """
+        replayed = self.replay_writes()
+        refreshed = 0 if self.store.pending_writes(limit=1) else self.refresh_stale()
+        return {'replayed': replayed, 'refreshed': refreshed}
+
+    def start_sync(self):
+        """Starts syncing in a background thread."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run_sync, name='offline-sync', daemon=True)
+        self._thread.start()
+
+    def stop_sync(self, timeout=None):
+        """Stops the background sync."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_sync(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync_once()
+                self.last_sync_error = None
+            except Exception as e:
+                # Requests report errors as strings, so this is a bug or a broken store; try again next round
+                self.last_sync_error = f"Error - Sync failed: {e}"
+                log.exception("Offline sync round failed")
+            self._wakeup.wait(self.sync_interval)
+            self._wakeup.clear()
@@ -1,238 +1,927 @@
+import time
+
+STARTED = time.perf_counter()  # the startup profile is measured from here, before the heavy imports
 
+import argparse
 import customtkinter as ctk
-import time
-from tkinter import ttk
+import os
+import threading
+import uuid
+from tkinter import filedialog, ttk
+
+from flow import inventory_flow
+from image_cache import ImageCache
+from metrics import Metrics, TraceLog
+from prefetch import Prefetcher
+from records import Item, Location
+from registration import Registration, Stage
+from relocation import BoxMove, Relocation
+from rfid_reader import ReplayTagSource, RfidReader, SerialTagSource, StdinTagSource
+from scheduler import Scheduler
+from screens import ScreenManager
+from startup import StartupProfiler
+
+# async_rest/rest (requests) and camera (NumPy) are imported on first use or during the warm-up
+IMPORTED = time.perf_counter()
 
 class InventoryApp:
-    def __init__(self, root):
+    WARM_UP_RETRY_S = 5  # seconds between background attempts to create the client after a failure
+
+    def __init__(self, root, rest=None, reader=None, capture=None, metrics=None, rest_factory=None, profiler=None):
         self.root = root
+        self.profiler = profiler
         self.root.title("Inventory Finder")
         self.root.geometry("1020x600")
 
-        self.rfid_code = '010101ff'  # This is a placeholder
-        self.countdown_job = None  # Keep track of the countdown job
-        self.localization_job = None  # Keep track of the localization countdown job
-        self.starting_page()
+        self.rfid_code = '010101ff'  # This is a placeholder until a reader delivers a tag
+        self.scheduler = Scheduler(root)  # Owns every timed job of the current screen
+
+        # Every page is built once and raised on demand
+        self.screens = ScreenManager(root, metrics)
+        self.screens.register("starting", self.build_starting_page)
+        self.screens.register("scanning", self.build_scanning_page)
+        self.screens.register("taking_pictures", self.build_taking_pictures_page)
+        self.screens.register("evaluating_pictures", self.build_evaluating_pictures_page)
+        self.screens.register("scan_box", self.build_scan_box_page)
+        self.screens.register("searching_for_box", self.build_searching_for_box_page)
+        self.screens.register("box_not_found", self.build_box_not_found_page)
+        self.screens.register("box_found", self.build_box_found_page)
+        self.screens.register("localization", self.build_localization_page)
+        self.screens.register("new_object", self.build_new_object_page)
+        self.screens.register("registering", self.build_registering_page)
+        self.screens.register("registration_done", self.build_registration_done_page)
+        self.screens.register("relocating", self.build_relocation_page)
+        self.screens.register("relocation_done", self.build_relocation_done_page)
+
+        # Lookups run on a background event loop so the mainloop never blocks. With a
+        # rest_factory the client is created by the warm-up after the first paint.
+        self.async_rest = None
+        self.bridge = None
+        self.rest_factory = rest_factory
+        self.warm_up_thread = None
+        self.warm_rest = None
+        self.warm_up_error = None  # why the last warm-up could not create the client
+        self.warm_up_failed_at = None
+        self.status_label = None
+
+        # The item, its picture and the locations are prefetched as soon as a box record arrives
+        self.image_cache = None
+        self.prefetcher = None
+        self.box_prefetch = None  # BoxPrefetch of the current box
+        if rest is not None:
+            self.connect(rest)
+
+        # The flows behind the starting page buttons; the *_page methods are its on_enter actions
+        self.flow = inventory_flow(self, self.scheduler.after, self.scheduler.cancel,
+                                   simulate_reader=reader is None, simulate_lookup=rest is None and rest_factory is None)
+
+        # capture() returns a new CapturePipeline; without it picture taking is simulated
+        self.capture = capture
+        self.pipeline = None
+
+        # Files chosen on the New Object page and the running Registration
+        self.new_object_files = {}
+        self.registration = None
+
+        # The running bulk relocation; the next tag names a location while expecting_location is set
+        self.relocation = None
+        self.expecting_location = True
+
+        self.reader = reader
+        if reader is not None:
+            reader.start()
+            reader.poll(root, self.on_tag)
+
+        self.flow.start()
+
+        # Idle callbacks run after the pending redraws, so this one marks the first paint
+        root.after_idle(self.start_warm_up)
+
+    # ---- Startup ----
+
+    def connect(self, rest):
+        """Wire up a Rest client; on the Tk thread."""
+        from async_rest import AsyncRest, TkAsyncBridge
+
+        self.async_rest = AsyncRest(rest)
+        self.bridge = TkAsyncBridge(self.root)
+        self.image_cache = ImageCache(rest)
+        self.prefetcher = Prefetcher(rest, self.image_cache)
+
+    def start_warm_up(self):
+        """Runs once the starting page is painted: create the client in the background and prebuild the screens."""
+        if self.profiler is not None:
+            self.profiler.mark('first_paint')
+        if self.rest_factory is not None and self.async_rest is None:
+            self.start_warm_up_thread()
+        self.root.after(50, self.finish_warm_up)
+
+    def start_warm_up_thread(self):
+        """Create the client on a background thread."""
+        self.warm_up_error = None
+        self.warm_up_thread = threading.Thread(target=self.warm_up, name='warm-up', daemon=True)
+        self.warm_up_thread.start()
+
+    def warm_up(self):
+        """Warm-up thread: import and create the client and open its connections; a failure is kept for the Tk thread."""
+        try:
+            if self.warm_rest is None:
+                self.warm_rest = self.rest_factory()
+                if self.profiler is not None:
+                    self.profiler.mark('rest_created')
+            self.warm_rest.warm_up()
+            if self.profiler is not None:
+                self.profiler.mark('connections_open')
+            if self.capture is not None:
+                import camera  # noqa: F401 - loads NumPy before the first object is scanned
+        except Exception as error:
+            self.warm_up_failed_at = time.monotonic()
+            self.warm_up_error = error
+
+    def finish_warm_up(self):
+        """Build one screen per call so the starting page stays responsive, then connect the client."""
+        if self.screens.prebuild_next():  # also creates the fonts the screens use
+            self.root.after(1, self.finish_warm_up)
+            return
+        if self.profiler is not None:
+            self.profiler.mark('screens_built')
+        if self.warm_up_thread is not None and self.warm_up_thread.is_alive():
+            self.root.after(50, self.finish_warm_up)
+            return
+        self.rest_ready()
+        if self.profiler is not None:
+            self.profiler.mark('warm')
+            self.profiler.finish()
+
+    def rest_ready(self):
+        """
+        Whether the client is connected; connects it once the warm-up thread has finished.
+
+        If the warm-up could not create the client, the station shows that it
+        is offline and the warm-up is retried on a new thread every
+        WARM_UP_RETRY_S seconds; the Tk thread never creates the client itself.
+        """
+        if self.async_rest is not None:
+            return True
+        if self.warm_up_thread is None or self.warm_up_thread.is_alive():
+            return False
+        if self.warm_rest is None:
+            self.show_status(f"Server unavailable, retrying: {self.warm_up_error}")
+            if time.monotonic() - self.warm_up_failed_at >= self.WARM_UP_RETRY_S:
+                self.start_warm_up_thread()
+            return False
+        self.connect(self.warm_rest)
+        self.show_status("")
+        return True
+
+    def wait_for_rest(self, task, *args):
+        """
+        Return whether the client is connected; if not, run task(*args) again once it may be.
+
+        The Tk thread never waits for the warm-up: the task is polled with the
+        scheduler, so it is dropped if the user leaves the screen meanwhile.
+        """
+        if self.rest_ready():
+            return True
+        self.scheduler.after(50, task, *args)
+        return False
+
+    def show_status(self, text):
+        """Show text in a status line below the screens; an empty text hides it."""
+        if self.status_label is None:
+            if not text:
+                return
+            self.status_label = ctk.CTkLabel(self.root, text="", font=self.font(16), text_color="red")
+        if text:
+            self.status_label.configure(text=text)
+            self.status_label.grid(row=1, column=0, pady=5)
+        else:
+            self.status_label.grid_remove()
+
+    def font(self, size):
+        """Shared font of the given size."""
+        return self.screens.font(size)
+
+    def send(self, event):
+        """Button command that dispatches event to the flow."""
+        return lambda: self.flow.dispatch(event)
 
     def starting_page(self):
         """Starting page with buttons to begin scan object or scan box flow."""
-        self.clear_frame()
+        self.show_screen("starting")
 
+    def build_starting_page(self, frame):
         # Title
-        label = ctk.CTkLabel(self.root, text="Starting Page", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Starting Page", font=self.font(24))
         label.pack(pady=20)
 
         # Buttons for Scan Object and Scan Box
-        scan_object_btn = ctk.CTkButton(self.root, text="Scan Object", font=ctk.CTkFont(size=20), width=300, height=60, command=self.scanning_page)
+        scan_object_btn = ctk.CTkButton(frame, text="Scan Object", font=self.font(20), width=300, height=60, command=self.send("scan_object"))
         scan_object_btn.pack(pady=10)
 
-        scan_box_btn = ctk.CTkButton(self.root, text="Scan Box", font=ctk.CTkFont(size=20), width=300, height=60, command=self.scan_box_page)
+        scan_box_btn = ctk.CTkButton(frame, text="Scan Box", font=self.font(20), width=300, height=60, command=self.send("scan_box"))
         scan_box_btn.pack(pady=10)
 
-        new_object_btn = ctk.CTkButton(self.root, text="New Object", font=ctk.CTkFont(size=20), width=300, height=60)
+        new_object_btn = ctk.CTkButton(frame, text="New Object", font=self.font(20), width=300, height=60, command=self.send("new_object"))
         new_object_btn.pack(pady=10)
 
-        change_location_btn = ctk.CTkButton(self.root, text="Change Box Location", font=ctk.CTkFont(size=20), width=300, height=60)
+        change_location_btn = ctk.CTkButton(frame, text="Change Box Location", font=self.font(20), width=300, height=60, command=self.send("change_location"))
         change_location_btn.pack(pady=10)
 
     # ---- Scan Object Flow ----
 
     def scanning_page(self):
         """This method will handle the 'Scan Object' functionality."""
-        self.clear_frame()
+        self.show_screen("scanning")
 
+        # Show the countdown; the flow moves on when it times out
+        self.scheduler.countdown(3, self.countdown)
+
+    def build_scanning_page(self, frame):
         # Display countdown for starting object scanning
-        self.countdown_label = ctk.CTkLabel(self.root, text="Starting object scanning in 3, 2, 1...", font=ctk.CTkFont(size=24))
+        self.countdown_label = ctk.CTkLabel(frame, text="Starting object scanning in 3, 2, 1...", font=self.font(24))
         self.countdown_label.pack(pady=20)
 
-        # Start the countdown and transition to the next phase
-        self.countdown(3)
-
         # Add bottom buttons (scan type = object)
-        self.add_bottom_buttons(scan_type="object")
+        self.add_bottom_buttons(frame, scan_type="object")
 
     def countdown(self, count):
         """Countdown for object scanning."""
-        if count > 0 and self.countdown_label.winfo_exists():
-            self.countdown_label.configure(text=f"Starting object scanning in {count}...")
-            self.countdown_job = self.root.after(1000, self.countdown, count - 1)
-        else:
-            self.taking_pictures_page()
+        self.countdown_label.configure(text=f"Starting object scanning in {count}...")
 
     def taking_pictures_page(self):
         """Simulate taking pictures."""
-        self.clear_frame()
+        self.show_screen("taking_pictures")
 
+        self.progress['value'] = 0
+
+    def build_taking_pictures_page(self, frame):
         # Progress bar for taking pictures
-        label = ctk.CTkLabel(self.root, text="Taking pictures...", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Taking pictures...", font=self.font(24))
         label.pack(pady=20)
 
-        progress = ttk.Progressbar(self.root, orient='horizontal', mode='determinate', length=300)
-        progress.pack(pady=10)
-
-        self.update_progress(progress)
+        self.progress = ttk.Progressbar(frame, orient='horizontal', mode='determinate', length=300)
+        self.progress.pack(pady=10)
 
         # Add bottom buttons (scan type = object)
-        self.add_bottom_buttons(scan_type="object")
+        self.add_bottom_buttons(frame, scan_type="object")
+
+    def capture_pictures(self, emit):
+        """Flow task of the taking pictures state."""
+        if self.capture is None:
+            self.update_progress(self.progress, emit)
+            return
+        self.pipeline = self.capture()
+        self.pipeline.start()
+        self.poll_capture(self.pipeline, emit)
+
+    def poll_capture(self, pipeline, emit):
+        """Follow the real capture progress; the evaluation goes on on the next page."""
+        self.progress['value'] = 100 * pipeline.progress()
+        if pipeline.done or pipeline.captured >= pipeline.count:
+            emit("captured")
+        else:
+            self.scheduler.after(pipeline.POLL_INTERVAL_MS, self.poll_capture, pipeline, emit)
 
-    def update_progress(self, progress):
+    def update_progress(self, progress, emit):
         """Simulate progress for taking pictures."""
         progress['value'] += 20
         if progress['value'] < 100:
-            self.root.after(500, self.update_progress, progress)
+            self.scheduler.after(500, self.update_progress, progress, emit)
         else:
-            self.evaluating_pictures_page()
+            emit("captured")
 
     def evaluating_pictures_page(self):
-        """Evaluating pictures after taking them."""
-        self.clear_frame()
+        """Evaluating pictures after taking them; the flow returns to the start once they are evaluated."""
+        self.show_screen("evaluating_pictures")
+        self.evaluation_label.configure(text="")
+
+    def evaluate_pictures(self, emit):
+        """Flow task of the evaluating pictures state."""
+        if self.pipeline is None:
+            self.scheduler.after(2000, emit, "evaluated")  # simulated
+            return
+        self.poll_evaluation(self.pipeline, emit)
+
+    def poll_evaluation(self, pipeline, emit):
+        """Follow the evaluation, then show its result for 2 seconds before reporting it to the flow."""
+        if not pipeline.done:
+            self.evaluation_label.configure(text=f"{pipeline.evaluated} of {pipeline.captured} pictures evaluated")
+            self.scheduler.after(pipeline.POLL_INTERVAL_MS, self.poll_evaluation, pipeline, emit)
+            return
+        pictures = pipeline.usable()
+        if pipeline.error:
+            self.evaluation_label.configure(text=f"Capture failed: {pipeline.error}")
+        else:
+            self.evaluation_label.configure(text=f"{len(pictures)} of {len(pipeline.results)} pictures usable")
+        self.scheduler.after(2000, lambda: emit("evaluated", pictures=pictures, captured=len(pipeline.results),
+                                                capture_error=pipeline.error))
 
+    def build_evaluating_pictures_page(self, frame):
         # Evaluating pictures with a loading icon
-        label = ctk.CTkLabel(self.root, text="Evaluating pictures...", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Evaluating pictures...", font=self.font(24))
         label.pack(pady=20)
 
-        loading_label = ctk.CTkLabel(self.root, text="⌛", font=ctk.CTkFont(size=24))  # Simulated spinner/loading icon
+        loading_label = ctk.CTkLabel(frame, text="⌛", font=self.font(24))  # Simulated spinner/loading icon
         loading_label.pack(pady=10)
 
-        self.root.after(2000, self.starting_page)  # Return to the starting page after a delay
+        self.evaluation_label = ctk.CTkLabel(frame, text="", font=self.font(20))
+        self.evaluation_label.pack(pady=10)
 
         # Add bottom buttons (scan type = object)
-        self.add_bottom_buttons(scan_type="object")
+        self.add_bottom_buttons(frame, scan_type="object")
 
     # ---- Scan Box Flow ----
 
     def scan_box_page(self):
         """Hold box on the RFID Reader page for scan box path."""
-        self.clear_frame()
+        self.show_screen("scan_box")
 
+    def build_scan_box_page(self, frame):
         # Message to hold box on the RFID Reader
-        label = ctk.CTkLabel(self.root, text="Hold box on the RFID Reader\n\nScanning...", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Hold box on the RFID Reader\n\nScanning...", font=self.font(24))
         label.pack(pady=20)
 
-        # Simulate scanning delay before transitioning to searching
-        self.root.after(2000, self.searching_for_box_page)
-
         # Add bottom buttons (scan type = box)
-        self.add_bottom_buttons(scan_type="box")
+        self.add_bottom_buttons(frame, scan_type="box")
+
+    def on_tag(self, tag):
+        """Start the box search as soon as the reader delivers a tag."""
+        if self.flow.current == "relocating":
+            self.on_relocation_tag(tag)
+        elif self.flow.can_handle("tag"):
+            self.rfid_code = tag
+            self.flow.dispatch("tag", rfid=tag)
 
     def searching_for_box_page(self):
         """Searching for box with loading spinner."""
-        self.clear_frame()
-
+        self.show_screen("searching_for_box")
+
+    def lookup_box(self, emit):
+        """Flow task of the searching state: look the box up in the background."""
+        if not self.wait_for_rest(self.lookup_box, emit):
+            return
+        self.flow.context.pop("box", None)
+        self.bridge.submit(self.async_rest.search_for_box_with_rfid(self.rfid_code),
+                           lambda result: self.on_box_search_result(result, emit),
+                           lambda error: emit("not_found"))
+
+    def build_searching_for_box_page(self, frame):
         # Message to indicate searching
-        label = ctk.CTkLabel(self.root, text="Searching for box...", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Searching for box...", font=self.font(24))
         label.pack(pady=20)
 
         # Add a spinning/loading icon (represented by "" here, you can customize this)
-        loading_label = ctk.CTkLabel(self.root, text="", font=ctk.CTkFont(size=24))
+        loading_label = ctk.CTkLabel(frame, text="", font=self.font(24))
         loading_label.pack(pady=10)
 
-        # Simulate a short delay for the search process
-        self.root.after(2000, self.box_found_page)
+        # Add bottom buttons (scan type = box)
+        self.add_bottom_buttons(frame, scan_type="box")
+
+    def on_box_search_result(self, result, emit):
+        """Report a box lookup to the flow, which ignores it if the user has left the search page."""
+        if isinstance(result, list):
+            result = result[0] if result else None  # a tag names one box; the server may still answer with a list
+        if result is None or isinstance(result, str):
+            emit("not_found")
+            return
+        self.box_prefetch = self.prefetcher.start(result)
+        emit("found", box=result)
+
+    def box_not_found_page(self):
+        """Tell the user that no box belongs to the scanned tag."""
+        self.show_screen("box_not_found")
+        self.not_found_label.configure(text=f"No box found for tag {self.rfid_code}")
+
+    def build_box_not_found_page(self, frame):
+        self.not_found_label = ctk.CTkLabel(frame, text="No box found", font=self.font(24))
+        self.not_found_label.pack(pady=20)
 
         # Add bottom buttons (scan type = box)
-        self.add_bottom_buttons(scan_type="box")
+        self.add_bottom_buttons(frame, scan_type="box")
 
     def box_found_page(self):
         """Box found page with localization countdown."""
-        self.clear_frame()
+        self.show_screen("box_found")
+        self.box_name_label.configure(text=f"Box Name: {self.box_label()}")
+        self.show_box_image()
+
+    def show_box_image(self):
+        """Show the item and its picture once prefetched, polling while they are still loading."""
+        prefetch = self.box_prefetch
+        if prefetch is None:
+            self.item_label.configure(text="")
+            self.box_image.configure(image=None, text="[Box Image Placeholder]")
+            return
+        item, picture_name = prefetch.result('item'), prefetch.result('picture')
+        item_name = item.item_name if isinstance(item, Item) else None
+        self.item_label.configure(text=f"Item: {item_name}" if item_name else "")
+        image = None
+        if picture_name and not picture_name.startswith("Error"):
+            image = self.image_cache.thumbnail(prefetch.box['item_id'], picture_name)
+        if image is not None:
+            self.box_image.configure(image=image, text="")
+        else:
+            self.box_image.configure(image=None, text="[Box Image Placeholder]")
+        if any(name in prefetch.futures and not prefetch.done(name) for name in ('item', 'picture')):
+            self.scheduler.after(50, self.show_box_image)
 
+    def build_box_found_page(self, frame):
         # Display that the box is found
-        label = ctk.CTkLabel(self.root, text="Box Found!", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Box Found!", font=self.font(24))
         label.pack(pady=10)
 
-        # Simulate displaying a box image or label
-        box_image = ctk.CTkLabel(self.root, text="[Box Image Placeholder]", font=ctk.CTkFont(size=24))
-        box_image.pack(pady=10)
+        # The item picture replaces the placeholder once it is loaded
+        self.box_image = ctk.CTkLabel(frame, text="[Box Image Placeholder]", font=self.font(24))
+        self.box_image.pack(pady=10)
+
+        self.box_name_label = ctk.CTkLabel(frame, text="Box Name: Example Box", font=self.font(20))
+        self.box_name_label.pack(pady=10)
 
-        box_name = ctk.CTkLabel(self.root, text="Box Name: Example Box", font=ctk.CTkFont(size=20))
-        box_name.pack(pady=10)
+        self.item_label = ctk.CTkLabel(frame, text="", font=self.font(20))
+        self.item_label.pack(pady=10)
 
         # Start localization countdown in 3 seconds
-        localization_label = ctk.CTkLabel(self.root, text="Localization starting in 3, 2, 1...", font=ctk.CTkFont(size=20))
+        localization_label = ctk.CTkLabel(frame, text="Localization starting in 3, 2, 1...", font=self.font(20))
         localization_label.pack(pady=10)
 
-        # Delay before starting localization process
-        self.root.after(3000, self.localization_page)
-
         # Add bottom buttons (scan type = box)
-        self.add_bottom_buttons(scan_type="box")
+        self.add_bottom_buttons(frame, scan_type="box")
 
     def localization_page(self):
         """Localization process with countdown timer."""
-        self.clear_frame()
+        self.show_screen("localization")
+        self.show_location()
+
+        self.scheduler.countdown(60, self.localization_countdown)  # The flow returns to the start at zero
 
+    def build_localization_page(self, frame):
         # Display localization message
-        label = ctk.CTkLabel(self.root, text="Localization end in 60s", font=ctk.CTkFont(size=24))
+        label = ctk.CTkLabel(frame, text="Localization end in 60s", font=self.font(24))
         label.pack(pady=10)
 
         # Simulate a 60-second countdown timer for localization
-        self.localization_countdown_label = ctk.CTkLabel(self.root, text="60", font=ctk.CTkFont(size=20))
+        self.localization_countdown_label = ctk.CTkLabel(frame, text="60", font=self.font(20))
         self.localization_countdown_label.pack(pady=10)
 
-        self.localization_countdown(60)
+        self.location_label = ctk.CTkLabel(frame, text="", font=self.font(20))
+        self.location_label.pack(pady=10)
 
         # Add bottom buttons (scan type = box, with or without Go Now button)
-        self.add_bottom_buttons(scan_type="box", extra_button=True)
+        self.add_bottom_buttons(frame, scan_type="box", extra_button=True)
+
+    def show_location(self):
+        """Show where the box belongs once the location is prefetched, polling while it is loading."""
+        prefetch = self.box_prefetch
+        location = prefetch.result('location') if prefetch is not None else None
+        if isinstance(location, Location):
+            name = location.location_name or f"Location {location.location_id}"
+            self.location_label.configure(text=f"Location: {name}")
+        else:
+            self.location_label.configure(text="")
+            if prefetch is not None and 'location' in prefetch.futures and not prefetch.done('location'):
+                self.scheduler.after(50, self.show_location)
 
     def localization_countdown(self, count):
         """Count down for 60 seconds and update the label."""
-        if count > 0 and self.localization_countdown_label.winfo_exists():
-            self.localization_countdown_label.configure(text=str(count))
-            self.localization_job = self.root.after(1000, self.localization_countdown, count - 1)
+        self.localization_countdown_label.configure(text=str(count))
+
+    def box_label(self):
+        """Name shown for the current box."""
+        box = self.flow.context.get("box")
+        if not box:
+            return "Example Box"
+        return box.get('box_label_name') or f"Box {box.get('box_id', self.rfid_code)}"
+
+    # ---- New Object Flow ----
+
+    def new_object_page(self):
+        """Form for the name and files of a new item."""
+        self.show_screen("new_object")
+        self.new_object_files = {}
+        self.item_name_entry.delete(0, "end")
+        self.picture_btn.configure(text="Choose Picture...")
+        self.datasheet_btn.configure(text="Choose Datasheet...")
+        self.new_object_error.configure(text="")
+        pictures = self.flow.context.get("pictures") or []
+        self.training_label.configure(text=f"{len(pictures)} captured pictures will be used for training" if pictures
+                                      else "Scan the object first to add training pictures")
+
+    def build_new_object_page(self, frame):
+        label = ctk.CTkLabel(frame, text="New Object", font=self.font(24))
+        label.pack(pady=10)
+
+        self.item_name_entry = ctk.CTkEntry(frame, placeholder_text="Item name", font=self.font(20), width=400)
+        self.item_name_entry.pack(pady=10)
+
+        self.picture_btn = ctk.CTkButton(frame, text="Choose Picture...", font=self.font(20), width=400,
+                                         command=lambda: self.choose_file("picture", self.picture_btn,
+                                                                          [("Images", "*.jpg *.jpeg *.png")]))
+        self.picture_btn.pack(pady=10)
+
+        self.datasheet_btn = ctk.CTkButton(frame, text="Choose Datasheet...", font=self.font(20), width=400,
+                                           command=lambda: self.choose_file("datasheet", self.datasheet_btn,
+                                                                            [("PDF", "*.pdf")]))
+        self.datasheet_btn.pack(pady=10)
+
+        self.training_label = ctk.CTkLabel(frame, text="", font=self.font(16))
+        self.training_label.pack(pady=5)
+
+        self.new_object_error = ctk.CTkLabel(frame, text="", font=self.font(16), text_color="red")
+        self.new_object_error.pack(pady=5)
+
+        register_btn = ctk.CTkButton(frame, text="Register", font=self.font(20), width=200, command=self.submit_new_object)
+        register_btn.pack(pady=10)
+
+        self.add_bottom_buttons(frame, scan_type="object")
+
+    def choose_file(self, kind, button, filetypes):
+        """Let the user pick the picture or datasheet of the new item."""
+        path = filedialog.askopenfilename(parent=self.root, filetypes=filetypes)
+        if path:
+            self.new_object_files[kind] = path
+            button.configure(text=os.path.basename(path))
+
+    def submit_new_object(self):
+        """Start the registration with the form data."""
+        name = self.item_name_entry.get().strip()
+        if not name:
+            self.new_object_error.configure(text="Please enter a name")
+            return
+        frames = [frame for frame in self.flow.context.get("pictures") or [] if frame.path]
+        picture = self.new_object_files.get("picture")
+        if picture is None and frames:
+            # Without a chosen picture the sharpest capture becomes the item picture
+            picture = max(frames, key=lambda frame: frame.sharpness).path
+        self.flow.dispatch("register", new_object={"item": {"item_name": name}, "picture": picture,
+                                                   "datasheet": self.new_object_files.get("datasheet"),
+                                                   "training_pictures": [frame.path for frame in frames] or None})
+
+    def registering_page(self):
+        """Per-stage progress of the registration."""
+        self.show_screen("registering")
+        self.registration_progress['value'] = 0
+        for name, label in self.stage_labels.items():
+            label.configure(text=f"{name.capitalize()}: pending")
+
+    def build_registering_page(self, frame):
+        label = ctk.CTkLabel(frame, text="Registering new object...", font=self.font(24))
+        label.pack(pady=20)
+
+        self.registration_progress = ttk.Progressbar(frame, orient='horizontal', mode='determinate', length=300)
+        self.registration_progress.pack(pady=10)
+
+        self.stage_labels = {}
+        for name in ('insert', 'picture', 'datasheet', 'training'):
+            self.stage_labels[name] = ctk.CTkLabel(frame, text="", font=self.font(18))
+            self.stage_labels[name].pack(pady=2)
+
+        self.add_bottom_buttons(frame, scan_type="object")
+
+    def register_item(self, emit):
+        """Flow task of the registering state; the registration finishes even if the user leaves the page."""
+        if not self.wait_for_rest(self.register_item, emit):
+            return
+        self.registration = Registration(self.async_rest.rest, **self.flow.context["new_object"]).start()
+        self.poll_registration(self.registration, emit)
+
+    def poll_registration(self, registration, emit):
+        """Follow the stages of the registration."""
+        self.registration_progress['value'] = 100 * registration.progress()
+        summary = registration.summary()
+        for name, label in self.stage_labels.items():
+            stage = summary.get(name)
+            if stage is None:
+                label.configure(text=f"{name.capitalize()}: -")
+            elif stage['state'] == Stage.RETRYING:
+                label.configure(text=f"{name.capitalize()}: retrying (attempt {stage['attempts'] + 1})")
+            else:
+                label.configure(text=f"{name.capitalize()}: {stage['state']}")
+        if registration.done:
+            emit("registered")
+        else:
+            self.scheduler.after(Registration.POLL_INTERVAL_MS, self.poll_registration, registration, emit)
+
+    def registration_done_page(self):
+        """Result of the registration; the flow returns to the start after a delay."""
+        self.show_screen("registration_done")
+        registration = self.registration
+        if registration is None or not registration.done:
+            self.registration_label.configure(text="Object registered")
+        elif registration.item_id is None:
+            self.registration_label.configure(text=f"Registration failed: {registration.stages['insert'].error}")
+        elif registration.ok:
+            text = f"Item {registration.item_id} registered in {registration.seconds:.1f} s"
+            queued = [name for name, stage in registration.stages.items() if stage.state == Stage.QUEUED]
+            if queued:
+                text += f"; {', '.join(queued)} will be uploaded in the background"
+            self.registration_label.configure(text=text)
         else:
-            self.starting_page()  # After the countdown, go back to the starting page.
+            failed = ", ".join(name for name, stage in registration.stages.items() if not stage.succeeded)
+            self.registration_label.configure(text=f"Item {registration.item_id} registered without: {failed}")
+
+    def build_registration_done_page(self, frame):
+        self.registration_label = ctk.CTkLabel(frame, text="", font=self.font(24), wraplength=900)
+        self.registration_label.pack(pady=20)
+
+        self.add_bottom_buttons(frame, scan_type="object")
+
+    # ---- Change Box Location Flow ----
+
+    def relocation_page(self):
+        """Scan a location, then any number of boxes that are moved there."""
+        self.show_screen("relocating")
+        self.expecting_location = True
+        self.relocation_location_label.configure(text="Scan a location tag or enter its ID")
+        self.relocation_last_label.configure(text="")
+        self.relocation_counts_label.configure(text="")
+
+    def build_relocation_page(self, frame):
+        label = ctk.CTkLabel(frame, text="Change Box Location", font=self.font(24))
+        label.pack(pady=10)
+
+        self.relocation_location_label = ctk.CTkLabel(frame, text="", font=self.font(20))
+        self.relocation_location_label.pack(pady=10)
+
+        entry_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        entry_frame.pack(pady=5)
+        self.location_entry = ctk.CTkEntry(entry_frame, placeholder_text="Location ID", font=self.font(20), width=250)
+        self.location_entry.pack(side="left", padx=5)
+        set_location_btn = ctk.CTkButton(entry_frame, text="Set Location", font=self.font(20), width=150,
+                                         command=lambda: self.choose_location(self.location_entry.get().strip()))
+        set_location_btn.pack(side="left", padx=5)
+        new_location_btn = ctk.CTkButton(entry_frame, text="Scan New Location", font=self.font(20), width=200,
+                                         command=self.expect_location)
+        new_location_btn.pack(side="left", padx=5)
+
+        self.relocation_last_label = ctk.CTkLabel(frame, text="", font=self.font(20))
+        self.relocation_last_label.pack(pady=10)
+
+        self.relocation_counts_label = ctk.CTkLabel(frame, text="", font=self.font(18))
+        self.relocation_counts_label.pack(pady=10)
+
+        done_btn = ctk.CTkButton(frame, text="Done", font=self.font(20), width=200, command=self.send("done"))
+        done_btn.pack(pady=10)
+
+        self.add_bottom_buttons(frame, scan_type="box")
+
+    def start_relocation(self, emit):
+        """Flow task of the relocating state: buffer scans and flush them in the background."""
+        if not self.wait_for_rest(self.start_relocation, emit):
+            return
+        if self.relocation is not None:
+            self.relocation.finish()
+        self.relocation = Relocation(self.async_rest.rest).start()
+        self.poll_relocation(self.relocation)
+
+    def poll_relocation(self, relocation):
+        """Show how many of the scanned boxes the server has confirmed."""
+        counts = relocation.counts()
+        confirmed = counts[BoxMove.MOVED] + counts[BoxMove.UNCHANGED]
+        self.relocation_counts_label.configure(
+            text=f"{len(relocation.moves)} scanned, {confirmed} confirmed, "
+                 f"{counts[BoxMove.QUEUED] + counts[BoxMove.WRITING]} pending, "
+                 f"{counts[BoxMove.NOT_FOUND] + counts[BoxMove.FAILED]} failed")
+        self.scheduler.after(200, self.poll_relocation, relocation)
+
+    def expect_location(self):
+        """Treat the next tag as a location."""
+        self.expecting_location = True
+        self.relocation_location_label.configure(text="Scan a location tag or enter its ID")
+
+    def on_relocation_tag(self, tag):
+        """A tag is either the target location or a box to move there."""
+        if self.relocation is None:
+            return
+        if self.expecting_location:
+            self.choose_location(tag)
+            return
+        move = self.relocation.scan(tag)
+        if move is not None:
+            self.relocation_last_label.configure(text=f"Box {tag} queued")
+
+    def choose_location(self, location_id):
+        """Look up a location in the background and move the boxes scanned next there."""
+        if not location_id or self.relocation is None:
+            return
+        self.relocation_location_label.configure(text=f"Looking up location {location_id}...")
+        self.bridge.submit(self.async_rest.search_for_location_by_id(location_id), self.on_location_result,
+                           lambda error: self.on_location_result(f"Error - {error}"))
+
+    def on_location_result(self, location):
+        """Make the looked up location the target of the next scans."""
+        if self.flow.current != "relocating":
+            return
+        if not isinstance(location, Location):
+            self.relocation_location_label.configure(text=f"Location not found: {location}")
+            return
+        self.relocation.set_location(location.location_id)
+        self.expecting_location = False
+        name = location.location_name or f"Location {location.location_id}"
+        self.relocation_location_label.configure(text=f"Moving boxes to {name} - scan the boxes")
+
+    def relocation_done_page(self):
+        """Summary of the relocation; the flow returns to the start after a delay."""
+        self.show_screen("relocation_done")
+        self.relocation_done_label.configure(text="No boxes moved" if self.relocation is None
+                                             else "Saving the last boxes...")
+
+    def build_relocation_done_page(self, frame):
+        self.relocation_done_label = ctk.CTkLabel(frame, text="", font=self.font(24), wraplength=900)
+        self.relocation_done_label.pack(pady=20)
+
+        self.add_bottom_buttons(frame, scan_type="box")
+
+    def finish_relocation(self, emit):
+        """Flow task of the relocation done state: flush the buffer and report per-box results."""
+        if self.relocation is not None:
+            self.relocation.finish()
+            self.poll_relocation_done(self.relocation)
+
+    def poll_relocation_done(self, relocation):
+        if not relocation.done:
+            self.scheduler.after(200, self.poll_relocation_done, relocation)
+            return
+        counts = relocation.counts()
+        text = (f"{counts[BoxMove.MOVED]} boxes moved, {counts[BoxMove.UNCHANGED]} already there "
+                f"({relocation.seconds:.1f} s of network time)")
+        failed = [move.rfid for move in relocation.moves.values() if move.state in (BoxMove.NOT_FOUND, BoxMove.FAILED)]
+        if failed:
+            text += f"\nNot moved: {', '.join(failed[:10])}" + (" ..." if len(failed) > 10 else "")
+        self.relocation_done_label.configure(text=text)
 
     # ---- General Functions ----
 
-    def add_bottom_buttons(self, scan_type="box", extra_button=False):
+    def add_bottom_buttons(self, frame, scan_type="box", extra_button=False):
         """This method adds the bottom buttons for exit and scan."""
-        button_frame = ctk.CTkFrame(self.root)
+        button_frame = ctk.CTkFrame(frame)
         button_frame.pack(side="bottom", fill="x", padx=20, pady=10)
 
-        exit_button = ctk.CTkButton(button_frame, text="X", font=ctk.CTkFont(size=20), command=self.starting_page, width=80)
+        exit_button = ctk.CTkButton(button_frame, text="X", font=self.font(20), command=self.send("cancel"), width=80)
         exit_button.pack(side="left", padx=10)
 
         if scan_type == "object":
-            scan_button = ctk.CTkButton(button_frame, text="Scan Object", font=ctk.CTkFont(size=20), command=self.scanning_page, width=200)
+            scan_button = ctk.CTkButton(button_frame, text="Scan Object", font=self.font(20), command=self.send("scan_object"), width=200)
         else:
-            scan_button = ctk.CTkButton(button_frame, text="Scan Box", font=ctk.CTkFont(size=20), command=self.scan_box_page, width=200)
+            scan_button = ctk.CTkButton(button_frame, text="Scan Box", font=self.font(20), command=self.send("scan_box"), width=200)
 
         scan_button.pack(side="right", padx=10)
 
         if extra_button:
             # Add the "Go Now" button during localization
-            go_now_button = ctk.CTkButton(button_frame, text="Go Now", font=ctk.CTkFont(size=20), command=self.starting_page, width=150)
+            go_now_button = ctk.CTkButton(button_frame, text="Go Now", font=self.font(20), command=self.send("go_now"), width=150)
             go_now_button.pack(side="right", padx=10)
 
-    def clear_frame(self):
-        """Clear all the widgets from the root window and cancel any pending jobs."""
-        if self.countdown_job:
-            self.root.after_cancel(self.countdown_job)
-            self.countdown_job = None
-        if self.localization_job:
-            self.root.after_cancel(self.localization_job)
-            self.localization_job = None
+    def show_screen(self, name):
+        """Cancel the jobs of the current screen and raise the screen called name."""
+        self.scheduler.enter(name)
+        if self.pipeline is not None and name != "evaluating_pictures":
+            self.pipeline.cancel()  # a no-op once the capture has finished
+            self.pipeline = None
+        if self.relocation is not None and name not in ("relocating", "relocation_done"):
+            self.relocation.finish()  # scanned boxes are still saved when the user leaves
+            self.relocation = None
+        return self.screens.show(name)
+
+    def close(self):
+        """Stop the background lookups once the mainloop has ended."""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.image_cache is not None:
+            self.image_cache.close()
+        if self.async_rest is not None:
+            self.async_rest.close()
+
+def create_reader(args):
+    """Create the RFID reader selected on the command line, if any."""
+    if args.rfid_serial:
+        return RfidReader(SerialTagSource(args.rfid_serial, args.rfid_baudrate), debounce=args.rfid_debounce)
+    if args.rfid_replay:
+        return RfidReader(ReplayTagSource(args.rfid_replay), debounce=args.rfid_debounce)
+    if args.rfid_stdin:
+        return RfidReader(StdinTagSource(), debounce=args.rfid_debounce)
+    return None
+
+
+def create_capture(args):
+    """Create the factory for capture pipelines selected on the command line, if any."""
+    if args.camera is None and not args.camera_dir:
+        return None
+    pools = []  # the evaluation pool, shared by every capture once the first one created it
+
+    def capture():
+        # NumPy is not needed for the first paint
+        from camera import CapturePipeline, DirectorySource, V4L2Source, evaluation_pool
+
+        if args.camera is not None:
+            source = V4L2Source(int(args.camera) if args.camera.isdigit() else args.camera)
+        else:
+            source = DirectorySource(args.camera_dir)
+        if not pools:
+            pools.append(evaluation_pool())
+        # Every capture saves its frames in a directory of its own, so it never overwrites or reuses another's
+        output_dir = os.path.join(args.pictures_dir, time.strftime('%Y-%m-%d'),
+                                  f"{time.strftime('%H%M%S')}_{uuid.uuid4().hex[:8]}")
+        return CapturePipeline(source, count=args.pictures, output_dir=output_dir, pool=pools[0])
+
+    return capture
+
+
+def create_rest_factory(args, metrics, profiler):
+    """Return a function creating the Rest client, importing requests only when it is called."""
+    if not args.server:
+        return None
+
+    def create_rest():
+        with profiler.phase('import rest'):
+            from rest import Rest
+        options = {}
+        if args.upload_queue:
+            # Uploads are queued on disk and sent by a background worker, surviving restarts
+            from upload_queue import UploadQueue, UploadWorker
+
+            options['upload_queue'] = UploadQueue(os.path.join(args.upload_queue, 'uploads.sqlite3'),
+                                                  os.path.join(args.upload_queue, 'spool'))
+        store = None
+        if args.store:
+            from local_store import LocalStore
+            from search_index import ItemSearchIndex
+
+            store = LocalStore(args.store)
+            options['search_index'] = ItemSearchIndex(store.all_records('item'))
+        rest = client = Rest(server=args.server, metrics=metrics, **options)
+        if store is not None:
+            # Offline-first: reads come from the local copy, writes are journaled and synced in the background
+            from local_store import OfflineRest
+
+            client = OfflineRest(rest, store)
+        # The background threads start last, so a failed attempt leaves none behind for the retry
+        if args.upload_queue:
+            rest.upload_worker = UploadWorker(rest, options['upload_queue'])
+            rest.upload_worker.start()
+        if store is not None:
+            client.start_sync()
+        return client
+
+    return create_rest
+
+
+def create_metrics(args):
+    """Create the metrics exporters selected on the command line, if any."""
+    if args.metrics_port is None and not args.metrics_file and not args.trace_file:
+        return None
+    metrics = Metrics(station=args.station, trace=TraceLog(args.trace_file) if args.trace_file else None)
+    if args.metrics_port is not None:
+        metrics.serve(args.metrics_port)
+    if args.metrics_file:
+        metrics.start_textfile_export(args.metrics_file)
+    return metrics
 
-        for widget in self.root.winfo_children():
-            widget.destroy()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inventory Finder station")
+    parser.add_argument('--server', help="Base URL of the inventory API; without it lookups are simulated")
+    parser.add_argument('--store', metavar='FILE', help="Keep an offline copy of the inventory in this SQLite file")
+    parser.add_argument('--upload-queue', metavar='DIR',
+                        help="Queue uploads in this directory and send them in the background")
+    parser.add_argument('--rfid-serial', metavar='PORT', help="Serial device of the RFID reader")
+    parser.add_argument('--rfid-baudrate', type=int, default=9600)
+    parser.add_argument('--rfid-replay', metavar='FILE', help="Replay recorded tags from a file")
+    parser.add_argument('--rfid-stdin', action='store_true', help="Read tags from standard input")
+    parser.add_argument('--rfid-debounce', type=float, default=1.0, help="Seconds to ignore repeated reads of a tag")
+    parser.add_argument('--camera', metavar='DEVICE', help="V4L2 camera index or device path")
+    parser.add_argument('--camera-dir', metavar='DIR', help="Use the images of a directory as camera frames")
+    parser.add_argument('--pictures', type=int, default=10, help="Number of pictures taken per object")
+    parser.add_argument('--pictures-dir', default='images/original', help="Where usable pictures are saved")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument('--metrics-file', metavar='FILE', help="Write Prometheus metrics to this text file")
+    parser.add_argument('--trace-file', metavar='FILE', help="Append a JSONL trace of requests and screens")
+    parser.add_argument('--station', help="Station label of the metrics; defaults to the host name")
+    parser.add_argument('--startup-profile', metavar='FILE', help="Write the startup profile as JSON; '-' prints a summary")
+    parser.add_argument('--startup-budget', type=float, metavar='SECONDS', help="Allowed seconds until the first paint")
+    parser.add_argument('--exit-after-startup', action='store_true',
+                        help="Quit once warmed up; the exit status is 1 if the first paint was over the budget")
+    args = parser.parse_args()
+
+    metrics = create_metrics(args)
+    profiler = StartupProfiler(start=STARTED, budget=args.startup_budget, output=args.startup_profile, metrics=metrics)
+    profiler.mark('imported', at=IMPORTED)
     root = ctk.CTk()
-    app = InventoryApp(root)
+    profiler.mark('window_created')
+    app = InventoryApp(root, reader=create_reader(args), capture=create_capture(args), metrics=metrics,
+                       rest_factory=create_rest_factory(args, metrics, profiler), profiler=profiler)
+    profiler.mark('app_created')
+    if args.exit_after_startup:
+        def quit_when_warm():
+            if profiler.finished:
+                root.quit()
+            else:
+                root.after(50, quit_when_warm)
+
+        root.after(50, quit_when_warm)
     root.mainloop()
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    app.close()
+    if metrics is not None:
+        metrics.close()
+    if args.exit_after_startup and profiler.over_budget:
+        raise SystemExit(1)
@@ -0,0 +1,262 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds of the latency histogram buckets, as in the Prometheus client libraries.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRIC_HELP = {
+    'rest_request_duration_seconds': 'Latency of Rest requests by endpoint.',
+    'rest_requests_total': 'Rest requests by endpoint and status.',
+    'rest_errors_total': 'Failed Rest requests by endpoint and status.',
+    'rest_retries_total': 'Retries made by the HTTP adapter by endpoint.',
+    'rest_request_bytes_total': 'Request body bytes sent by endpoint.',
+    'rest_response_bytes_total': 'Response body bytes received by endpoint.',
+    'rest_upload_duration_seconds': 'Duration of file uploads by endpoint.',
+    'rest_upload_bytes_total': 'File bytes uploaded by endpoint.',
+    'zipdir_duration_seconds': 'Duration of zipdir by mode.',
+    'zipdir_bytes_total': 'Bytes of zip files written by zipdir.',
+    'gui_page_build_seconds': 'Time to build the widgets of a screen.',
+    'gui_transition_seconds': 'Time to update, raise and redraw a screen.',
+    'startup_seconds': 'Seconds from the start of main.py to each startup mark.',
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class TraceLog:
+    """
+    Appends events as JSON lines to a file that is rotated by size.
+
+    Events are queued and written by a background thread, so the threads
+    that record them, the Tk thread among them, never wait for the disk.
+    close() writes the events still queued.
+
+    Attributes
+    ----------
+    path : str
+        The path of the current trace file; rotated files get .1, .2, ... appended.
+    """
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        """
+        Parameters
+        ----------
+        path : str
+            The path of the trace file.
+        max_bytes : int, optional
+            The size at which the file is rotated. Defaults to 10 MiB.
+        backup_count : int, optional
+            The number of rotated files kept. Defaults to 5.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                                             encoding='utf-8', delay=True)
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        self._events = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self._writer.start()
+
+    def write(self, event):
+        """Queue one event, a JSON-serializable dict, for appending."""
+        self._events.put(event)
+
+    def _run(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            try:
+                message = json.dumps(event, default=str)
+            except ValueError:
+                continue  # e.g. a circular reference; one lost event must not stop the trace
+            self._handler.handle(logging.LogRecord('trace', logging.INFO, __file__, 0, message, None, None))
+
+    def close(self):
+        """Write the queued events and close the file; later events are dropped."""
+        self._events.put(None)
+        self._writer.join()
+        self._handler.close()
+
+
+class Metrics:
+    """
+    Counters and histograms for the Rest client and the GUI, exported in Prometheus text format.
+
+    Every series carries a station label, so the data of several stations
+    can be compared after scraping. Events can also be written to a
+    rotating JSONL TraceLog.
+
+    Attributes
+    ----------
+    station : str
+        The station label of every series.
+    buckets : tuple
+        The upper bounds of the histogram buckets.
+    trace : TraceLog or None
+        Where events are written.
+    """
+
+    def __init__(self, station=None, buckets=DEFAULT_BUCKETS, trace=None):
+        """
+        Parameters
+        ----------
+        station : str, optional
+            The station label. Defaults to the host name.
+        buckets : tuple, optional
+            The upper bounds of the histogram buckets. Defaults to DEFAULT_BUCKETS.
+        trace : TraceLog, optional
+            Where events are written. Events are dropped when omitted.
+        """
+        self.station = station or socket.gethostname()
+        self.buckets = tuple(buckets)
+        self.trace = trace
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts, sum, count]
+        self._server = None
+        self._exporter = None
+        self._stopping = threading.Event()
+
+    def inc(self, name, amount=1, **labels):
+        """Add amount to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record one sample of a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the seconds spent in a with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def event(self, kind, **fields):
+        """Queue an event for the trace, if there is one."""
+        if self.trace is not None:
+            self.trace.write({'time': time.time(), 'station': self.station, 'kind': kind, **fields})
+
+    def snapshot(self):
+        """Return copies of the counters and histograms, keyed by (name, labels)."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(value[0]), value[1], value[2]) for key, value in self._histograms.items()}
+        return counters, histograms
+
+    def render(self):
+        """Return every series in the Prometheus text exposition format."""
+        counters, histograms = self.snapshot()
+        station = ('station', self.station)
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} counter')
+            for (series, labels), value in sorted(counters.items()):
+                if series == name:
+                    lines.append(f'{name}{_format_labels((station, *labels))} {value}')
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} histogram')
+            for (series, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                if series != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_format_labels((station, *labels, ("le", bound)))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels((station, *labels, ("le", "+Inf")))} {count}')
+                lines.append(f'{name}_sum{_format_labels((station, *labels))} {total}')
+                lines.append(f'{name}_count{_format_labels((station, *labels))} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Write the metrics to path atomically, e.g. for the node_exporter textfile collector."""
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+        os.replace(temporary_path, path)
+
+    def start_textfile_export(self, path, interval=15):
+        """Rewrite the text file every interval seconds on a background thread."""
+        def run():
+            while not self._stopping.wait(interval):
+                self.write_textfile(path)
+
+        self.write_textfile(path)
+        self._exporter = threading.Thread(target=run, name='metrics-export', daemon=True)
+        self._exporter.start()
+
+    def serve(self, port=9464, host='127.0.0.1'):
+        """
+        Serve the metrics at http://host:port/metrics on a background thread.
+
+        Returns
+        -------
+        http.server.ThreadingHTTPServer
+            The server; its server_address holds the bound port.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes are not worth a line on stderr each
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        return self._server
+
+    def close(self):
+        """Stop the exporter and the HTTP endpoint and close the trace."""
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.trace is not None:
+            self.trace.close()
@@ -0,0 +1,260 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def multipart_file(body, content_type, field_name='file'):
+    """Return the content of a file field of a multipart/form-data body, or None if it has none."""
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if match is None:
+        return None
+    for part in body.split(b'--' + match.group(1).encode()):
+        headers, separator, content = part.partition(b'\r\n\r\n')
+        if separator and f'name="{field_name}"'.encode() in headers:
+            return content[:-2]  # the line break before the next boundary
+    return None
+
+
+class FaultConfig:
+    """
+    The faults a MockInventoryServer injects; attributes can be changed while it runs.
+
+    Attributes
+    ----------
+    latency : float
+        Seconds added to every response.
+    jitter : float
+        Up to this many extra seconds, drawn uniformly per request.
+    error_rate : float
+        The fraction of requests answered with error_status.
+    error_status : int
+        The status of injected errors.
+    rate_limit : float or None
+        Requests per second allowed before 429 responses are sent, or None.
+    burst : int
+        The number of requests allowed at once by the rate limit.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, rate_limit=None, burst=10):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.burst = burst
+
+
+class MockInventoryServer:
+    """
+    A local stand-in for the inventory /api/v3 endpoints, for benchmarks and experiments.
+
+    Serves generated items, boxes and locations, accepts uploads (plain and
+    chunked) and can inject latency, errors and throttling through
+    FaultConfig. It runs on a background thread; use it as a context manager
+    or call start() and stop().
+
+    Attributes
+    ----------
+    faults : FaultConfig
+        The injected faults.
+    items, boxes, locations : dict
+        The records by ID, as JSON-ready dicts.
+    pictures : dict
+        Uploaded pictures by item ID, served by downloadPicture.
+    stats : dict
+        Requests served, injected errors, throttled requests and uploaded bytes.
+    """
+
+    PREFIX = '/api/v3'
+
+    def __init__(self, host='127.0.0.1', port=0, items=1000, boxes=1000, locations=50, faults=None, seed=0):
+        """
+        Parameters
+        ----------
+        host : str, optional
+            The address to bind. Defaults to '127.0.0.1'.
+        port : int, optional
+            The port to bind; 0 picks a free one. Defaults to 0.
+        items, boxes, locations : int, optional
+            The number of generated records. Default to 1000, 1000 and 50.
+        faults : FaultConfig, optional
+            The injected faults. None are injected when omitted.
+        seed : int, optional
+            The seed of the generated data and of the injected faults. Defaults to 0.
+        """
+        self.faults = faults or FaultConfig()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = None
+        self._refilled = time.monotonic()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0, 'uploaded_bytes': 0}
+        self.locations = {str(i): {'location_id': str(i), 'location_name': f'Shelf {i}'}
+                          for i in range(1, locations + 1)}
+        self.items = {str(i): {'item_id': str(i), 'item_name': f'Item {i}', 'item_picture': f'item_{i}.jpg',
+                               'item_datasheet': '', 'item_audiofile': '', 'item_training_pictures': '',
+                               'item_deprecated': 'active'} for i in range(1, items + 1)}
+        self.boxes = {}
+        for i in range(1, boxes + 1):
+            location_id = str(self._random.randint(1, locations))
+            self.boxes[str(i)] = {'box_id': str(i), 'box_rfid': f'{0x86195789552 + i:x}', 'box_label_name': f'Box {i}',
+                                  'default_location_id': location_id, 'location_id': location_id,
+                                  'item_id': str(self._random.randint(1, items))}
+        self._boxes_by_rfid = {box['box_rfid']: box for box in self.boxes.values()}
+        self.pictures = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """The base URL to pass to Rest(server=...)."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{self.PREFIX}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-inventory', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # ---- Faults ----
+
+    def _inject(self):
+        """Return the status of an injected fault for the next request, or None."""
+        faults = self.faults
+        with self._lock:
+            self.stats['requests'] += 1
+            if faults.rate_limit:
+                now = time.monotonic()
+                if self._tokens is None:
+                    self._tokens = faults.burst
+                self._tokens = min(faults.burst, self._tokens + (now - self._refilled) * faults.rate_limit)
+                self._refilled = now
+                if self._tokens < 1:
+                    self.stats['throttled'] += 1
+                    return 429
+                self._tokens -= 1
+            failed = faults.error_rate and self._random.random() < faults.error_rate
+            delay = faults.latency + (self._random.uniform(0, faults.jitter) if faults.jitter else 0)
+            if failed:
+                self.stats['errors'] += 1
+        if delay:
+            time.sleep(delay)
+        return faults.error_status if failed else None
+
+    # ---- Routes ----
+
+    def _route(self, method, path, query, body, content_type=None):
+        """Return (status, payload) for a request; payload is a JSON-ready value or bytes."""
+        match = re.fullmatch(r'/item/(\d+)/(uploadPicture|uploadDatasheet|uploadTrainingPicture)', path)
+        if method == 'POST' and match:
+            picture = multipart_file(body, content_type) if match.group(2) == 'uploadPicture' else None
+            with self._lock:
+                self.stats['uploaded_bytes'] += len(body)
+                if picture is not None:
+                    self.pictures[match.group(1)] = picture
+            return 200, {'item_id': match.group(1), 'received': len(body)}
+        match = re.fullmatch(r'/item/(\d+)/downloadPicture', path)
+        if method == 'GET' and match:
+            picture = self.pictures.get(match.group(1))
+            return (200, picture) if picture is not None else (404, {'detail': 'No picture'})
+        if method == 'GET' and path == '/item/search':
+            name = query.get('item_name', [''])[0].lower()
+            return 200, [item for item in self.items.values() if item['item_name'].lower() == name]
+        if method == 'GET' and path == '/box/search':
+            box = self._boxes_by_rfid.get(query.get('box_rfid', [''])[0])
+            return (200, box) if box is not None else (404, {'detail': 'Box not found'})
+        if method == 'GET' and path == '/location/search':
+            location = self.locations.get(query.get('location_id', [''])[0])
+            return (200, location) if location is not None else (404, {'detail': 'Location not found'})
+        match = re.fullmatch(r'/(item|box|location)/(\d+)', path)
+        if method == 'GET' and match:
+            table = {'item': self.items, 'box': self.boxes, 'location': self.locations}[match.group(1)]
+            record = table.get(match.group(2))
+            return (200, record) if record is not None else (404, {'detail': f'{match.group(1)} not found'})
+        if method in ('POST', 'PUT') and path in ('/item', '/box'):
+            record = json.loads(body or b'{}')
+            table, id_field = (self.items, 'item_id') if path == '/item' else (self.boxes, 'box_id')
+            with self._lock:
+                if method == 'POST' and not record.get(id_field):
+                    record[id_field] = str(max(map(int, table), default=0) + 1)
+                if method == 'PUT' and str(record.get(id_field)) not in table:
+                    return 404, {'detail': 'Not found'}
+                table[str(record[id_field])] = record
+                if path == '/box':
+                    self._boxes_by_rfid[record.get('box_rfid')] = record
+            return 200, record
+        return 404, {'detail': 'Unknown route'}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+            # Buffer each response and send it in one write; separate writes of
+            # headers and body stall on delayed ACKs for ~40 ms per request.
+            wbufsize = -1
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    chunks = []
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0], 16)
+                        chunks.append(self.rfile.read(size))
+                        self.rfile.readline()
+                        if size == 0:
+                            return b''.join(chunks)
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def _handle(self, method):
+                try:
+                    body = self._read_body()
+                except ValueError:  # the client aborted a chunked body, e.g. because a file could not be read
+                    self.close_connection = True
+                    return
+                url = urlsplit(self.path)
+                if not url.path.startswith(server.PREFIX):
+                    status, payload = 404, {'detail': 'Unknown route'}
+                else:
+                    status = server._inject()
+                    if status is not None:
+                        payload = {'detail': 'Injected fault'}
+                    else:
+                        status, payload = server._route(method, url.path[len(server.PREFIX):], parse_qs(url.query),
+                                                        body, self.headers.get('Content-Type'))
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/octet-stream' if isinstance(payload, bytes)
+                                 else 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                if status == 429:
+                    self.send_header('Retry-After', '0')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def do_PUT(self):
+                self._handle('PUT')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,180 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class BoxPrefetch:
+    """
+    The lookups started for one box record.
+
+    Every lookup is a Future under a name: 'item', 'location' (the box's
+    location_id) and 'picture' (the name of the item picture once it is in
+    the ImageCache). Screens read them with result(),
+    which never blocks and records how long the screen had to wait.
+
+    Attributes
+    ----------
+    box : dict
+        The box record the lookups belong to.
+    futures : dict
+        The lookups by name.
+    """
+
+    def __init__(self, prefetcher, box, futures, clock):
+        self.box = box
+        self.futures = futures
+        self._prefetcher = prefetcher
+        self._clock = clock
+        self._started = clock()
+        self._finished = {}
+        self._requested = {}
+        self._recorded = set()
+        for name, future in futures.items():
+            future.add_done_callback(lambda done, name=name: self._finished.setdefault(name, self._clock()))
+
+    def done(self, name):
+        """Return whether the lookup called name has finished."""
+        return name in self.futures and self.futures[name].done()
+
+    def result(self, name):
+        """
+        Return the result of a lookup if it has finished, else None, without blocking.
+
+        The first call marks the moment a screen needed the lookup; once the
+        lookup has finished, the latency it hid and the time the screen waited
+        are recorded with the Prefetcher.
+        """
+        future = self.futures.get(name)
+        if future is None:
+            return None
+        now = self._clock()
+        requested = self._requested.setdefault(name, now)
+        if not future.done():
+            return None
+        if name not in self._recorded:
+            self._recorded.add(name)
+            finished = self._finished.get(name, now)
+            latency = finished - self._started
+            waited = max(0.0, finished - requested)
+            self._prefetcher._record(name, latency, waited)
+        try:
+            return future.result()
+        except Exception as e:
+            return f"Error - Prefetching {name} failed: {e}"
+
+
+class Prefetcher:
+    """
+    Starts the lookups that follow a box scan in parallel as soon as the box record arrives.
+
+    Without it the flow resolves box -> item -> location one call after the
+    other, each when its screen needs it. The Prefetcher issues the item and
+    location lookups together, and the item picture download as soon as the
+    item record names it, so box_found_page and localization_page find the
+    data ready.
+
+    Attributes
+    ----------
+    rest : Rest
+        The client used for the lookups.
+    image_cache : ImageCache or None
+        Where the item picture is prefetched to.
+    """
+
+    def __init__(self, rest, image_cache=None, max_workers=4, clock=time.monotonic):
+        """
+        Parameters
+        ----------
+        rest : Rest
+            The client used for the lookups.
+        image_cache : ImageCache, optional
+            Where the item picture is prefetched to. No picture is prefetched when omitted.
+        max_workers : int, optional
+            The number of lookup threads. Defaults to 4.
+        clock : callable, optional
+            The time source. Defaults to time.monotonic.
+        """
+        self.rest = rest
+        self.image_cache = image_cache
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def start(self, box):
+        """
+        Start every lookup that depends on a box record.
+
+        Parameters
+        ----------
+        box : dict
+            The record returned by search_for_box_with_rfid.
+
+        Returns
+        -------
+        BoxPrefetch
+            The running lookups.
+        """
+        futures = {}
+        if box.get('item_id'):
+            futures['item'] = self._executor.submit(self.rest.find_item_by_id, box['item_id'])
+            if self.image_cache is not None:
+                futures['picture'] = self._chain_picture(box['item_id'], futures['item'])
+        if box.get('location_id'):
+            futures['location'] = self._executor.submit(self.rest.get_location_by_id, box['location_id'])
+        return BoxPrefetch(self, box, futures, self._clock)
+
+    def _chain_picture(self, item_id, item_future):
+        """Return a Future of the picture name that starts the download once the item record is in."""
+        picture = Future()
+
+        def on_item(done):
+            try:
+                item = done.result()
+                picture_name = None if isinstance(item, str) else item.get('item_picture')
+                if not picture_name:
+                    picture.set_result(None)
+                    return
+                loading = self.image_cache.prefetch(item_id, picture_name)
+                if loading is None:
+                    picture.set_result(picture_name)  # already in memory
+                else:
+                    loading.add_done_callback(lambda loaded: on_loaded(loaded, picture_name))
+            except Exception as e:
+                picture.set_exception(e)
+
+        def on_loaded(loaded, picture_name):
+            try:
+                thumbnail = loaded.result()
+                picture.set_result(thumbnail if isinstance(thumbnail, str) else picture_name)
+            except Exception as e:
+                picture.set_exception(e)
+
+        item_future.add_done_callback(on_item)
+        return picture
+
+    def _record(self, name, latency, waited):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'count': 0, 'hidden': 0, 'hidden_s': 0.0, 'waited_s': 0.0})
+            stats['count'] += 1
+            stats['hidden'] += waited == 0
+            stats['hidden_s'] += latency - waited
+            stats['waited_s'] += waited
+
+    def stats(self):
+        """
+        Return per lookup how much of its latency the prefetch hid from the screens.
+
+        Returns
+        -------
+        dict
+            Per lookup name: count, hidden (lookups that were ready before a
+            screen asked), hidden_s (seconds of latency overlapped with earlier
+            screens) and waited_s (seconds screens still waited).
+        """
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def close(self):
+        """Stop the lookup threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
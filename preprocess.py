@@ -0,0 +1,318 @@
+import os
+import time
+import zipfile
+from io import BytesIO
+
+import numpy as np
+
+from archive import iter_zip_entries
+
+# Luminance weights of ITU-R BT.601, as used by Pillow's 'L' conversion.
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def resize_batch(batch, size):
+    """
+    Resizes a batch of images of equal shape.
+
+    Large reductions are first box-averaged by an integer factor, so the
+    bilinear step never skips pixels and the result does not alias.
+
+    Parameters
+    ----------
+    batch : numpy.ndarray
+        (count, height, width) or (count, height, width, channels) images.
+    size : tuple
+        The target (width, height).
+
+    Returns
+    -------
+    numpy.ndarray
+        The resized images as float32.
+    """
+    width, height = size
+    factor = min(batch.shape[1] // height, batch.shape[2] // width)
+    if factor > 1:
+        # Strided slices summed in place are much faster than a mean over reshaped axes;
+        # 8-bit images are summed as 16-bit integers while that cannot overflow.
+        rows, cols = batch.shape[1] // factor, batch.shape[2] // factor
+        dtype = np.uint16 if batch.dtype == np.uint8 and factor <= 16 else np.float32
+        summed = batch[:, 0:rows * factor:factor].astype(dtype)
+        for offset in range(1, factor):
+            summed += batch[:, offset:rows * factor:factor]
+        reduced = summed[:, :, 0:cols * factor:factor].copy()
+        for offset in range(1, factor):
+            reduced += summed[:, :, offset:cols * factor:factor]
+        batch = reduced.astype(np.float32) / (factor * factor)
+    else:
+        batch = batch.astype(np.float32, copy=False)
+    if batch.shape[1:3] == (height, width):
+        return batch
+
+    def coordinates(target, source):
+        position = np.clip((np.arange(target, dtype=np.float32) + 0.5) * source / target - 0.5, 0, source - 1)
+        lower = position.astype(np.intp)
+        return lower, np.minimum(lower + 1, source - 1), position - lower
+
+    y0, y1, wy = coordinates(height, batch.shape[1])
+    x0, x1, wx = coordinates(width, batch.shape[2])
+    wy = wy.reshape(1, -1, 1, *([1] * (batch.ndim - 3)))
+    wx = wx.reshape(1, 1, -1, *([1] * (batch.ndim - 3)))
+    top, bottom = batch[:, y0], batch[:, y1]
+    top = top[:, :, x0] * (1 - wx) + top[:, :, x1] * wx
+    bottom = bottom[:, :, x0] * (1 - wx) + bottom[:, :, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def box_filter(batch, radius):
+    """Returns the mean over a (2 * radius + 1) square around every pixel of a (count, height, width) batch."""
+    k = 2 * radius + 1
+    padded = np.pad(batch.astype(np.float32), ((0, 0), (radius + 1, radius), (radius + 1, radius)), mode='edge')
+    padded[:, 0, :] = 0
+    padded[:, :, 0] = 0
+    integral = padded.cumsum(axis=1).cumsum(axis=2)
+    sums = integral[:, k:, k:] - integral[:, :-k, k:] - integral[:, k:, :-k] + integral[:, :-k, :-k]
+    return sums / (k * k)
+
+
+def difference_hash(gray, boxes, tolerance=2.0):
+    """
+    Computes the 64-bit difference hash of a region of every image in a batch.
+
+    Each region is divided into 8 rows of 9 cells whose mean brightness is read
+    from an integral image, so regions of any size are hashed in one pass. A
+    bit is only set where the brightness rises by more than tolerance, so
+    sensor noise on a plain background does not flip bits between frames.
+
+    Parameters
+    ----------
+    gray : numpy.ndarray
+        (count, height, width) grayscale images.
+    boxes : numpy.ndarray
+        (count, 4) regions as top, bottom, left, right.
+    tolerance : float, optional
+        The smallest brightness step that sets a bit. Defaults to 2.
+
+    Returns
+    -------
+    numpy.ndarray
+        The hashes as uint64; near-identical regions differ in few bits.
+    """
+    count = len(gray)
+    integral = np.zeros((count, gray.shape[1] + 1, gray.shape[2] + 1), dtype=np.float64)
+    integral[:, 1:, 1:] = gray.cumsum(axis=1).cumsum(axis=2)
+    top, bottom, left, right = boxes.T
+    ys = top[:, np.newaxis] + (bottom - top)[:, np.newaxis] * np.arange(9) // 8
+    xs = left[:, np.newaxis] + (right - left)[:, np.newaxis] * np.arange(10) // 9
+    image = np.arange(count)[:, np.newaxis, np.newaxis]
+    corners = integral[image, ys[:, :, np.newaxis], xs[:, np.newaxis, :]]  # (count, 9, 10)
+    sums = corners[:, 1:, 1:] - corners[:, :-1, 1:] - corners[:, 1:, :-1] + corners[:, :-1, :-1]
+    areas = np.maximum(np.diff(ys, axis=1)[:, :, np.newaxis] * np.diff(xs, axis=1)[:, np.newaxis, :], 1)
+    cells = sums / areas
+    bits = cells[:, :, 1:] - cells[:, :, :-1] > tolerance
+    return np.packbits(bits.reshape(count, 64), axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+def hamming_distances(hashes, value):
+    """Returns the number of differing bits between each of hashes and value."""
+    differences = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(differences.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class Preprocessor:
+    """
+    Turns captured item photos into segmented training images, one batch at a time.
+
+    Every step after decoding works on a whole batch of equally sized frames
+    at once: resizing, estimating the background from the frame borders (or
+    subtracting a picture of the empty scene), masking the item, and hashing
+    the item's bounding box to drop near-duplicates. Only cropping to the item's bounding box
+    and PNG encoding are done per image. Memory use is bounded by the batch
+    size, not by the number of photos.
+
+    Attributes
+    ----------
+    size : tuple
+        The (width, height) frames are resized to before segmentation.
+    batch_size : int
+        The number of frames processed together.
+    last_stats : dict or None
+        The statistics of the most recent run.
+    """
+
+    def __init__(self, size=(640, 480), batch_size=16, background=None, threshold=30.0, border=8,
+                 smoothing=2, margin=8, duplicate_distance=4):
+        """
+        Initializes the preprocessor.
+
+        Parameters
+        ----------
+        size : tuple, optional
+            The (width, height) frames are resized to. Defaults to (640, 480).
+        batch_size : int, optional
+            The number of frames processed together. Defaults to 16.
+        background : str or numpy.ndarray, optional
+            A photo of the empty scene. When omitted, the background colour of
+            each frame is estimated from its borders.
+        threshold : float, optional
+            The smallest per-channel difference from the background that counts
+            as foreground. Defaults to 30.
+        border : int, optional
+            The width in pixels of the border used to estimate the background. Defaults to 8.
+        smoothing : int, optional
+            The radius of the majority filter that removes speckles from the mask. Defaults to 2.
+        margin : int, optional
+            Pixels kept around the item's bounding box. Defaults to 8.
+        duplicate_distance : int, optional
+            Frames whose hashes differ in at most this many bits are dropped
+            as duplicates; a negative value keeps every frame. Defaults to 4.
+        """
+        self.size = size
+        self.batch_size = batch_size
+        self.threshold = threshold
+        self.border = border
+        self.smoothing = smoothing
+        self.margin = margin
+        self.duplicate_distance = duplicate_distance
+        self.background = None
+        if background is not None:
+            if isinstance(background, str):
+                background = self._load(background)
+            self.background = resize_batch(background[np.newaxis], size)
+        self.last_stats = None
+
+    @staticmethod
+    def _load(path):
+        from PIL import Image  # Pillow is only needed for decoding and encoding
+
+        with Image.open(path) as image:
+            return np.asarray(image.convert('RGB'))
+
+    def _batches(self, paths):
+        """Yields (paths, frames) batches of frames resized to self.size."""
+        batch_paths, frames = [], []
+        for path in paths:
+            batch_paths.append(path)
+            frames.append(self._load(path))
+            if len(frames) == self.batch_size:
+                yield batch_paths, self._resize(frames)
+                batch_paths, frames = [], []
+        if frames:
+            yield batch_paths, self._resize(frames)
+
+    def _resize(self, frames):
+        """Resizes frames, stacking those of equal shape so each shape is resized in one call."""
+        resized = np.empty((len(frames), self.size[1], self.size[0], 3), dtype=np.float32)
+        shapes = {}
+        for index, frame in enumerate(frames):
+            shapes.setdefault(frame.shape, []).append(index)
+        for indices in shapes.values():
+            resized[indices] = resize_batch(np.stack([frames[index] for index in indices]), self.size)
+        return resized
+
+    def segment(self, batch):
+        """
+        Separates the items in a batch from the background.
+
+        Parameters
+        ----------
+        batch : numpy.ndarray
+            (count, height, width, 3) float32 frames of self.size.
+
+        Returns
+        -------
+        tuple
+            The (count, height, width) boolean foreground masks and the
+            (count, 4) bounding boxes as top, bottom, left, right; frames
+            without foreground get an empty box (bottom == top).
+        """
+        if self.background is not None:
+            background = self.background
+        else:
+            b = self.border
+            edges = np.concatenate([batch[:, :b].reshape(len(batch), -1, 3), batch[:, -b:].reshape(len(batch), -1, 3),
+                                    batch[:, b:-b, :b].reshape(len(batch), -1, 3),
+                                    batch[:, b:-b, -b:].reshape(len(batch), -1, 3)], axis=1)
+            background = np.median(edges, axis=1)[:, np.newaxis, np.newaxis]
+        mask = np.abs(batch - background).max(axis=3) > self.threshold
+        if self.smoothing:
+            mask = box_filter(mask, self.smoothing) > 0.5
+
+        height, width = mask.shape[1:]
+        rows, cols = mask.any(axis=2), mask.any(axis=1)
+        found = rows.any(axis=1)
+        top = np.maximum(rows.argmax(axis=1) - self.margin, 0)
+        bottom = np.minimum(height - rows[:, ::-1].argmax(axis=1) + self.margin, height)
+        left = np.maximum(cols.argmax(axis=1) - self.margin, 0)
+        right = np.minimum(width - cols[:, ::-1].argmax(axis=1) + self.margin, width)
+        boxes = np.stack([top, np.where(found, bottom, top), left, right], axis=1)
+        return mask, boxes
+
+    def process(self, paths):
+        """
+        Preprocesses photos and yields the segmented crops as PNG images.
+
+        Parameters
+        ----------
+        paths : iterable of str
+            The photos, in capture order.
+
+        Yields
+        ------
+        tuple
+            (source path, PNG bytes) of every frame that shows an item and is
+            not a near-duplicate of an earlier one. The PNGs have the mask as alpha channel.
+        """
+        from PIL import Image
+
+        start = time.perf_counter()
+        stats = {'frames': 0, 'kept': 0, 'duplicates': 0, 'empty': 0, 'bytes_out': 0}
+        self.last_stats = stats
+        kept_hashes = np.empty(0, dtype=np.uint64)
+        for batch_paths, batch in self._batches(paths):
+            stats['frames'] += len(batch)
+            mask, boxes = self.segment(batch)
+            hashes = difference_hash(batch @ LUMA, boxes)
+            pixels = np.clip(batch + 0.5, 0, 255).astype(np.uint8)
+            alpha = mask.astype(np.uint8) * 255
+            for index, (top, bottom, left, right) in enumerate(boxes):
+                if bottom == top:
+                    stats['empty'] += 1
+                    continue
+                if self.duplicate_distance >= 0 and len(kept_hashes) and \
+                        hamming_distances(kept_hashes, hashes[index]).min() <= self.duplicate_distance:
+                    stats['duplicates'] += 1
+                    continue
+                kept_hashes = np.append(kept_hashes, hashes[index])
+                crop = np.dstack([pixels[index, top:bottom, left:right], alpha[index, top:bottom, left:right]])
+                buffer = BytesIO()
+                Image.fromarray(crop, 'RGBA').save(buffer, 'PNG')
+                data = buffer.getvalue()
+                stats['kept'] += 1
+                stats['bytes_out'] += len(data)
+                yield batch_paths[index], data
+        stats['seconds'] = time.perf_counter() - start
+
+    def iter_zip(self, paths, arcdir=None, compresslevel=6):
+        """
+        Preprocesses photos straight into a zip archive yielded in chunks.
+
+        Parameters
+        ----------
+        paths : iterable of str
+            The photos, in capture order.
+        arcdir : str, optional
+            The directory of the images inside the archive. Defaults to
+            today's date, like the images/segmented/<date> directories.
+        compresslevel : int, optional
+            The compression level for members that are deflated. Defaults to 6.
+
+        Yields
+        ------
+        bytes
+            The next piece of the archive.
+        """
+        arcdir = arcdir or time.strftime('%Y-%m-%d')
+        entries = ((f'{arcdir}/{os.path.splitext(os.path.basename(path))[0]}.png', data)
+                   for path, data in self.process(paths))
+        yield from iter_zip_entries(entries, zipfile.ZIP_DEFLATED, compresslevel)
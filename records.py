@@ -0,0 +1,200 @@
+class RestError(str):
+    """
+    An error returned by Rest, with the details of the failed request.
+
+    It is still the familiar "Error - ..." string, so code that checks
+    isinstance(result, str) keeps working, but callers can also branch on
+    the status code instead of parsing the message.
+
+    Attributes
+    ----------
+    status : int or None
+        The HTTP status code, or None if no response was received.
+    latency : float or None
+        Seconds the request took.
+    method : str or None
+        The HTTP method of the request.
+    endpoint : str or None
+        The API endpoint of the request.
+    sent : bool
+        False only if the connection failed before the request went out, so
+        even a POST can be sent again without creating a duplicate.
+    """
+
+    def __new__(cls, message, status=None, latency=None, method=None, endpoint=None, sent=True):
+        error = super().__new__(cls, message)
+        error.status = status
+        error.latency = latency
+        error.method = method
+        error.endpoint = endpoint
+        error.sent = sent
+        return error
+
+    @property
+    def retryable(self):
+        """Whether the request may succeed when sent again: no response, throttling or a server error."""
+        return self.status is None or self.status == 429 or self.status >= 500
+
+    @property
+    def not_found(self):
+        return self.status == 404
+
+
+class RestRequestError(Exception):
+    """The exception form of a RestError, raised by unwrap()."""
+
+    def __init__(self, error):
+        super().__init__(str(error))
+        self.error = error
+        self.status = getattr(error, 'status', None)
+        self.latency = getattr(error, 'latency', None)
+
+
+def unwrap(result):
+    """Returns a Rest result, raising RestRequestError if it is an error."""
+    if isinstance(result, str):
+        raise RestRequestError(result)
+    return result
+
+
+class Record:
+    """
+    Base class of the compact records decoded from API responses.
+
+    Records keep their fields in __slots__ instead of a per-record dict.
+    Fields the class does not know are kept in extra, so no data is lost.
+    For code written against the raw JSON, records also support
+    record['field'], record.get('field') and 'field' in record, like the
+    dict of a response that holds every known field: a known field that is
+    null is present, with the value None.
+
+    Subclasses define FIELDS (every known field, required ones first) and
+    REQUIRED, and an __init__ taking the fields as keyword arguments.
+    """
+
+    __slots__ = ('extra',)
+    KIND = 'record'
+    FIELDS = ()
+    REQUIRED = ()
+
+    @classmethod
+    def from_json(cls, data):
+        """
+        Decodes a record from parsed JSON.
+
+        The fast path passes the JSON straight to the constructor, which only
+        checks that the required fields are present; unknown fields or a
+        missing required field fall back to a slower, checked path.
+
+        Returns
+        -------
+        Record or RestError
+            The record, or an error if data is not a valid record.
+        """
+        try:
+            record = cls(**data)
+            record.extra = None
+            return record
+        except TypeError:
+            pass
+        if not isinstance(data, dict):
+            return RestError(f"Error - Invalid {cls.KIND} record: expected an object, got {type(data).__name__}")
+        missing = [name for name in cls.REQUIRED if name not in data]
+        if missing:
+            return RestError(f"Error - Invalid {cls.KIND} record: missing {', '.join(missing)}")
+        record = cls(**{name: value for name, value in data.items() if name in cls.FIELDS})
+        record.extra = {name: value for name, value in data.items() if name not in cls.FIELDS} or None
+        return record
+
+    @classmethod
+    def decode(cls, response):
+        """Decodes a response holding one record or a list of them; errors and None are passed through."""
+        if response is None or isinstance(response, str):
+            return response
+        if isinstance(response, list):
+            return [cls.from_json(data) for data in response]
+        return cls.from_json(response)
+
+    def to_json(self):
+        """Returns the record as a JSON-ready dict."""
+        data = {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, name, default=None):
+        if name in self.FIELDS:
+            return getattr(self, name)
+        return self.extra.get(name, default) if self.extra else default
+
+    def __getitem__(self, name):
+        if name in self.FIELDS:
+            return getattr(self, name)
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self.FIELDS or bool(self.extra) and name in self.extra
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.to_json() == other.to_json()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.FIELDS)
+        return f'{type(self).__name__}({fields})'
+
+
+class Item(Record):
+    """An item of the inventory."""
+
+    __slots__ = ('item_id', 'item_name', 'item_picture', 'item_datasheet', 'item_audiofile',
+                 'item_training_pictures', 'item_deprecated')
+    KIND = 'item'
+    FIELDS = __slots__
+    REQUIRED = ('item_id', 'item_name')
+
+    def __init__(self, item_id, item_name, item_picture=None, item_datasheet=None, item_audiofile=None,
+                 item_training_pictures=None, item_deprecated=None):
+        self.item_id = item_id
+        self.item_name = item_name
+        self.item_picture = item_picture
+        self.item_datasheet = item_datasheet
+        self.item_audiofile = item_audiofile
+        self.item_training_pictures = item_training_pictures
+        self.item_deprecated = item_deprecated
+
+
+class Box(Record):
+    """A box with an RFID tag, holding one item."""
+
+    __slots__ = ('box_id', 'box_rfid', 'box_label_name', 'default_location_id', 'item_id', 'location_id')
+    KIND = 'box'
+    FIELDS = __slots__
+    REQUIRED = ('box_id',)
+
+    def __init__(self, box_id, box_rfid=None, box_label_name=None, default_location_id=None, item_id=None,
+                 location_id=None):
+        self.box_id = box_id
+        self.box_rfid = box_rfid
+        self.box_label_name = box_label_name
+        self.default_location_id = default_location_id
+        self.item_id = item_id
+        self.location_id = location_id
+
+
+class Location(Record):
+    """A place where boxes are kept."""
+
+    __slots__ = ('location_id', 'location_name')
+    KIND = 'location'
+    FIELDS = __slots__
+    REQUIRED = ('location_id',)
+
+    def __init__(self, location_id, location_name=None):
+        self.location_id = location_id
+        self.location_name = location_name
@@ -0,0 +1,291 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from records import RestError
+
+
+class Stage:
+    """
+    One step of a Registration and its progress.
+
+    Attributes
+    ----------
+    name : str
+        'insert', 'picture', 'datasheet' or 'training'.
+    state : str
+        One of Stage.STATES. An upload handed to the upload queue of the
+        client is 'queued': it counts as successful, since the queue sends
+        it in the background and keeps it across restarts.
+    attempts : int
+        How often the step was sent.
+    error : str or None
+        The last error of the step.
+    result : object
+        The response of the last successful attempt.
+    seconds : float
+        Time from the first attempt to the end of the step, retries included.
+    """
+
+    PENDING, RUNNING, RETRYING, DONE, QUEUED, FAILED, SKIPPED, ROLLED_BACK = (
+        'pending', 'running', 'retrying', 'done', 'queued', 'failed', 'skipped', 'rolled back')
+    STATES = (PENDING, RUNNING, RETRYING, DONE, QUEUED, FAILED, SKIPPED, ROLLED_BACK)
+    FINISHED = (DONE, QUEUED, FAILED, SKIPPED, ROLLED_BACK)
+    SUCCEEDED = (DONE, QUEUED)
+
+    def __init__(self, name):
+        self.name = name
+        self.state = self.PENDING
+        self.attempts = 0
+        self.error = None
+        self.result = None
+        self.seconds = 0.0
+
+    @property
+    def finished(self):
+        return self.state in self.FINISHED
+
+    @property
+    def succeeded(self):
+        return self.state in self.SUCCEEDED
+
+    def __repr__(self):
+        return f'Stage({self.name!r}, {self.state!r}, attempts={self.attempts})'
+
+
+class Registration:
+    """
+    Registers a new item: inserts the item, then uploads its files concurrently.
+
+    Done one after another, registering costs the sum of all transfers. Here
+    the picture, datasheet and training picture uploads only depend on the
+    item record, so they start together as soon as the insert has returned
+    and the whole registration takes about as long as the longest upload.
+
+    The uploads are retried on errors worth retrying (no response, 429,
+    5xx) with exponential backoff; sending a file again only replaces it.
+    The insert is a POST that creates a new item every time it arrives, so
+    it is only retried when the connection failed before the request went
+    out; any other failure is reported and the user decides whether to try
+    again. An upload that still fails is rolled back: its field is cleared
+    on the item, so the item never names a file the server does not have.
+    If the insert fails or returns no item_id, the uploads are skipped. If
+    the client has an upload queue, the uploads are only queued and their
+    stages end as 'queued'.
+
+    Attributes
+    ----------
+    rest : Rest
+        The client the requests go through.
+    item : dict
+        The item record sent to insert_new_item; item_picture, item_datasheet
+        and item_training_pictures are filled in from the files.
+    item_id : str or None
+        The ID of the created item, once the insert succeeded.
+    stages : dict
+        The Stages by name, in the order they are shown.
+    """
+
+    TRAINING_ZIP_NAME = 'segmented_images.zip'  # the archive name the training uploads use
+    POLL_INTERVAL_MS = 100
+
+    def __init__(self, rest, item, picture=None, datasheet=None, training_pictures=None, retries=2,
+                 backoff=0.5, max_workers=3, clock=time.monotonic):
+        """
+        Parameters
+        ----------
+        rest : Rest
+            The client the requests go through.
+        item : dict
+            The new item, at least its item_name.
+        picture : str, optional
+            The path of the item picture.
+        datasheet : str, optional
+            The path of the datasheet.
+        training_pictures : str or list of str, optional
+            A directory of segmented images, or captured photos that are
+            preprocessed on the fly.
+        retries : int, optional
+            How often a failed stage is sent again. Defaults to 2.
+        backoff : float, optional
+            Seconds before the first retry; doubled for every further one. Defaults to 0.5.
+        max_workers : int, optional
+            The number of uploads run at once. Defaults to 3.
+        clock : callable, optional
+            The time source. Defaults to time.monotonic.
+        """
+        self.rest = rest
+        self.picture = picture
+        self.datasheet = datasheet
+        self.training_pictures = training_pictures
+        self.retries = retries
+        self.backoff = backoff
+        self.item_id = None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='registration')
+
+        self.item = dict(item)
+        if picture:
+            self.item['item_picture'] = os.path.basename(picture)
+        if datasheet:
+            self.item['item_datasheet'] = os.path.basename(datasheet)
+        if training_pictures:
+            self.item['item_training_pictures'] = self.TRAINING_ZIP_NAME
+        self.item.setdefault('item_deprecated', 'active')
+
+        self.stages = {'insert': Stage('insert')}
+        for name, source in (('picture', picture), ('datasheet', datasheet), ('training', training_pictures)):
+            if source:
+                self.stages[name] = Stage(name)
+        self._started = None
+        self.seconds = None
+
+    # ---- Running ----
+
+    def start(self):
+        """Start the insert; the uploads follow on their own. Returns self."""
+        self._started = self._clock()
+        self._executor.submit(self._run_insert)
+        return self
+
+    def _run_insert(self):
+        insert = self.stages['insert']
+        result = self._run_stage(insert, lambda: self.rest.insert_new_item(self.item),
+                                 retry_if=lambda error: getattr(error, 'sent', True) is False)
+        item_id = result.get('item_id', self.item.get('item_id')) if isinstance(result, dict) else None
+        if not isinstance(result, str) and item_id in (None, ''):
+            with self._lock:
+                insert.state = Stage.FAILED
+                insert.error = RestError("Error - The server did not return the ID of the new item")
+        if insert.state == Stage.FAILED:
+            with self._lock:
+                for stage in self.stages.values():
+                    if not stage.finished:
+                        stage.state = Stage.SKIPPED
+            self._finish()
+            return
+        self.item_id = str(item_id)
+        self.item['item_id'] = self.item_id
+
+        uploads = {
+            'picture': lambda: self.rest.upload_picture(self.item_id, self.picture, self.item['item_picture']),
+            'datasheet': lambda: self.rest.upload_datasheet(self.item_id, self.datasheet, self.item['item_datasheet']),
+            'training': self._upload_training,
+        }
+        futures = [self._executor.submit(self._run_stage, self.stages[name], upload)
+                   for name, upload in uploads.items() if name in self.stages]
+        remaining = [len(futures)]
+
+        def on_upload_done(future):
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._executor.submit(self._rollback)
+
+        if not futures:
+            self._finish()
+        for future in futures:
+            future.add_done_callback(on_upload_done)
+
+    def _upload_training(self):
+        if isinstance(self.training_pictures, str):
+            return self.rest.upload_trainings_picture(self.item_id, self.training_pictures)
+        return self.rest.upload_preprocessed_trainings_pictures(self.item_id, self.training_pictures)
+
+    def _run_stage(self, stage, call, retry_if=None):
+        """
+        Run call() for stage with retries; return its last result.
+
+        retry_if(error) decides whether a failed attempt is sent again; by
+        default errors with no response, 429 or 5xx are. Plain error strings
+        are local, e.g. a missing file, and are never retried.
+        """
+        start = self._clock()
+        delay = self.backoff
+        while True:
+            with self._lock:
+                stage.attempts += 1
+                stage.state = Stage.RUNNING
+            try:
+                result = call()
+            except Exception as e:
+                result = RestError(f"Error - {stage.name} failed: {e}")
+            failed = isinstance(result, str)
+            if retry_if is None:
+                retryable = getattr(result, 'retryable', False)
+            else:
+                retryable = isinstance(result, RestError) and retry_if(result)
+            if not failed or not retryable or stage.attempts > self.retries:
+                break
+            with self._lock:
+                stage.state = Stage.RETRYING
+                stage.error = result
+            time.sleep(delay)
+            delay *= 2
+        with self._lock:
+            stage.seconds = self._clock() - start
+            if failed:
+                stage.state, stage.error = Stage.FAILED, result
+            else:
+                queued = isinstance(result, dict) and 'upload_id' in result
+                stage.state, stage.result, stage.error = Stage.QUEUED if queued else Stage.DONE, result, None
+        return result
+
+    def _rollback(self):
+        """Clear the fields of failed uploads on the item with one update."""
+        fields = {'picture': 'item_picture', 'datasheet': 'item_datasheet', 'training': 'item_training_pictures'}
+        failed = [stage for name, stage in self.stages.items() if name in fields and stage.state == Stage.FAILED]
+        if failed:
+            updated = dict(self.item)
+            for stage in failed:
+                updated[fields[stage.name]] = ''
+            result = self.rest.update_item(updated)
+            if not isinstance(result, str):
+                self.item = updated
+                with self._lock:
+                    for stage in failed:
+                        stage.state = Stage.ROLLED_BACK
+        self._finish()
+
+    def _finish(self):
+        self.seconds = self._clock() - self._started
+        self._executor.shutdown(wait=False)
+        self._finished.set()
+
+    # ---- Progress ----
+
+    @property
+    def done(self):
+        """Whether every stage has finished and failed uploads are rolled back."""
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the registration is done; return whether it is."""
+        return self._finished.wait(timeout)
+
+    @property
+    def ok(self):
+        """Whether the item was created with all of its files, sent or queued."""
+        return self.done and all(stage.succeeded for stage in self.stages.values())
+
+    def progress(self):
+        """Return the fraction of finished stages, 0..1."""
+        with self._lock:
+            return sum(stage.finished for stage in self.stages.values()) / len(self.stages)
+
+    def summary(self):
+        """
+        Return the state of every stage.
+
+        Returns
+        -------
+        dict
+            Per stage name: state, attempts, seconds and error.
+        """
+        with self._lock:
+            return {name: {'state': stage.state, 'attempts': stage.attempts, 'seconds': stage.seconds,
+                           'error': stage.error} for name, stage in self.stages.items()}
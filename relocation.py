@@ -0,0 +1,259 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class BoxMove:
+    """
+    The requested move of one scanned box and whether the server confirmed it.
+
+    Attributes
+    ----------
+    rfid : str
+        The scanned tag.
+    location_id : str
+        The location the box is moved to; a later scan of the same box replaces it.
+    state : str
+        One of BoxMove.STATES.
+    box_id : str or None
+        The ID of the box, once its tag was resolved.
+    attempts : int
+        How often the update was sent.
+    error : str or None
+        The last error of the move.
+    """
+
+    QUEUED, WRITING, MOVED, UNCHANGED, NOT_FOUND, FAILED = (
+        'queued', 'writing', 'moved', 'unchanged', 'not found', 'failed')
+    STATES = (QUEUED, WRITING, MOVED, UNCHANGED, NOT_FOUND, FAILED)
+
+    def __init__(self, rfid, location_id):
+        self.rfid = rfid
+        self.location_id = location_id
+        self.state = self.QUEUED
+        self.box_id = None
+        self.attempts = 0
+        self.error = None
+
+    def __repr__(self):
+        return f'BoxMove({self.rfid!r}, {self.location_id!r}, {self.state!r})'
+
+
+class Relocation:
+    """
+    Moves many boxes to a scanned location with batched, coalesced writes.
+
+    Scanned tags are only buffered, so the operator can keep scanning
+    without waiting for the server. A background thread flushes the buffer
+    when batch_size tags are waiting or flush_interval has passed: it
+    resolves the tags with search_boxes_by_rfids and sends the changed boxes
+    with update_boxes, both concurrently over the pooled connections. The
+    lookups bypass the cache, since the whole box record is written back and
+    another station may have changed it since it was cached.
+
+    A box scanned again before its update was sent is written once, with
+    the location of the last scan. Flushes never overlap, so a later scan
+    always reaches the server after an earlier one. Boxes already at their
+    target location are not written. Failed updates that are worth retrying
+    go back into the buffer until max_attempts is reached. If a flush
+    raises, its moves fail with the error and flushing goes on.
+
+    Attributes
+    ----------
+    rest : Rest
+        The client the lookups and updates go through.
+    location_id : str or None
+        The location scanned boxes are moved to.
+    moves : dict
+        The BoxMove of every scanned tag, in scan order.
+    """
+
+    def __init__(self, rest, location_id=None, batch_size=50, flush_interval=0.5, max_attempts=3,
+                 max_workers=None):
+        """
+        Parameters
+        ----------
+        rest : Rest
+            The client the lookups and updates go through.
+        location_id : str, optional
+            The location scanned boxes are moved to; see set_location().
+        batch_size : int, optional
+            Flush as soon as this many tags are waiting. Defaults to 50.
+        flush_interval : float, optional
+            Seconds a tag waits at most before it is flushed. Defaults to 0.5.
+        max_attempts : int, optional
+            How often an update is sent before the move counts as failed. Defaults to 3.
+        max_workers : int, optional
+            The number of concurrent requests. Defaults to the pool size of rest.
+        """
+        self.rest = rest
+        self.location_id = location_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_workers = max_workers
+        self.moves = {}
+        self._pending = {}  # rfid -> location_id, coalesced
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.seconds = 0.0
+
+    def set_location(self, location_id):
+        """Move the boxes scanned from now on to location_id."""
+        with self._lock:
+            self.location_id = str(location_id)
+
+    def scan(self, rfid):
+        """
+        Buffer the move of a box to the current location.
+
+        Returns
+        -------
+        BoxMove or None
+            The move, or None if no location is set yet.
+        """
+        with self._lock:
+            if self.location_id is None:
+                return None
+            move = self.moves.get(rfid)
+            if move is not None and move.location_id == self.location_id and \
+                    move.state not in (BoxMove.NOT_FOUND, BoxMove.FAILED):
+                return move  # already there or on its way
+            if move is None:
+                move = self.moves[rfid] = BoxMove(rfid, self.location_id)
+            else:
+                move.location_id, move.state, move.error, move.attempts = self.location_id, BoxMove.QUEUED, None, 0
+            self._pending[rfid] = self.location_id
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return move
+
+    # ---- Flushing ----
+
+    def flush(self):
+        """
+        Send the buffered moves now.
+
+        Returns
+        -------
+        int
+            The number of boxes written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            start = time.perf_counter()
+            try:
+                return self._send(batch)
+            except Exception as e:
+                log.exception("Relocation flush failed")
+                with self._lock:
+                    for rfid, location_id in batch.items():
+                        move = self.moves[rfid]
+                        if move.state in (BoxMove.QUEUED, BoxMove.WRITING):
+                            self._fail(rfid, location_id, move, f"Error - Flush failed: {e}")
+                return 0
+            finally:
+                with self._lock:
+                    self.flushes += 1
+                    self.seconds += time.perf_counter() - start
+
+    def _send(self, batch):
+        """Resolve a batch of tags and write the boxes that move; returns the number written."""
+        boxes = self.rest.search_boxes_by_rfids(batch, self.max_workers, fresh=True)
+        updates = {}
+        with self._lock:
+            for rfid, location_id in batch.items():
+                move, box = self.moves[rfid], boxes.get(rfid)
+                if isinstance(box, str) or box is None:
+                    move.attempts += 1
+                    self._fail(rfid, location_id, move, box or "Error - Box lookup returned nothing")
+                    continue
+                move.box_id = str(box.get('box_id'))
+                if str(box.get('location_id')) == location_id:
+                    move.state = BoxMove.UNCHANGED
+                    continue
+                updated = box.to_json() if hasattr(box, 'to_json') else dict(box)
+                updated['location_id'] = location_id
+                updates[move.box_id] = (rfid, location_id, updated)
+                move.state = BoxMove.WRITING
+                move.attempts += 1
+        results = self.rest.update_boxes([updated for _, _, updated in updates.values()], self.max_workers)
+        with self._lock:
+            for box_id, (rfid, location_id, _) in updates.items():
+                move, result = self.moves[rfid], results.get(box_id)
+                if isinstance(result, str) or result is None:
+                    self._fail(rfid, location_id, move, result or "Error - Update returned nothing")
+                elif move.location_id == location_id and move.state == BoxMove.WRITING:
+                    move.state, move.error = BoxMove.MOVED, None
+        return len(updates)
+
+    def _fail(self, rfid, location_id, move, error):
+        """Record a failed move, putting it back into the buffer if it may still succeed."""
+        if move.location_id != location_id or rfid in self._pending:
+            return  # a newer scan of the box replaced this move
+        move.error = error
+        if getattr(error, 'not_found', False):
+            move.state = BoxMove.NOT_FOUND
+        elif getattr(error, 'retryable', False) and move.attempts < self.max_attempts:
+            move.state = BoxMove.QUEUED
+            self._pending[rfid] = location_id
+        else:
+            move.state = BoxMove.FAILED
+
+    # ---- Background flushing ----
+
+    def start(self):
+        """Start flushing in a background thread. Returns self."""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='relocation', daemon=True)
+            self._thread.start()
+        return self
+
+    def finish(self):
+        """Flush what is left and stop the background thread, without waiting for it."""
+        self._stopping.set()
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        """Flush what is left and stop the background thread."""
+        self.finish()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def done(self):
+        """Whether finish() was called and every buffered move has been sent."""
+        return self._stopping.is_set() and (self._thread is None or not self._thread.is_alive())
+
+    def _run(self):
+        while True:
+            stopping = self._stopping.is_set()
+            self.flush()
+            with self._lock:
+                retrying = bool(self._pending)
+            if stopping and not retrying:
+                return
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+    # ---- Progress ----
+
+    def counts(self):
+        """Return the number of moves per state."""
+        with self._lock:
+            counts = dict.fromkeys(BoxMove.STATES, 0)
+            for move in self.moves.values():
+                counts[move.state] += 1
+            return counts
@@ -1,6 +1,21 @@
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
 import zipfile
+import mimetypes
 import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from archive import ParallelZipBuilder, iter_multipart, iter_zip, member_compression, walk_files
+from cache import TTLCache
+from records import Box, Item, Location, RestError
 
 class Rest:
     """
@@ -16,16 +31,44 @@ class Rest:
         The authorization token.
     headers : dict
         The headers for the HTTP requests.
+    session : requests.Session
+        The pooled keep-alive session used for every request.
+    timeout : tuple
+        The (connect, read) timeout in seconds passed to every request.
+    cache : TTLCache
+        The read-through cache for item, box and location lookups.
+    upload_queue : UploadQueue or None
+        The persistent queue uploads are handed to, if any.
+    upload_worker : UploadWorker or None
+        The worker draining upload_queue; it is woken as soon as an upload is queued.
+    search_index : ItemSearchIndex or None
+        The client-side item name index, if any.
 
     Methods
     -------
-    _make_request(method, endpoint, params=None, json=None, files=None):
+    _make_request(method, endpoint, params=None, json=None, files=None, data=None, headers=None):
         A generic function to make an HTTP request.
+    latency_stats():
+        Returns per-endpoint latency statistics.
+    close():
+        Closes the pooled session.
+    cache_stats():
+        Returns the hit/miss counters of the lookup cache.
+    find_items_by_ids(item_ids), find_boxes_by_ids(box_ids), search_boxes_by_rfids(box_rfids):
+        Batch lookups running concurrently over the connection pool.
 
     """
 
+    # Only idempotent verbs are retried; a retried POST could create duplicates.
+    RETRY_METHODS = frozenset(['GET', 'PUT'])
+    RETRY_STATUS = (429, 502, 503, 504)
+    LATENCY_SAMPLES = 1000
+
     def __init__(self, server='http://inventory01.smartlab.th-deg.de:8081/api/v3', 
-                       api_key='123', authorization='Bearer 123'):
+                       api_key='123', authorization='Bearer 123',
+                       pool_size=10, connect_timeout=3.05, read_timeout=10,
+                       max_retries=3, backoff_factor=0.3, cache_size=256, cache_ttl=300,
+                       upload_queue=None, search_index=None, metrics=None):
         """
         Initializes the Rest client with server, API key, and authorization token.
 
@@ -37,6 +80,28 @@ class Rest:
             The API key for authentication.
         authorization : str
             The authorization token.
+        pool_size : int, optional
+            The number of keep-alive connections kept per host. Defaults to 10.
+        connect_timeout : float, optional
+            Seconds to wait for the TCP connection. Defaults to 3.05.
+        read_timeout : float, optional
+            Seconds to wait for the server to send a response. Defaults to 10.
+        max_retries : int, optional
+            How many times GET and PUT requests are retried. Defaults to 3.
+        backoff_factor : float, optional
+            The exponential backoff factor between retries. Defaults to 0.3.
+        cache_size : int, optional
+            The number of lookup responses kept in the cache. Defaults to 256.
+        cache_ttl : float, optional
+            The number of seconds a cached lookup stays valid. Defaults to 300.
+        upload_queue : UploadQueue, optional
+            When given, picture, datasheet and training uploads are queued here
+            and sent by an UploadWorker instead of being sent right away.
+        search_index : ItemSearchIndex, optional
+            A client-side name index kept up to date by insert_new_item and update_item.
+        metrics : Metrics, optional
+            Receives latency histograms, byte counts, error and retry counters of
+            every request, upload and zipdir call, and a trace event for each.
         """
         self.server = server
         self.api_key = api_key
@@ -46,8 +111,141 @@ class Rest:
             'api_key': self.api_key, 
             'accept': 'application/json'
         }
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.session = self._create_session(pool_size, max_retries, backoff_factor)
+        self._latencies = {}
+        self._latency_lock = threading.Lock()
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.last_archive_stats = None
+        self.upload_queue = upload_queue
+        self.upload_worker = None
+        self.search_index = search_index
+        self.metrics = metrics
+
+    def _create_session(self, pool_size, max_retries, backoff_factor):
+        """
+        Creates a keep-alive session with a bounded connection pool and retries.
+
+        Parameters
+        ----------
+        pool_size : int
+            The number of connections kept per host.
+        max_retries : int
+            How many times idempotent requests are retried.
+        backoff_factor : float
+            The exponential backoff factor between retries.
+
+        Returns
+        -------
+        requests.Session
+            The configured session.
+        """
+        retry = Retry(total=max_retries, connect=max_retries, read=max_retries,
+                      status=max_retries, backoff_factor=backoff_factor,
+                      status_forcelist=self.RETRY_STATUS,
+                      allowed_methods=self.RETRY_METHODS, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def warm_up(self, connections=2, timeout=1.0):
+        """
+        Opens pooled keep-alive connections before the first real request.
+
+        Sends HEAD requests to the server URL in parallel, so the TCP (and TLS)
+        setup is paid in the background instead of by the first lookup. The
+        response status does not matter. The requests go straight to the
+        connection pool of the session without retries, so an unreachable
+        server costs at most timeout seconds instead of the full retry budget.
+
+        Parameters
+        ----------
+        connections : int, optional
+            The number of connections to open. Defaults to 2.
+        timeout : float, optional
+            Seconds each connection may take to connect and answer. Defaults to 1.0.
+
+        Returns
+        -------
+        int
+            The number of connections that reached the server.
+        """
+        adapter = self.session.get_adapter(self.server)
+        request = self.session.prepare_request(requests.Request('HEAD', self.server))
+
+        def open_connection(_):
+            try:
+                pool = adapter.get_connection_with_tls_context(request, self.session.verify)
+                pool.urlopen('HEAD', adapter.request_url(request, {}), headers=request.headers,
+                             retries=False, redirect=False, timeout=timeout)
+                return True
+            except (urllib3.exceptions.HTTPError, requests.RequestException, OSError):
+                return False
+
+        connections = min(connections, self.pool_size)
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(open_connection, range(connections)))
+
+    def close(self):
+        """Closes the pooled session and its connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
 
-    def zipdir(self, path, zip_filename):
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _endpoint_template(endpoint):
+        """Groups endpoints like '/item/5' and '/item/7' under '/item/{id}'."""
+        return re.sub(r'/[0-9]+(?=/|$)', '/{id}', endpoint)
+
+    @classmethod
+    def _endpoint_key(cls, method, endpoint):
+        return f"{method} {cls._endpoint_template(endpoint)}"
+
+    def _record_latency(self, method, endpoint, seconds):
+        key = self._endpoint_key(method, endpoint)
+        with self._latency_lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.LATENCY_SAMPLES)
+            samples.append(seconds)
+
+    def latency_stats(self):
+        """
+        Returns latency statistics of the most recent requests per endpoint.
+
+        Returns
+        -------
+        dict
+            Maps 'METHOD /endpoint' to a dict with count, mean, min, p50, p95
+            and max latency in milliseconds.
+        """
+        with self._latency_lock:
+            snapshot = {key: sorted(samples) for key, samples in self._latencies.items()}
+
+        stats = {}
+        for key, samples in snapshot.items():
+            count = len(samples)
+            stats[key] = {
+                'count': count,
+                'mean': sum(samples) / count * 1000,
+                'min': samples[0] * 1000,
+                'p50': samples[int(0.50 * (count - 1))] * 1000,
+                'p95': samples[int(0.95 * (count - 1))] * 1000,
+                'max': samples[-1] * 1000,
+            }
+        return stats
+
+    def zipdir(self, path, zip_filename, output_dir='./inventory_station/src/images',
+               compression=zipfile.ZIP_DEFLATED, compresslevel=6, store_compressed=True,
+               parallel=False, max_workers=None):
         """
         Zips the contents of a directory and returns the path of the zipped file.
 
@@ -57,6 +255,19 @@ class Rest:
             The path to the directory to zip.
         zip_filename : str
             The name of the resulting zip file.
+        output_dir : str, optional
+            The directory the zip file is written to.
+        compression : int, optional
+            The compression method for ordinary files. Defaults to ZIP_DEFLATED.
+        compresslevel : int, optional
+            The compression level for ordinary files. Defaults to 6.
+        store_compressed : bool, optional
+            Whether PNG, JPEG and other compressed formats are stored. Defaults to True.
+        parallel : bool, optional
+            Whether members are deflated in a process pool with ParallelZipBuilder,
+            which also stores high-entropy members. Defaults to False.
+        max_workers : int, optional
+            The number of worker processes when parallel. Defaults to the number of cores.
 
         Returns
         -------
@@ -66,20 +277,28 @@ class Rest:
         if not zip_filename.endswith('.zip'):
             zip_filename += '.zip'
         
-        output_dir = './inventory_station/src/images'
         zip_file_path = os.path.join(output_dir, zip_filename)
+        start = time.perf_counter()
 
-        with zipfile.ZipFile(zip_file_path, 'w', zipfile.ZIP_DEFLATED) as ziph:
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, os.path.join(path, '..'))
-                    ziph.write(file_path, arcname)
+        if parallel and compression == zipfile.ZIP_DEFLATED:
+            builder = ParallelZipBuilder(max_workers, compresslevel, store_compressed)
+            self.last_archive_stats = builder.build(path, zip_file_path)
+        else:
+            with zipfile.ZipFile(zip_file_path, 'w', compression, compresslevel=compresslevel) as ziph:
+                for file_path, arcname in walk_files(path):
+                    ziph.write(file_path, arcname,
+                               compress_type=member_compression(file_path, compression, store_compressed))
 
+        if self.metrics is not None:
+            mode = 'parallel' if parallel else 'serial'
+            seconds, size = time.perf_counter() - start, os.path.getsize(zip_file_path)
+            self.metrics.observe('zipdir_duration_seconds', seconds, mode=mode)
+            self.metrics.inc('zipdir_bytes_total', size, mode=mode)
+            self.metrics.event('zipdir', seconds=seconds, bytes=size, mode=mode, path=path)
         return os.path.abspath(zip_file_path)
             
 
-    def _make_request(self, method, endpoint, params=None, json=None, files=None):
+    def _make_request(self, method, endpoint, params=None, json=None, files=None, data=None, headers=None, raw=False):
         """
         A generic function to make an HTTP request.
 
@@ -95,20 +314,155 @@ class Rest:
             The JSON data to send in the request body.
         files : dict, optional
             Files to be uploaded.
+        data : bytes or iterable of bytes, optional
+            A raw request body; an iterator is sent with chunked transfer encoding.
+        headers : dict, optional
+            Extra headers for this request only.
+        raw : bool, optional
+            Whether the response body is returned as bytes instead of being parsed as JSON.
 
         Returns
         -------
-        dict or str
-            The response JSON if the request is successful, otherwise an error message.
+        dict, bytes or RestError
+            The response JSON (or body) if the request is successful, otherwise an
+            error message that also carries the status code and latency.
         """
         url = f"{self.server}{endpoint}"
         
+        start = time.perf_counter()
+        response = error = None
         try:
-            response = requests.request(method, url, headers=self.headers, params=params, json=json, files=files)
+            response = self.session.request(method, url, params=params, json=json, files=files,
+                                            data=data, headers=headers, timeout=self.timeout)
             response.raise_for_status()
-            return response.json()
+            return response.content if raw else response.json()
         except requests.RequestException as e:
-            return f"Error - {method} request to {endpoint}: {e}"
+            response = e.response if e.response is not None else response
+            status = response.status_code if response is not None else None
+            error = RestError(f"Error - {method} request to {endpoint}: {e}", status=status,
+                              latency=time.perf_counter() - start, method=method, endpoint=endpoint,
+                              sent=not self._never_connected(e))
+            return error
+        finally:
+            seconds = time.perf_counter() - start
+            self._record_latency(method, endpoint, seconds)
+            if self.metrics is not None:
+                self._record_request_metrics(method, endpoint, seconds, response, error)
+
+    @staticmethod
+    def _never_connected(error):
+        """Whether a request failed while connecting, before any of it reached the server."""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if isinstance(error, requests.ConnectionError) and error.args:
+            # NewConnectionError (refused, unreachable, DNS) is a ConnectTimeoutError too
+            return isinstance(getattr(error.args[0], 'reason', None), ConnectTimeoutError)
+        return False
+
+    def _record_request_metrics(self, method, endpoint, seconds, response, error):
+        labels = {'method': method, 'endpoint': self._endpoint_template(endpoint)}
+        status = str(response.status_code) if response is not None else 'none'
+        sent = received = retries = 0
+        if response is not None:
+            body = response.request.body
+            sent = len(body) if isinstance(body, (bytes, str)) else 0  # streamed bodies are counted by upload_stream
+            received = len(response.content)
+            retry_state = getattr(response.raw, 'retries', None)
+            retries = len(retry_state.history) if retry_state is not None else 0
+        self.metrics.observe('rest_request_duration_seconds', seconds, **labels)
+        self.metrics.inc('rest_requests_total', status=status, **labels)
+        self.metrics.inc('rest_request_bytes_total', sent, **labels)
+        self.metrics.inc('rest_response_bytes_total', received, **labels)
+        if retries:
+            self.metrics.inc('rest_retries_total', retries, **labels)
+        if error is not None:
+            self.metrics.inc('rest_errors_total', status=status, **labels)
+        self.metrics.event('request', seconds=seconds, status=status, bytes_sent=sent, bytes_received=received,
+                           retries=retries, error=error, **labels)
+
+    def _cached_request(self, endpoint, params=None, decode=None, fresh=False):
+        """
+        Makes a GET request through the lookup cache.
+
+        Successful responses are cached per endpoint and parameters; errors
+        are never cached.
+
+        Parameters
+        ----------
+        endpoint : str
+            The API endpoint.
+        params : dict, optional
+            The URL parameters for the request.
+        decode : callable, optional
+            Turns the response JSON into records, e.g. Item.decode, before it is cached.
+        fresh : bool, optional
+            Whether the cached response is bypassed and replaced by the server's,
+            e.g. before a record is modified and written back. Defaults to False.
+
+        Returns
+        -------
+        dict, Record or str
+            The response (decoded if requested) if the request is successful, otherwise an error message.
+        """
+        key = (endpoint, tuple(sorted(params.items())) if params else ())
+        result = None if fresh else self.cache.get(key)
+        if result is None:
+            result = self._make_request('GET', endpoint, params=params)
+            if decode is not None:
+                result = decode(result)
+            if not isinstance(result, str):
+                self.cache.set(key, result)
+        return result
+
+    def invalidate_cache(self, prefix=None):
+        """
+        Drops cached lookups.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            Only endpoints starting with this prefix (e.g. '/item') are dropped.
+            Drops everything when omitted.
+
+        Returns
+        -------
+        int
+            The number of dropped entries.
+        """
+        if prefix is None:
+            return self.cache.invalidate()
+        return self.cache.invalidate(lambda key: key[0].startswith(prefix))
+
+    def cache_stats(self):
+        """
+        Returns the hit/miss counters of the lookup cache.
+
+        Returns
+        -------
+        dict
+            The hits, misses, hit rate and current size of the cache.
+        """
+        return self.cache.stats()
+
+    def search_items(self, query, limit=10):
+        """
+        Searches item names in the client-side index without contacting the server.
+
+        Parameters
+        ----------
+        query : str
+            The (possibly partial or misspelled) name to search for.
+        limit : int, optional
+            The maximum number of results. Defaults to 10.
+
+        Returns
+        -------
+        list of tuple or str
+            (score, item_id, item_name) for the best matches, otherwise an error message.
+        """
+        if self.search_index is None:
+            return "Error: No search index is configured."
+        return self.search_index.search(query, limit)
 
     def search_for_item_by_name(self, item_name):
         """
@@ -121,12 +475,12 @@ class Rest:
 
         Returns
         -------
-        dict or str
-            The response JSON if the request is successful, otherwise an error message.
+        list of Item, Item or RestError
+            The matching items if the request is successful, otherwise an error message.
         """
-        return self._make_request('GET', '/item/search', params={'item_name': item_name})
+        return Item.decode(self._make_request('GET', '/item/search', params={'item_name': item_name}))
 
-    def find_item_by_id(self, item_id):
+    def find_item_by_id(self, item_id, fresh=False):
         """
         Finds an item by ID.
 
@@ -134,13 +488,15 @@ class Rest:
         ----------
         item_id : int
             The ID of the item to find.
+        fresh : bool, optional
+            Whether the cache is bypassed. Defaults to False.
 
         Returns
         -------
-        dict or str
-            The response JSON if the request is successful, otherwise an error message.
+        Item or RestError
+            The item if the request is successful, otherwise an error message.
         """
-        return self._make_request('GET', f'/item/{item_id}')
+        return self._cached_request(f'/item/{item_id}', decode=Item.decode, fresh=fresh)
 
     def insert_new_item(self, new_item):
         """
@@ -156,7 +512,12 @@ class Rest:
         dict or str
             The response JSON if the request is successful, otherwise an error message.
         """
-        return self._make_request('POST', '/item', json=new_item)
+        result = self._make_request('POST', '/item', json=new_item)
+        self.invalidate_cache('/item')
+        if self.search_index is not None and isinstance(result, dict):
+            # Only the response carries the item_id the server assigned; a partial one is completed from the request
+            self.search_index.add({**new_item, **result})
+        return result
 
     def update_item(self, updated_item):
         """
@@ -172,9 +533,13 @@ class Rest:
         dict or str
             The response JSON if the request is successful, otherwise an error message.
         """
-        return self._make_request('PUT', '/item', json=updated_item)
+        result = self._make_request('PUT', '/item', json=updated_item)
+        self.invalidate_cache('/item')
+        if self.search_index is not None and isinstance(result, dict):
+            self.search_index.add({**updated_item, **result})
+        return result
 
-    def search_for_box_with_rfid(self, box_rfid):
+    def search_for_box_with_rfid(self, box_rfid, fresh=False):
         """
         Searches for a box by RFID.
 
@@ -182,15 +547,18 @@ class Rest:
         ----------
         box_rfid : str
             The RFID of the box to search for.
+        fresh : bool, optional
+            Whether the cache is bypassed. Defaults to False.
 
         Returns
         -------
-        dict or str
-            The response JSON if the request is successful, otherwise an error message.
+        Box or RestError
+            The box if the request is successful, otherwise an error message.
         """
-        return self._make_request('GET', '/box/search', params={'box_rfid': box_rfid})
+        return self._cached_request('/box/search', params={'box_rfid': box_rfid}, decode=Box.decode,
+                                   fresh=fresh)
 
-    def find_box_by_id(self, box_id):
+    def find_box_by_id(self, box_id, fresh=False):
         """
         Finds a box by ID.
 
@@ -198,13 +566,15 @@ class Rest:
         ----------
         box_id : int
             The ID of the box to find.
+        fresh : bool, optional
+            Whether the cache is bypassed. Defaults to False.
 
         Returns
         -------
-        dict or str
-            The response JSON if the request is successful, otherwise an error message.
+        Box or RestError
+            The box if the request is successful, otherwise an error message.
         """
-        return self._make_request('GET', f'/box/{box_id}')
+        return self._cached_request(f'/box/{box_id}', decode=Box.decode, fresh=fresh)
 
     def insert_new_box(self, new_box):
         """
@@ -220,13 +590,150 @@ class Rest:
         dict or str
             The response JSON if the request is successful, otherwise an error message.
         """
-        return self._make_request('POST', '/box', json=new_box)
+        result = self._make_request('POST', '/box', json=new_box)
+        self.invalidate_cache('/box')
+        return result
+
+    def update_box(self, updated_box):
+        """
+        Updates an existing box, e.g. to move it to another location.
+
+        Parameters
+        ----------
+        updated_box : dict
+            The updated box data.
+
+        Returns
+        -------
+        dict or str
+            The response JSON if the request is successful, otherwise an error message.
+        """
+        result = self._make_request('PUT', '/box', json=updated_box)
+        self.invalidate_cache('/box')
+        return result
     
-    def get_location_by_id(self, location_id):
-        return self._make_request('GET', f'/location/{location_id}')
+    def _batch(self, lookup, keys, max_workers=None):
+        """
+        Runs a lookup for many keys concurrently.
+
+        Parameters
+        ----------
+        lookup : callable
+            The single-key lookup method, e.g. self.find_box_by_id.
+        keys : iterable
+            The keys to look up. Duplicates are looked up only once.
+        max_workers : int, optional
+            The number of concurrent requests. Defaults to the pool size.
+
+        Returns
+        -------
+        dict
+            Maps every distinct key, in order of first appearance, to the
+            response JSON or an error message for that key.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        if not unique_keys:
+            return {}
+        workers = min(max_workers or self.pool_size, len(unique_keys))
+
+        def safe_lookup(key):
+            try:
+                return lookup(key)
+            except Exception as e:
+                return RestError(f"Error - lookup of {key!r}: {e}")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(unique_keys, executor.map(safe_lookup, unique_keys)))
+
+    def find_items_by_ids(self, item_ids, max_workers=None, fresh=False):
+        """
+        Finds many items by ID concurrently.
+
+        Parameters
+        ----------
+        item_ids : iterable of int
+            The IDs of the items to find.
+        max_workers : int, optional
+            The number of concurrent requests. Defaults to the pool size.
+        fresh : bool, optional
+            Whether the cache is bypassed. Defaults to False.
+
+        Returns
+        -------
+        dict
+            Maps each distinct ID to the response JSON or an error message.
+        """
+        return self._batch(partial(self.find_item_by_id, fresh=fresh), item_ids, max_workers)
+
+    def find_boxes_by_ids(self, box_ids, max_workers=None, fresh=False):
+        """
+        Finds many boxes by ID concurrently.
+
+        Parameters
+        ----------
+        box_ids : iterable of int
+            The IDs of the boxes to find.
+        max_workers : int, optional
+            The number of concurrent requests. Defaults to the pool size.
+        fresh : bool, optional
+            Whether the cache is bypassed. Defaults to False.
+
+        Returns
+        -------
+        dict
+            Maps each distinct ID to the response JSON or an error message.
+        """
+        return self._batch(partial(self.find_box_by_id, fresh=fresh), box_ids, max_workers)
+
+    def search_boxes_by_rfids(self, box_rfids, max_workers=None, fresh=False):
+        """
+        Searches for many boxes by RFID concurrently.
+
+        Parameters
+        ----------
+        box_rfids : iterable of str
+            The RFIDs of the boxes to search for.
+        max_workers : int, optional
+            The number of concurrent requests. Defaults to the pool size.
+        fresh : bool, optional
+            Whether the cache is bypassed. Defaults to False.
+
+        Returns
+        -------
+        dict
+            Maps each distinct RFID to the response JSON or an error message.
+        """
+        return self._batch(partial(self.search_for_box_with_rfid, fresh=fresh), box_rfids, max_workers)
+
+    def update_boxes(self, updated_boxes, max_workers=None):
+        """
+        Updates many boxes concurrently.
+
+        The API takes one box per request, so the updates are sent in
+        parallel over the pooled connections. If a box appears more than
+        once, only its last version is sent.
+
+        Parameters
+        ----------
+        updated_boxes : iterable of dict
+            The updated box data, each with its box_id.
+        max_workers : int, optional
+            The number of concurrent requests. Defaults to the pool size.
+
+        Returns
+        -------
+        dict
+            Maps each distinct box ID to the response JSON or an error message.
+        """
+        latest = {str(box['box_id']): box for box in updated_boxes}
+        return self._batch(lambda box_id: self.update_box(latest[box_id]), latest, max_workers)
+
+    def get_location_by_id(self, location_id, fresh=False):
+        return self._cached_request(f'/location/{location_id}', decode=Location.decode, fresh=fresh)
     
-    def search_for_location_by_id(self, location_id):
-        return self._make_request('GET', f'/location/search', params={'location_id': location_id})
+    def search_for_location_by_id(self, location_id, fresh=False):
+        return self._cached_request('/location/search', params={'location_id': location_id},
+                                    decode=Location.decode, fresh=fresh)
 
     def upload_file(self, item_id, file_path, endpoint, params=None, file_type='image/jpeg'):
         """
@@ -249,15 +756,96 @@ class Rest:
         -------
         dict or str
             The response JSON if the request is successful, otherwise an error message.
+            With an upload queue, a dict with the 'upload_id' of the queued upload.
         """
         if not os.path.isfile(file_path):
             return f"Error: The file {file_path} does not exist."
 
+        if self.upload_queue is not None:
+            return self._enqueue_upload(item_id, file_path, endpoint, params, file_type)
+
         file_name = os.path.basename(file_path)
-        files = {'file': (file_name, open(file_path, 'rb'), file_type)}
-        return self._make_request('POST', endpoint.format(item_id), params=params, files=files)
+        start = time.perf_counter()
+        with open(file_path, 'rb') as file:
+            files = {'file': (file_name, file, file_type)}
+            result = self._make_request('POST', endpoint.format(item_id), params=params, files=files)
+        if self.metrics is not None:
+            self._record_upload_metrics(endpoint, time.perf_counter() - start, os.path.getsize(file_path), result)
+        return result
+
+    def _record_upload_metrics(self, endpoint, seconds, size, result):
+        labels = {'endpoint': self._endpoint_template(endpoint.format(0))}
+        self.metrics.observe('rest_upload_duration_seconds', seconds, **labels)
+        if not isinstance(result, str):
+            self.metrics.inc('rest_upload_bytes_total', size, **labels)
+        self.metrics.event('upload', seconds=seconds, bytes=size, error=result if isinstance(result, str) else None,
+                           **labels)
+
+    def _enqueue_upload(self, item_id, file_path, endpoint, params, file_type, file_name=None, delete_after=False):
+        upload_id = self.upload_queue.enqueue(item_id, file_path, endpoint, params=params, file_type=file_type,
+                                              file_name=file_name, delete_after=delete_after)
+        if self.upload_worker is not None:
+            self.upload_worker.notify()  # instead of waiting for its next poll
+        return {'upload_id': upload_id, 'status': self.upload_queue.PENDING}
 
-    def upload_picture(self, item_id, image_path):
+    def upload_stream(self, item_id, chunks, file_name, endpoint, params=None, file_type='application/octet-stream'):
+        """
+        Uploads a file for a specific item from a stream of chunks.
+
+        The multipart body is sent with chunked transfer encoding, so the file
+        never has to exist on disk or in memory as a whole. If producing the
+        chunks fails, e.g. because a file was deleted, the upload is aborted
+        and an error message is returned like for a failed request.
+
+        Parameters
+        ----------
+        item_id : int
+            The ID of the item.
+        chunks : iterable of bytes
+            The file content.
+        file_name : str
+            The file name sent to the server.
+        endpoint : str
+            The API endpoint to upload the file to.
+        params : dict, optional
+            Parameters to include in the request.
+        file_type : str, optional
+            The MIME type of the file. Defaults to 'application/octet-stream'.
+
+        Returns
+        -------
+        dict or str
+            The response JSON if the request is successful, otherwise an error message.
+        """
+        sent = [0]
+        failures = []
+
+        def counted(chunks):
+            try:
+                for chunk in chunks:
+                    sent[0] += len(chunk)
+                    yield chunk
+            except Exception as e:
+                failures.append(e)  # raised inside the request, which may wrap it or let it through
+                raise
+
+        start = time.perf_counter()
+        content_type, body = iter_multipart(counted(chunks), file_name, file_type)
+        try:
+            result = self._make_request('POST', endpoint.format(item_id), params=params, data=body,
+                                        headers={'Content-Type': content_type})
+        except Exception:
+            if not failures:
+                raise
+        if failures:
+            result = RestError(f"Error - POST request to {endpoint.format(item_id)}: reading the upload failed: "
+                               f"{failures[0]}", latency=time.perf_counter() - start, method='POST',
+                               endpoint=endpoint.format(item_id))
+        if self.metrics is not None:
+            self._record_upload_metrics(endpoint, time.perf_counter() - start, sent[0], result)
+        return result
+
+    def upload_picture(self, item_id, image_path, picture_name=None):
         """
         Uploads a picture for a specific item.
 
@@ -267,15 +855,38 @@ class Rest:
             The ID of the item.
         image_path : str
             The path to the image file.
+        picture_name : str, optional
+            The item_picture name stored on the server. Defaults to the file name of image_path.
 
         Returns
         -------
         dict or str
             The response JSON if the request is successful, otherwise an error message.
         """
-        return self.upload_file(item_id, image_path, f'/item/{{}}/uploadPicture', params={'item_picture': 'fdti_adapter.jpg'}, file_type='image/jpeg')
+        picture_name = picture_name or os.path.basename(image_path)
+        file_type = mimetypes.guess_type(picture_name)[0] or 'image/jpeg'
+        return self.upload_file(item_id, image_path, f'/item/{{}}/uploadPicture', params={'item_picture': picture_name}, file_type=file_type)
 
-    def upload_datasheet(self, item_id, datasheet_path):
+    def download_picture(self, item_id, picture_name):
+        """
+        Downloads the picture of a specific item.
+
+        Parameters
+        ----------
+        item_id : int
+            The ID of the item.
+        picture_name : str
+            The item_picture name stored with the item.
+
+        Returns
+        -------
+        bytes or str
+            The image file if the request is successful, otherwise an error message.
+        """
+        return self._make_request('GET', f'/item/{item_id}/downloadPicture', params={'item_picture': picture_name},
+                                  headers={'accept': 'image/*'}, raw=True)
+
+    def upload_datasheet(self, item_id, datasheet_path, datasheet_name=None):
         """
         Uploads a datasheet for a specific item.
 
@@ -285,15 +896,19 @@ class Rest:
             The ID of the item.
         datasheet_path : str
             The path to the datasheet file.
+        datasheet_name : str, optional
+            The item_datasheet name stored on the server. Defaults to the file name of datasheet_path.
 
         Returns
         -------
         dict or str
             The response JSON if the request is successful, otherwise an error message.
         """
-        return self.upload_file(item_id, datasheet_path, f'/item/{{}}/uploadDatasheet', params={'item_datasheet': 'DS_FT232R.pdf'}, file_type='application/pdf')
+        datasheet_name = datasheet_name or os.path.basename(datasheet_path)
+        return self.upload_file(item_id, datasheet_path, f'/item/{{}}/uploadDatasheet', params={'item_datasheet': datasheet_name}, file_type='application/pdf')
 
-    def upload_trainings_picture(self, item_id, segmented_images_path):
+    def upload_trainings_picture(self, item_id, segmented_images_path, stream=True,
+                                 compression=zipfile.ZIP_DEFLATED, compresslevel=6, store_compressed=True):
         """
         Uploads training pictures for a specific item.
 
@@ -303,6 +918,15 @@ class Rest:
             The ID of the item.
         segmented_images_path : str
             The path to the directory containing segmented images.
+        stream : bool, optional
+            Whether the archive is built on the fly into the request body instead
+            of being written to a zip file first. Defaults to True.
+        compression : int, optional
+            The compression method for ordinary files. Defaults to ZIP_DEFLATED.
+        compresslevel : int, optional
+            The compression level for ordinary files. Defaults to 6.
+        store_compressed : bool, optional
+            Whether PNG and JPEG images are stored uncompressed. Defaults to True.
 
         Returns
         -------
@@ -310,9 +934,70 @@ class Rest:
             The response JSON if the request is successful, otherwise an error message.
         """
         zip_file_name = 'segmented_images.zip'
-        zip_segmented_images_path = self.zipdir(segmented_images_path, zip_file_name)
+        if self.upload_queue is not None:
+            # A queued upload may be retried much later, so the archive is spooled to disk.
+            if not os.path.isdir(segmented_images_path):
+                return f"Error: The directory {segmented_images_path} does not exist."
+            spooled_zip_path = self.zipdir(segmented_images_path, f'{item_id}_{time.time_ns()}.zip',
+                                           output_dir=self.upload_queue.spool_dir, compression=compression,
+                                           compresslevel=compresslevel, store_compressed=store_compressed)
+            return self._enqueue_upload(item_id, spooled_zip_path, f'/item/{{}}/uploadTrainingPicture',
+                                        {'item_training_pictures': zip_file_name}, 'application/zip',
+                                        file_name=zip_file_name, delete_after=True)
+        if stream:
+            if not os.path.isdir(segmented_images_path):
+                return f"Error: The directory {segmented_images_path} does not exist."
+            chunks = iter_zip(segmented_images_path, compression, compresslevel, store_compressed)
+            return self.upload_stream(item_id, chunks, zip_file_name, f'/item/{{}}/uploadTrainingPicture',
+                                      params={'item_training_pictures': zip_file_name}, file_type='application/zip')
+        zip_segmented_images_path = self.zipdir(segmented_images_path, zip_file_name, compression=compression,
+                                                compresslevel=compresslevel, store_compressed=store_compressed)
         return self.upload_file(item_id, zip_segmented_images_path, f'/item/{{}}/uploadTrainingPicture', params={'item_training_pictures': zip_file_name}, file_type='application/zip')
 
+    def upload_preprocessed_trainings_pictures(self, item_id, image_paths, preprocessor=None):
+        """
+        Segments captured photos of an item and uploads them as training pictures.
+
+        The segmented images are zipped as they are produced and streamed into
+        the request, so no images/segmented directory is needed.
+
+        Parameters
+        ----------
+        item_id : int
+            The ID of the item.
+        image_paths : iterable of str
+            The captured photos.
+        preprocessor : preprocess.Preprocessor, optional
+            The preprocessing settings. A Preprocessor with default settings is used when omitted.
+
+        Returns
+        -------
+        dict or str
+            The response JSON if the request is successful, otherwise an error message.
+        """
+        if preprocessor is None:
+            from preprocess import Preprocessor  # NumPy and Pillow are only needed for preprocessing
+
+            preprocessor = Preprocessor()
+        zip_file_name = 'segmented_images.zip'
+        chunks = preprocessor.iter_zip(image_paths)
+        if self.upload_queue is not None:
+            os.makedirs(self.upload_queue.spool_dir, exist_ok=True)
+            spooled_zip_path = os.path.join(self.upload_queue.spool_dir, f'{item_id}_{time.time_ns()}.zip')
+            try:
+                with open(spooled_zip_path, 'wb') as spool:
+                    for chunk in chunks:
+                        spool.write(chunk)
+            except Exception as e:
+                if os.path.exists(spooled_zip_path):
+                    os.remove(spooled_zip_path)
+                return RestError(f"Error - spooling the training pictures of item {item_id} failed: {e}")
+            return self._enqueue_upload(item_id, spooled_zip_path, f'/item/{{}}/uploadTrainingPicture',
+                                        {'item_training_pictures': zip_file_name}, 'application/zip',
+                                        file_name=zip_file_name, delete_after=True)
+        return self.upload_stream(item_id, chunks, zip_file_name, f'/item/{{}}/uploadTrainingPicture',
+                                  params={'item_training_pictures': zip_file_name}, file_type='application/zip')
+
 
 if __name__ == '__main__':
 
@@ -0,0 +1,218 @@
+import queue
+import sys
+import threading
+import time
+
+
+class SerialTagSource:
+    """
+    Reads tags from an RFID reader on a serial port, one tag per line.
+
+    Requires pyserial, which is imported only when the source is opened.
+    """
+
+    def __init__(self, port, baudrate=9600, timeout=0.5):
+        """
+        Parameters
+        ----------
+        port : str
+            The serial device, e.g. '/dev/ttyUSB0'.
+        baudrate : int, optional
+            The baud rate of the reader. Defaults to 9600.
+        timeout : float, optional
+            Seconds a read may block, which bounds how fast close() takes effect. Defaults to 0.5.
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._serial = None
+        self._closed = threading.Event()
+
+    def read_tags(self):
+        """Yields tags as they are read until the source is closed."""
+        import serial  # pyserial is only needed when a real reader is attached
+
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+        try:
+            while not self._closed.is_set():
+                line = self._serial.readline().decode('ascii', errors='ignore').strip()
+                if line:
+                    yield line
+        finally:
+            self._serial.close()
+
+    def close(self):
+        """Stops reading."""
+        self._closed.set()
+
+
+class StdinTagSource:
+    """Reads tags typed or piped into standard input, one tag per line."""
+
+    def __init__(self, stream=None):
+        """
+        Parameters
+        ----------
+        stream : file, optional
+            The stream to read. Defaults to sys.stdin.
+        """
+        self.stream = stream or sys.stdin
+
+    def read_tags(self):
+        """Yields tags until the stream ends."""
+        for line in self.stream:
+            line = line.strip()
+            if line:
+                yield line
+
+    def close(self):
+        """Nothing to release; the stream is owned by the caller."""
+
+
+class ReplayTagSource:
+    """
+    Replays a recorded scan session for tests and demos.
+
+    Each line of the file is '<seconds> <tag>', the delay before the tag, or
+    just '<tag>', which uses the default delay.
+    """
+
+    def __init__(self, path, default_delay=1.0, speed=1.0):
+        """
+        Parameters
+        ----------
+        path : str
+            The replay file.
+        default_delay : float, optional
+            The delay before tags without their own delay. Defaults to 1 second.
+        speed : float, optional
+            Replay speed factor; 2 replays twice as fast. Defaults to 1.
+        """
+        self.path = path
+        self.default_delay = default_delay
+        self.speed = speed
+        self._closed = threading.Event()
+
+    def read_tags(self):
+        """Yields the recorded tags with their recorded delays."""
+        with open(self.path) as replay:
+            for line in replay:
+                parts = line.split()
+                if not parts or parts[0].startswith('#'):
+                    continue
+                delay, tag = (float(parts[0]), parts[1]) if len(parts) > 1 else (self.default_delay, parts[0])
+                if self._closed.wait(delay / self.speed):
+                    return
+                yield tag
+
+    def close(self):
+        """Stops the replay."""
+        self._closed.set()
+
+
+class RfidReader:
+    """
+    Reads tags from a source on a background thread and delivers them to the Tk thread.
+
+    A tag held on the reader is usually reported many times per second, so a
+    tag is only delivered again after it has not been seen for debounce seconds.
+
+    Attributes
+    ----------
+    source : object
+        A tag source with read_tags() and close(), e.g. SerialTagSource.
+    debounce : float
+        Seconds during which repeated reads of the same tag are dropped.
+    """
+
+    POLL_INTERVAL_MS = 16
+
+    def __init__(self, source, debounce=1.0):
+        """
+        Parameters
+        ----------
+        source : object
+            A tag source with read_tags() and close().
+        debounce : float, optional
+            Seconds during which repeated reads of the same tag are dropped. Defaults to 1.
+        """
+        self.source = source
+        self.debounce = debounce
+        self.events = queue.SimpleQueue()
+        self._last_seen = {}
+        self._thread = None
+        self._poll_job = None
+
+    def start(self):
+        """Starts reading on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='rfid-reader', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            for tag in self.source.read_tags():
+                self.feed(tag)
+        except Exception as e:
+            self.events.put(('error', str(e), time.monotonic()))
+
+    def feed(self, tag, now=None):
+        """
+        Accepts a raw read, dropping it if the same tag was seen within the debounce window.
+
+        Returns
+        -------
+        bool
+            Whether the tag was passed on.
+        """
+        now = time.monotonic() if now is None else now
+        last_seen = self._last_seen.pop(tag, None)
+        self._last_seen[tag] = now  # re-inserted, so the dict stays ordered by the time of the last read
+        while self._last_seen:
+            oldest = next(iter(self._last_seen))
+            if now - self._last_seen[oldest] < self.debounce:
+                break
+            del self._last_seen[oldest]  # outside the window, it no longer drops anything
+        if last_seen is not None and now - last_seen < self.debounce:
+            return False
+        self.events.put(('tag', tag, now))
+        return True
+
+    def poll(self, root, on_tag, on_error=None):
+        """
+        Delivers tag events on the Tk thread via root.after until stop() is called.
+
+        Parameters
+        ----------
+        root : tkinter.Misc
+            The Tk root.
+        on_tag : callable
+            Called with each debounced tag.
+        on_error : callable, optional
+            Called with the message if the source fails.
+
+        A callback that raises is reported through root.report_callback_exception
+        and does not stop the delivery of later tags.
+        """
+        try:
+            while True:
+                try:
+                    kind, value, _ = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    if kind == 'tag':
+                        on_tag(value)
+                    elif on_error is not None:
+                        on_error(value)
+                except Exception:
+                    root.report_callback_exception(*sys.exc_info())
+        finally:
+            self._poll_job = root.after(self.POLL_INTERVAL_MS, self.poll, root, on_tag, on_error)
+
+    def stop(self, root=None):
+        """Stops reading and, if root is given, polling."""
+        if root is not None and self._poll_job is not None:
+            root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.source.close()
@@ -0,0 +1,121 @@
+import itertools
+import time
+
+
+class Scheduler:
+    """
+    Owns every timed UI job so that leaving a screen cancels all of its jobs at once.
+
+    Jobs are scoped to the active screen: enter(name) cancels everything the
+    previous screen scheduled. Countdowns do not get an after() chain each;
+    they are all advanced by one shared tick that only runs while a
+    countdown is active.
+
+    Attributes
+    ----------
+    root : tkinter.Misc
+        The Tk root whose after() is used.
+    scope : str or None
+        The name of the active screen.
+    tick_ms : int
+        The interval of the shared countdown tick in milliseconds.
+    """
+
+    def __init__(self, root, tick_ms=100, clock=time.monotonic):
+        self.root = root
+        self.scope = None
+        self.tick_ms = tick_ms
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self._jobs = {}  # job id -> (scope, Tk after id)
+        self._countdowns = {}  # job id -> [scope, remaining, interval, next deadline, on_tick, on_done]
+        self._tick_job = None
+
+    def enter(self, scope):
+        """Make scope the active screen, cancelling every job of the previous one."""
+        self.cancel_scope(self.scope)
+        self.scope = scope
+
+    def after(self, delay_ms, callback, *args):
+        """Run callback(*args) after delay_ms unless the screen changes first; return the job id."""
+        job_id = next(self._ids)
+
+        def run():
+            self._jobs.pop(job_id, None)
+            callback(*args)
+
+        self._jobs[job_id] = (self.scope, self.root.after(delay_ms, run))
+        return job_id
+
+    def countdown(self, count, on_tick, on_done=None, interval_ms=1000):
+        """
+        Count down from count, calling on_tick(remaining) every interval and on_done(), if given, at zero.
+
+        on_tick(count) is called immediately. Returns the job id.
+        """
+        job_id = next(self._ids)
+        self._countdowns[job_id] = [self.scope, count, interval_ms / 1000,
+                                    self._clock() + interval_ms / 1000, on_tick, on_done]
+        on_tick(count)
+        if self._tick_job is None:
+            self._tick_job = self.root.after(self.tick_ms, self._tick)
+        return job_id
+
+    def _tick(self):
+        self._tick_job = None
+        now = self._clock()
+        for job_id, countdown in list(self._countdowns.items()):
+            if job_id not in self._countdowns or countdown[3] > now:
+                continue  # cancelled by an earlier callback, or not due yet
+            countdown[1] -= 1
+            countdown[3] += countdown[2]
+            if countdown[1] > 0:
+                countdown[4](countdown[1])
+            else:
+                del self._countdowns[job_id]
+                if countdown[5] is not None:
+                    countdown[5]()
+        if self._countdowns and self._tick_job is None:
+            self._tick_job = self.root.after(self.tick_ms, self._tick)
+
+    def cancel(self, job_id):
+        """Cancel a single job or countdown."""
+        job = self._jobs.pop(job_id, None)
+        if job is not None:
+            self.root.after_cancel(job[1])
+        self._countdowns.pop(job_id, None)
+        self._stop_tick_if_idle()
+
+    def cancel_scope(self, scope):
+        """Cancel every job and countdown scheduled while scope was active."""
+        for job_id in [job_id for job_id, job in self._jobs.items() if job[0] == scope]:
+            self.root.after_cancel(self._jobs.pop(job_id)[1])
+        for job_id in [job_id for job_id, countdown in self._countdowns.items() if countdown[0] == scope]:
+            del self._countdowns[job_id]
+        self._stop_tick_if_idle()
+
+    def cancel_all(self):
+        """Cancel every job and countdown."""
+        for _, after_id in self._jobs.values():
+            self.root.after_cancel(after_id)
+        self._jobs.clear()
+        self._countdowns.clear()
+        self._stop_tick_if_idle()
+
+    def _stop_tick_if_idle(self):
+        if not self._countdowns and self._tick_job is not None:
+            self.root.after_cancel(self._tick_job)
+            self._tick_job = None
+
+    def pending(self):
+        """Return the number of pending jobs, countdowns included."""
+        return len(self._jobs) + len(self._countdowns)
+
+    def pending_by_scope(self):
+        """Return the number of pending jobs per screen."""
+        counts = {}
+        for scope, _ in self._jobs.values():
+            counts[scope] = counts.get(scope, 0) + 1
+        for countdown in self._countdowns.values():
+            counts[countdown[0]] = counts.get(countdown[0], 0) + 1
+        return counts
@@ -0,0 +1,131 @@
+import time
+from collections import deque
+
+import customtkinter as ctk
+
+
+class ScreenManager:
+    """
+    Builds every screen once as a persistent frame and switches by raising it.
+
+    All screen frames share one grid cell of the root window, so a transition
+    is a tkraise() of an existing frame plus an update of its dynamic text
+    instead of destroying and recreating every widget.
+
+    Attributes
+    ----------
+    root : tkinter.Misc
+        The window the screens live in.
+    current : str or None
+        The name of the screen on top.
+    metrics : Metrics or None
+        Receives the build and transition time of every screen.
+    """
+
+    TIMING_SAMPLES = 1000
+
+    def __init__(self, root, metrics=None, clock=time.perf_counter):
+        self.root = root
+        self.current = None
+        self.metrics = metrics
+        self._builders = {}
+        self._frames = {}
+        self._fonts = {}
+        self._timings = {}
+        self._clock = clock
+        self._transition = None  # (name, start) of the transition that is not painted yet
+        root.grid_rowconfigure(0, weight=1)
+        root.grid_columnconfigure(0, weight=1)
+
+    def font(self, size):
+        """Return the shared font of the given size, creating it on first use."""
+        if size not in self._fonts:
+            self._fonts[size] = ctk.CTkFont(size=size)
+        return self._fonts[size]
+
+    def register(self, name, build):
+        """Register build(frame), which creates the widgets of a screen inside frame."""
+        self._builders[name] = build
+
+    def frame(self, name):
+        """Return the frame of a screen, building it on first use."""
+        if name not in self._frames:
+            start = self._clock()
+            frame = ctk.CTkFrame(self.root, fg_color="transparent")
+            frame.grid(row=0, column=0, sticky="nsew")
+            self._builders[name](frame)
+            self._frames[name] = frame
+            if self.metrics is not None:
+                seconds = self._clock() - start
+                self.metrics.observe('gui_page_build_seconds', seconds, screen=name)
+                self.metrics.event('page_build', screen=name, seconds=seconds)
+        return self._frames[name]
+
+    def show(self, name, update=None):
+        """
+        Raise a screen, calling update(frame) first to refresh its dynamic content.
+
+        The transition is timed until Tk is idle again, so it also covers what
+        the caller updates after show() returns, e.g. the labels set by the
+        *_page methods of InventoryApp, and the redraw.
+
+        Returns the frame of the screen.
+        """
+        self._finish_transition()  # the previous screen was never painted
+        start = self._clock()
+        frame = self.frame(name)
+        if update is not None:
+            update(frame)
+        frame.tkraise()
+        self.current = name
+        self._transition = (name, start)
+        # Idle callbacks run after the pending redraws, like the first paint mark of the startup profile
+        self.root.after_idle(self._finish_transition)
+        return frame
+
+    def _finish_transition(self):
+        if self._transition is None:
+            return
+        name, start = self._transition
+        self._transition = None
+        seconds = self._clock() - start
+        self._timings.setdefault(name, deque(maxlen=self.TIMING_SAMPLES)).append(seconds)
+        if self.metrics is not None:
+            self.metrics.observe('gui_transition_seconds', seconds, screen=name)
+            self.metrics.event('transition', screen=name, seconds=seconds)
+
+    def prebuild_next(self):
+        """
+        Build the next screen that was not built yet, keeping the current one on top.
+
+        Lets a caller spread prebuilding over several idle callbacks, one screen each.
+
+        Returns
+        -------
+        bool
+            Whether screens remain to be built.
+        """
+        unbuilt = [name for name in self._builders if name not in self._frames]
+        if unbuilt:
+            self.frame(unbuilt[0])
+            if self.current is not None:
+                self._frames[self.current].tkraise()
+        return len(unbuilt) > 1
+
+    def prebuild(self):
+        """Build every registered screen up front, e.g. while the kiosk is idle."""
+        for name in self._builders:
+            self.frame(name)
+        if self.current is not None:
+            self._frames[self.current].tkraise()
+
+    def transition_stats(self):
+        """Return count, mean and max transition time in milliseconds over the recent transitions per screen."""
+        return {
+            name: {
+                'count': len(samples),
+                'mean_ms': sum(samples) / len(samples) * 1000,
+                'max_ms': max(samples) * 1000,
+            }
+            for name, samples in self._timings.items()
+        }
@@ -0,0 +1,252 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+_TOKEN_PATTERN = re.compile(r'[0-9a-z]+')
+
+
+def normalize(text):
+    """Lowercases text and reduces it to space-separated alphanumeric tokens."""
+    return ' '.join(_TOKEN_PATTERN.findall(str(text).lower()))
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Returns the edit distance between a and b, or max_distance + 1 if it is larger.
+
+    Inserting, deleting or replacing a character and swapping two adjacent
+    ones each count as one edit, so 'fdti' is one edit away from 'ftdi'.
+    Only a band of width 2 * max_distance + 1 around the diagonal is computed.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [max_distance + 1] * len(b)
+        low, high = max(1, i - max_distance), min(len(b), i + max_distance)
+        for j in range(low, high + 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != b[j - 1]))
+            if before is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == b[j - 1]:
+                distance = min(distance, before[j - 2] + 1)
+            current[j] = distance
+        if min(current) > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class ItemSearchIndex:
+    """
+    An in-memory index over item names with prefix, token and fuzzy matching.
+
+    Queries are matched token by token. Type-ahead queries are answered from
+    the items with a token starting with the last query token. Only if that
+    finds too little, every query token is matched against the vocabulary of
+    item tokens, exactly, as a prefix or within a small edit distance, and
+    the items having a match for every query token are scored.
+
+    Attributes
+    ----------
+    max_candidates : int
+        How many prefix candidates are scored per query.
+    max_fuzzy_candidates : int
+        How many tokens of the vocabulary a query token is matched with at most.
+    """
+
+    def __init__(self, items=(), max_candidates=200, max_fuzzy_candidates=50):
+        """
+        Builds the index.
+
+        Parameters
+        ----------
+        items : iterable of dict, optional
+            Item records with 'item_id' and 'item_name'.
+        max_candidates : int, optional
+            How many prefix candidates are scored per query. Defaults to 200.
+        max_fuzzy_candidates : int, optional
+            How many tokens of the vocabulary a query token is matched with at most. Defaults to 50.
+        """
+        self.max_candidates = max_candidates
+        self.max_fuzzy_candidates = max_fuzzy_candidates
+        self._lock = threading.RLock()
+        self._names = {}
+        self._tokens = {}
+        self._token_postings = defaultdict(set)
+        self._sorted_tokens = []
+        self._tokens_by_length = defaultdict(set)
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, item):
+        """
+        Adds or updates an item.
+
+        Parameters
+        ----------
+        item : dict
+            An item record with 'item_id' and 'item_name'.
+        """
+        item_id, name = item.get('item_id'), item.get('item_name')
+        if item_id in (None, '') or not name:
+            return
+        item_id = str(item_id)
+        with self._lock:
+            self.remove(item_id)
+            text = normalize(name)
+            tokens = set(text.split())
+            self._names[item_id] = (name, text)
+            self._tokens[item_id] = tokens
+            for token in tokens:
+                if not self._token_postings[token]:
+                    bisect.insort(self._sorted_tokens, token)
+                    self._tokens_by_length[len(token)].add(token)
+                self._token_postings[token].add(item_id)
+
+    def remove(self, item_id):
+        """Removes an item from the index if it is present."""
+        item_id = str(item_id)
+        with self._lock:
+            entry = self._names.pop(item_id, None)
+            if entry is None:
+                return
+            for token in self._tokens.pop(item_id):
+                postings = self._token_postings[token]
+                postings.discard(item_id)
+                if not postings:
+                    del self._token_postings[token]
+                    del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+                    self._tokens_by_length[len(token)].discard(token)
+
+    def _prefix_tokens(self, prefix):
+        """Yields the tokens of the vocabulary starting with prefix, in order."""
+        tokens = self._sorted_tokens
+        for index in range(bisect.bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[index].startswith(prefix):
+                return
+            yield tokens[index]
+
+    def _prefix_matches(self, prefix, limit):
+        """Returns the IDs of up to limit items with a token starting with prefix."""
+        ids = set()
+        for token in self._prefix_tokens(prefix):
+            for item_id in self._token_postings[token]:
+                ids.add(item_id)
+                if len(ids) >= limit:
+                    return ids
+        return ids
+
+    def _similar_tokens(self, query_token):
+        """
+        Scores the tokens of the vocabulary that match query_token.
+
+        Returns
+        -------
+        dict
+            Up to max_fuzzy_candidates tokens, the best first, with their score:
+            1 for the token itself, 0.9 for longer tokens starting with it and
+            less than 0.8 for tokens within one edit (two for tokens longer than
+            five characters).
+        """
+        matches = {}
+        if query_token in self._token_postings:
+            matches[query_token] = 1.0
+        for token in self._prefix_tokens(query_token):
+            if len(matches) >= self.max_fuzzy_candidates:
+                return matches
+            matches.setdefault(token, 0.9)
+        max_distance = 1 if len(query_token) <= 5 else 2
+        characters = set(query_token)
+        similar = []
+        for length in range(len(query_token) - max_distance, len(query_token) + max_distance + 1):
+            for token in self._tokens_by_length.get(length, ()):
+                # Every character that only one of the two has takes at least one edit.
+                if token in matches or len(characters.difference(token)) > max_distance or \
+                        len(set(token).difference(characters)) > max_distance:
+                    continue
+                distance = edit_distance(query_token, token, max_distance)
+                if distance <= max_distance:
+                    similar.append((0.8 * (1 - distance / (max(length, len(query_token)) + 1)), token))
+        similar.sort(key=lambda match: (-match[0], match[1]))
+        for score, token in similar[:self.max_fuzzy_candidates - len(matches)]:
+            matches[token] = score
+        return matches
+
+    def _fuzzy_matches(self, token_matches):
+        """Returns the IDs of the items with a matching token for every query token."""
+        postings = []
+        for matches in token_matches:
+            ids = set()
+            for token in matches:
+                ids |= self._token_postings[token]
+            postings.append(ids)
+        postings.sort(key=len)
+        return set.intersection(*postings) if postings else set()
+
+    def _score(self, candidates, text, query_tokens, token_matches=None):
+        """Scores candidate items against a query; see search() for the scale."""
+        results = []
+        for item_id in candidates:
+            name, item_text = self._names[item_id]
+            tokens = self._tokens[item_id]
+            if token_matches is None:
+                score = sum(self._token_score(token, tokens) for token in query_tokens) / len(query_tokens)
+            else:
+                score = sum(max(matches.get(token, 0.0) for token in tokens)
+                            for matches in token_matches) / len(token_matches)
+            if item_text == text:
+                score += 0.1
+            elif item_text.startswith(text):
+                score += 0.05
+            if score > 0:
+                results.append((score, item_id, name))
+        return results
+
+    @staticmethod
+    def _token_score(query_token, tokens):
+        """Scores how well one query token matches the best of an item's tokens, without typos."""
+        best = 0.0
+        for token in tokens:
+            if token == query_token:
+                return 1.0
+            if token.startswith(query_token):
+                best = 0.9
+        return best
+
+    def search(self, query, limit=10):
+        """
+        Searches item names.
+
+        Parameters
+        ----------
+        query : str
+            The (possibly partial or misspelled) name to search for.
+        limit : int, optional
+            The maximum number of results. Defaults to 10.
+
+        Returns
+        -------
+        list of tuple
+            (score, item_id, item_name) for the best matches, highest score first.
+            Scores range from 0 to 1.1; exact name matches score highest.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+        query_tokens = text.split()
+
+        with self._lock:
+            # Type-ahead queries are answered from the prefix matches alone; the
+            # misspelled tokens of the vocabulary are only searched when that finds too little.
+            results = self._score(self._prefix_matches(query_tokens[-1], self.max_candidates), text, query_tokens)
+            if sum(score >= 0.9 for score, _, _ in results) < limit:
+                token_matches = [self._similar_tokens(token) for token in dict.fromkeys(query_tokens)]
+                candidates = self._fuzzy_matches(token_matches)
+                candidates.difference_update(item_id for _, item_id, _ in results)
+                results += self._score(candidates, text, query_tokens, token_matches)
+
+        results.sort(key=lambda result: (-result[0], result[2]))
+        return results[:limit]
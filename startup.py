@@ -0,0 +1,126 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+def process_age():
+    """Return the seconds since this process was started, or None where /proc is not available."""
+    try:
+        with open('/proc/self/stat') as file:
+            # The command name may contain spaces, so the fields are counted after its closing parenthesis.
+            fields = file.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as file:
+            uptime = float(file.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfiler:
+    """
+    Measures how long the station takes to become interactive after a (re)boot.
+
+    Marks are the seconds from start to a named moment, e.g. 'imported' or
+    'first_paint'; phases are the summed seconds of named blocks, e.g. the
+    import of a module that is only loaded on first use. The report holds
+    both, the seconds the interpreter needed before start (where the OS
+    tells) and whether first paint stayed within the budget.
+
+    Attributes
+    ----------
+    start : float
+        The perf_counter() value the marks are measured from.
+    budget : float or None
+        The allowed seconds from start to first paint.
+    marks : dict
+        Seconds from start by mark name, in the order they were taken.
+    phases : dict
+        Summed seconds by phase name.
+    """
+
+    def __init__(self, start=None, budget=None, output=None, metrics=None, clock=time.perf_counter):
+        """
+        Parameters
+        ----------
+        start : float, optional
+            The perf_counter() value at the start of main.py. Defaults to now.
+        budget : float, optional
+            The allowed seconds from start to first paint.
+        output : str, optional
+            Where finish() writes the report: a JSON file, or '-' for a summary on stderr.
+        metrics : Metrics, optional
+            Receives every mark as a startup_seconds sample.
+        clock : callable, optional
+            The time source. Defaults to time.perf_counter.
+        """
+        self._clock = clock
+        self.start = clock() if start is None else start
+        self.budget = budget
+        self.output = output
+        self.metrics = metrics
+        self.before_start = process_age()
+        if self.before_start is not None:
+            self.before_start -= clock() - self.start
+        self.marks = {}
+        self.phases = {}
+        self.finished = False
+
+    def mark(self, name, at=None):
+        """Record the seconds from start to now (or to the clock value at); the first mark of a name counts."""
+        seconds = (self._clock() if at is None else at) - self.start
+        return self.marks.setdefault(name, seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Add the seconds spent in a with block to the phase called name."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + self._clock() - start
+
+    @property
+    def over_budget(self):
+        first_paint = self.marks.get('first_paint')
+        return self.budget is not None and first_paint is not None and first_paint > self.budget
+
+    def report(self):
+        """Return the marks, phases and budget as a JSON-ready dict."""
+        return {
+            'before_start': self.before_start,
+            'marks': dict(self.marks),
+            'phases': dict(self.phases),
+            'budget': self.budget,
+            'over_budget': self.over_budget,
+        }
+
+    def summary(self):
+        """Return the report as one line of text."""
+        parts = [f'{name} {seconds * 1000:.0f} ms' for name, seconds in self.marks.items()]
+        parts += [f'{name} {seconds * 1000:.0f} ms' for name, seconds in self.phases.items()]
+        if self.before_start is not None:
+            parts.insert(0, f'interpreter {self.before_start * 1000:.0f} ms')
+        line = 'startup: ' + ', '.join(parts)
+        if self.over_budget:
+            line += f' - first paint over the budget of {self.budget * 1000:.0f} ms'
+        return line
+
+    def finish(self):
+        """Write the report to the output and the metrics, once."""
+        if self.finished:
+            return
+        self.finished = True
+        if self.metrics is not None:
+            for name, seconds in self.marks.items():
+                self.metrics.observe('startup_seconds', seconds, mark=name)
+            self.metrics.event('startup', **self.report())
+        if self.output == '-':
+            print(self.summary(), file=sys.stderr)
+        elif self.output:
+            with open(self.output, 'w') as file:
+                json.dump(self.report(), file, indent=2)
+                file.write('\n')
+        elif self.over_budget:
+            print(self.summary(), file=sys.stderr)
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# The station's modules live at the top of the repository, not in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeRoot:
+    """Records the after() jobs and reported exceptions instead of running a Tk mainloop."""
+
+    def __init__(self):
+        self.jobs = []
+        self.idle = []
+        self.cancelled = []
+        self.reported = []
+
+    def after(self, delay_ms, callback, *args):
+        self.jobs.append((callback, args))
+        return len(self.jobs)
+
+    def after_idle(self, callback, *args):
+        self.idle.append((callback, args))
+
+    def after_cancel(self, job):
+        self.cancelled.append(job)
+
+    def run_idle(self):
+        """Run the idle callbacks, as Tk does once the pending events are handled."""
+        idle, self.idle = self.idle, []
+        for callback, args in idle:
+            callback(*args)
+
+    def grid_rowconfigure(self, index, **options):
+        pass
+
+    def grid_columnconfigure(self, index, **options):
+        pass
+
+    def report_callback_exception(self, exc_type, exc_value, traceback):
+        self.reported.append(exc_value)
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
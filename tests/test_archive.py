@@ -0,0 +1,46 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from archive import ParallelZipBuilder, iter_zip_entries
+
+
+def test_parallel_build_round_trips(tmp_path):
+    source = tmp_path / 'pictures'
+    (source / 'nested').mkdir(parents=True)
+    contents = {}
+    for i in range(12):
+        name = os.path.join('pictures', 'nested' if i % 2 else '', f'file{i}.{"jpg" if i % 3 == 0 else "txt"}')
+        data = os.urandom(4096) if i % 4 == 0 else f'line {i}\n'.encode() * 500
+        (tmp_path / name).write_bytes(data)
+        contents[os.path.normpath(name).replace(os.sep, '/')] = data
+
+    stats = ParallelZipBuilder(max_workers=2).build(str(source), str(tmp_path / 'pictures.zip'))
+
+    with zipfile.ZipFile(tmp_path / 'pictures.zip') as archive:
+        assert archive.testzip() is None
+        assert {name: archive.read(name) for name in archive.namelist()} == contents
+    assert stats['files'] == 12
+    assert 0 < stats['stored'] < 12
+
+
+def test_repeated_member_names_are_numbered():
+    entries = [('segmented/photo.png', b'a'), ('segmented/photo.png', b'b'), ('segmented/PHOTO.png', b'c')]
+    with zipfile.ZipFile(io.BytesIO(b''.join(iter_zip_entries(entries)))) as archive:
+        assert archive.namelist() == ['segmented/photo.png', 'segmented/photo (2).png', 'segmented/PHOTO (3).png']
+        assert archive.read('segmented/PHOTO (3).png') == b'c'
+
+
+def test_too_large_archive_is_refused_before_it_is_written(tmp_path):
+    source = tmp_path / 'pictures'
+    source.mkdir()
+    for i in range(4):
+        (source / f'noise{i}.bin').write_bytes(os.urandom(1000))
+    builder = ParallelZipBuilder(max_workers=2)
+    builder.MAX_ZIP_SIZE = 2500
+
+    with pytest.raises(ValueError, match='too large'):
+        builder.build(str(source), str(tmp_path / 'pictures.zip'))
+    assert not (tmp_path / 'pictures.zip').exists()
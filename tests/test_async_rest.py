@@ -0,0 +1,30 @@
+import time
+
+from async_rest import TkAsyncBridge
+
+
+async def value(result):
+    return result
+
+
+def wait_for_results(bridge, count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while bridge._results.qsize() < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_raising_callback_is_reported_and_polling_goes_on(root):
+    bridge = TkAsyncBridge(root)
+    delivered = []
+    try:
+        bridge.submit(value(1), lambda result: 1 / 0)
+        bridge.submit(value(2), delivered.append)
+        wait_for_results(bridge, 2)
+        jobs = len(root.jobs)
+        bridge._poll()
+    finally:
+        bridge.close()
+
+    assert delivered == [2]
+    assert len(root.reported) == 1 and isinstance(root.reported[0], ZeroDivisionError)
+    assert len(root.jobs) == jobs + 1
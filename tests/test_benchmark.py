@@ -0,0 +1,46 @@
+import pytest
+
+from benchmark import best_of, compare, spread
+
+
+def report(results, parameters=None, rounds=None):
+    return {'parameters': parameters or {'requests': 100, 'tolerance': 0.1}, 'results': results,
+            'spread': spread(rounds) if rounds else {}}
+
+
+def regressions(baseline, current, **options):
+    return [row['name'] for row in compare(baseline, current, 0.10, **options) if row['regression']]
+
+
+def test_slower_lookups_are_regressions():
+    baseline = report({'lookups': {'per_s': 1000, 'mean_ms': 8.0}})
+    current = report({'lookups': {'per_s': 800, 'mean_ms': 10.0}})
+    assert regressions(baseline, current) == ['lookups.mean_ms', 'lookups.per_s']
+
+
+def test_tail_latencies_and_fault_counts_are_not_compared():
+    baseline = report({'faults': {'max_ms': 10.0, 'p99_ms': 9.0, 'injected_errors': 10, 'throttled': 200}})
+    current = report({'faults': {'max_ms': 90.0, 'p99_ms': 30.0, 'injected_errors': 30, 'throttled': 600}})
+    assert compare(baseline, current, 0.10) == []
+
+
+def test_changes_below_the_noise_floor_are_not_regressions():
+    baseline = report({'cached': {'per_s': 400000, 'mean_ms': 0.0025}})
+    current = report({'cached': {'per_s': 200000, 'mean_ms': 0.005}})
+    assert regressions(baseline, current) == []
+    assert regressions(baseline, current, noise_floor_ms=0) == ['cached.mean_ms', 'cached.per_s']
+
+
+def test_spread_of_the_rounds_widens_the_tolerance():
+    rounds = [{'lookups': {'mean_ms': 8.0}}, {'lookups': {'mean_ms': 9.6}}]
+    baseline = report(best_of(rounds), rounds=rounds)
+    assert baseline['results'] == {'lookups': {'mean_ms': 8.0}}
+    assert regressions(baseline, report({'lookups': {'mean_ms': 9.6}})) == []
+    assert regressions(baseline, report({'lookups': {'mean_ms': 11.0}})) == ['lookups.mean_ms']
+
+
+def test_reports_with_different_parameters_are_refused():
+    baseline = report({'lookups': {'per_s': 1000}}, parameters={'requests': 100, 'tolerance': 0.1})
+    current = report({'lookups': {'per_s': 1000}}, parameters={'requests': 200, 'tolerance': 0.2})
+    with pytest.raises(ValueError, match='requests'):
+        compare(baseline, current, 0.10)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from camera import CapturePipeline, DirectorySource, evaluation_pool, frame_quality
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = evaluation_pool(2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def frames(tmp_path):
+    """A sharp checkerboard and a flat, blurry gray frame, served alternately."""
+    directory = tmp_path / 'frames'
+    directory.mkdir()
+    checkerboard = np.indices((64, 64)).sum(axis=0) % 2 * 150 + 50
+    Image.fromarray(np.stack([checkerboard] * 3, axis=-1).astype(np.uint8)).save(directory / 'a_sharp.png')
+    Image.fromarray(np.full((64, 64, 3), 128, dtype=np.uint8)).save(directory / 'b_flat.png')
+    return DirectorySource(str(directory))
+
+
+def test_flat_frames_are_not_sharp():
+    sharpness, brightness, clipped = frame_quality(np.full((8, 8, 3), 128, dtype=np.uint8))
+    assert sharpness == 0
+    assert brightness == pytest.approx(128 / 255, abs=0.01)
+    assert clipped == 0
+
+
+def test_captures_sharing_a_pool_keep_their_own_frames(frames, pool, tmp_path):
+    for name in ('first', 'second'):
+        pipeline = CapturePipeline(frames, count=6, capacity=2, pool=pool, output_dir=str(tmp_path / name))
+        pipeline.start()
+        assert pipeline.wait(30)
+        assert pipeline.error is None
+        assert [frame.index for frame in pipeline.usable()] == [0, 2, 4]
+        assert sorted(path.name for path in (tmp_path / name).iterdir()) == [
+            'frame_0000.png', 'frame_0002.png', 'frame_0004.png']
+    assert pipeline.progress() == 1.0
+
+
+def test_cancelled_capture_stops_early(frames, pool):
+    pipeline = CapturePipeline(frames, count=100, capacity=2, pool=pool, frame_interval=0.01)
+    pipeline.start()
+    pipeline.cancel()
+    assert pipeline.wait(10)
+    assert pipeline.captured < 100
@@ -0,0 +1,115 @@
+import pytest
+
+from flow import inventory_flow
+
+
+class Actions:
+    """Records the pages shown and keeps the emit function of the tasks started."""
+
+    def __init__(self):
+        self.pages = []
+        self.emits = {}
+
+    def __getattr__(self, name):
+        if name.endswith('_page'):
+            return lambda: self.pages.append(name)
+        return lambda emit: self.emits.__setitem__(name, emit)
+
+
+@pytest.fixture
+def actions():
+    return Actions()
+
+
+class Clock:
+    """A monotonic clock that only moves when advanced."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def machine(actions, root, clock):
+    machine = inventory_flow(actions, root.after, root.after_cancel, clock=clock)
+    machine.start()
+    return machine
+
+
+def fire_timeout(root):
+    callback, args = root.jobs[-1]
+    callback(*args)
+
+
+def test_scan_box_flow_runs_to_the_localization_page(machine, actions, root):
+    assert machine.dispatch('scan_box')
+    assert machine.dispatch('tag', rfid='abc')
+    assert machine.current == 'searching_for_box'
+    assert actions.emits['lookup_box']('found', box={'box_id': '1'})
+    assert machine.current == 'box_found'
+    fire_timeout(root)
+    assert machine.current == 'localization'
+    assert machine.context == {'rfid': 'abc', 'box': {'box_id': '1'}}
+    assert actions.pages == ['starting_page', 'scan_box_page', 'searching_for_box_page', 'box_found_page',
+                             'localization_page']
+
+
+def test_events_without_a_transition_are_ignored(machine):
+    assert not machine.dispatch('registered')
+    assert not machine.can_handle('found')
+    assert machine.current == 'idle'
+
+
+def test_emits_of_a_left_state_are_dropped(machine, actions, root):
+    machine.dispatch('tag', rfid='abc')
+    emit = actions.emits['lookup_box']
+    lookup_timeout = root.jobs[-1]
+    assert machine.dispatch('cancel')
+    assert not emit('found')
+    lookup_timeout[0](*lookup_timeout[1])
+    assert machine.current == 'idle'
+
+
+def test_phases_and_endings_are_recorded(machine, actions, clock):
+    machine.dispatch('tag', rfid='abc')
+    clock.advance(0.3)
+    actions.emits['lookup_box']('not_found')
+    clock.advance(1.0)
+    machine.dispatch('cancel')
+    assert [(step.source, step.event, step.target) for step in machine.trace] == [
+        ('idle', 'tag', 'searching_for_box'),
+        ('searching_for_box', 'not_found', 'box_not_found'),
+        ('box_not_found', 'cancel', 'idle'),
+    ]
+    assert machine.phase_stats()['searching_for_box']['max'] == pytest.approx(0.3)
+    assert machine.phase_histograms()['box_not_found']['1'] == 1
+    assert machine.flow_endings() == {('box_not_found', 'cancel'): 1}
+
+
+def test_scan_object_flow_waits_for_the_evaluation(machine, actions, root):
+    machine.dispatch('scan_object')
+    fire_timeout(root)
+    assert machine.current == 'taking_pictures'
+    assert actions.emits['capture_pictures']('captured')
+    assert machine.current == 'evaluating_pictures'
+    assert actions.emits['evaluate_pictures']('evaluated', pictures=['frame'])
+    assert machine.current == 'idle'
+    assert machine.context['pictures'] == ['frame']
+    assert machine.flow_endings() == {('evaluating_pictures', 'evaluated'): 1}
+
+
+def test_tag_on_the_starting_page_starts_the_search(machine, actions):
+    assert machine.can_handle('tag')
+    machine.dispatch('tag', rfid='abc')
+    assert machine.current == 'searching_for_box'
+    assert 'lookup_box' in actions.emits
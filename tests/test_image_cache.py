@@ -0,0 +1,99 @@
+import hashlib
+import os
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from image_cache import ImageCache
+
+
+def picture(seed, size=(64, 48)):
+    """Returns a PNG of noise, which does not compress."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def touch(cache, data, seconds):
+    """Sets the last use of a stored picture."""
+    os.utime(cache._object_path(hashlib.sha256(data).hexdigest()), (seconds, seconds))
+
+
+class FakeRest:
+    """Serves pictures from a dict and counts the downloads."""
+
+    def __init__(self, pictures):
+        self.pictures = pictures
+        self.downloads = 0
+
+    def download_picture(self, item_id, picture_name):
+        self.downloads += 1
+        return self.pictures.get((str(item_id), picture_name), f"Error - Picture {picture_name} not found")
+
+
+def test_picture_is_downloaded_once_and_then_read_from_disk(tmp_path):
+    rest = FakeRest({('1', 'a.png'): picture(1)})
+    cache = ImageCache(rest, cache_dir=str(tmp_path), size=(32, 24))
+    assert cache.load(1, 'a.png').size == (32, 24)
+    cache.close()
+
+    cache = ImageCache(rest, cache_dir=str(tmp_path), size=(32, 24))
+    assert cache.load(1, 'a.png').size == (32, 24)
+    assert cache.load(1, 'a.png').size == (32, 24)
+    stats = cache.stats()
+    cache.close()
+
+    assert rest.downloads == 1
+    assert (stats['disk_hits'], stats['memory_hits']) == (1, 1)
+    assert stats['disk_bytes'] == len(picture(1))
+
+
+def test_disk_tier_drops_the_least_recently_used_pictures(tmp_path):
+    pictures = {(str(i), 'p.png'): picture(i) for i in range(1, 5)}
+    rest = FakeRest(pictures)
+    limit = 3 * len(picture(1)) + 100
+    cache = ImageCache(rest, cache_dir=str(tmp_path), maxsize=0, max_disk_bytes=limit)
+    for item_id in (1, 2, 3):
+        cache.load(item_id, 'p.png')
+    touch(cache, picture(1), 0)
+    touch(cache, picture(3), 1)
+    cache.load(2, 'p.png')  # a disk hit marks 2 as just used
+    cache.load(4, 'p.png')
+    stats = cache.stats()
+
+    assert stats['disk_bytes'] <= 0.9 * limit
+    assert stats['evictions'] == 2
+    downloads = rest.downloads
+    cache.load(2, 'p.png')
+    assert rest.downloads == downloads  # kept
+    cache.load(1, 'p.png')
+    assert rest.downloads == downloads + 1  # pruned, downloaded again
+    cache.close()
+
+
+def test_undecodable_file_on_disk_is_evicted_and_downloaded_again(tmp_path):
+    rest = FakeRest({('1', 'a.png'): picture(1)})
+    cache = ImageCache(rest, cache_dir=str(tmp_path), maxsize=0)
+    cache.load(1, 'a.png')
+    object_path = next(cache._objects()).path
+    with open(object_path, 'r+b') as file:
+        file.truncate(100)
+
+    assert not isinstance(cache.load(1, 'a.png'), str)
+    assert rest.downloads == 2
+    assert cache.stats()['evictions'] == 1
+    with open(object_path, 'rb') as file:
+        assert file.read() == picture(1)
+    cache.close()
+
+
+def test_undecodable_download_is_not_stored(tmp_path):
+    rest = FakeRest({('1', 'a.png'): b'not a picture'})
+    cache = ImageCache(rest, cache_dir=str(tmp_path))
+
+    assert cache.load(1, 'a.png').startswith('Error - Picture a.png of item 1 could not be decoded')
+    assert list(cache._objects()) == []
+    assert cache.stats()['disk_bytes'] == 0
+    cache.close()
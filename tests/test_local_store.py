@@ -0,0 +1,104 @@
+import logging
+import time
+
+import pytest
+
+from local_store import LocalStore, OfflineRest
+from mock_server import MockInventoryServer
+from rest import Rest
+
+
+@pytest.fixture
+def server():
+    with MockInventoryServer(items=20, boxes=20, locations=5) as server:
+        yield server
+
+
+@pytest.fixture
+def offline(server, tmp_path):
+    with OfflineRest(Rest(server=server.url, max_retries=0), LocalStore(str(tmp_path / 'store.sqlite3'))) as offline:
+        yield offline
+
+
+def test_reads_are_served_locally_once_stored(server, offline):
+    box = offline.search_for_box_with_rfid(server.boxes['1']['box_rfid'])
+    requests = server.stats['requests']
+    assert offline.search_for_box_with_rfid(server.boxes['1']['box_rfid']) == box
+    assert offline.find_boxes_by_ids(['1'])['1'] == box
+    assert server.stats['requests'] == requests
+
+
+def test_batch_lookups_fetch_only_what_is_missing(server, offline):
+    offline.find_item_by_id('1')
+    requests = server.stats['requests']
+    items = offline.find_items_by_ids(['1', '2', '3'])
+    assert [item.item_id for item in items.values()] == ['1', '2', '3']
+    assert server.stats['requests'] == requests + 2
+
+
+def test_box_updates_are_journaled_and_replayed(server, offline):
+    box = offline.find_box_by_id('1').to_json()
+    box['location_id'] = '9'
+    assert offline.update_boxes([box])['1']['location_id'] == '9'
+    assert server.boxes['1']['location_id'] != '9'
+    assert offline.sync_once()['replayed'] == 1
+    assert server.boxes['1']['location_id'] == '9'
+
+
+def test_rejected_write_is_given_up_without_blocking_later_ones(server, offline):
+    offline.update_box({'box_id': '999', 'box_label_name': 'Gone', 'location_id': '1'})
+    box = offline.find_box_by_id('1').to_json()
+    box['location_id'] = '9'
+    offline.update_box(box)
+    assert offline.replay_writes() == 1
+    assert server.boxes['1']['location_id'] == '9'
+    assert offline.store.pending_writes() == []
+
+
+def test_unreachable_server_stops_the_replay(tmp_path):
+    rest = Rest(server='http://127.0.0.1:9/api/v3', max_retries=0)
+    with OfflineRest(rest, LocalStore(str(tmp_path / 'store.sqlite3'))) as offline:
+        offline.update_box({'box_id': '1', 'location_id': '2'})
+        offline.update_box({'box_id': '2', 'location_id': '2'})
+        assert offline.replay_writes() == 0
+        assert [attempts for _, _, _, attempts in offline.store.pending_writes()] == [1, 0]
+
+
+def test_uploads_and_downloads_go_to_the_server(server, offline):
+    assert offline.download_picture == offline.rest.download_picture
+    assert offline.pool_size == offline.rest.pool_size
+
+
+def test_refresh_reads_past_the_cache(server, offline):
+    offline.refresh_age = 0
+    assert offline.find_box_by_id('1').box_label_name == 'Box 1'
+    server.boxes['1']['box_label_name'] = 'Renamed'
+    time.sleep(0.01)
+    assert offline.refresh_stale() >= 1
+    assert offline.store.get('box', '1')['box_label_name'] == 'Renamed'
+
+
+def test_refresh_keeps_records_with_a_pending_write(server, offline):
+    offline.refresh_age = 0
+    box = offline.find_box_by_id('1').to_json()
+    box['box_label_name'] = 'Local'
+    offline.update_box(box)
+    time.sleep(0.01)
+    offline.refresh_stale()
+    assert offline.store.get('box', '1')['box_label_name'] == 'Local'
+
+
+def test_failed_sync_round_is_logged(offline, caplog):
+    def broken():
+        raise RuntimeError('disk full')
+
+    offline.sync_once = broken
+    offline.sync_interval = 10
+    with caplog.at_level(logging.ERROR, logger='local_store'):
+        offline.start_sync()
+        deadline = time.monotonic() + 2
+        while offline.last_sync_error is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        offline.stop_sync()
+    assert 'disk full' in offline.last_sync_error
+    assert 'Offline sync round failed' in caplog.text
@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+import urllib.request
+
+from metrics import Metrics, TraceLog
+
+
+def test_counters_and_histograms_are_rendered_with_the_station_label():
+    metrics = Metrics(station='bench', buckets=(0.1, 1))
+    metrics.inc('rest_requests_total', endpoint='/item', status='200')
+    metrics.inc('rest_requests_total', 2, endpoint='/item', status='200')
+    metrics.observe('rest_request_duration_seconds', 0.05, endpoint='/item')
+    metrics.observe('rest_request_duration_seconds', 0.5, endpoint='/item')
+    text = metrics.render()
+
+    assert 'rest_requests_total{station="bench",endpoint="/item",status="200"} 3' in text
+    assert 'rest_request_duration_seconds_bucket{station="bench",endpoint="/item",le="0.1"} 1' in text
+    assert 'rest_request_duration_seconds_bucket{station="bench",endpoint="/item",le="+Inf"} 2' in text
+    assert 'rest_request_duration_seconds_count{station="bench",endpoint="/item"} 2' in text
+
+
+def test_metrics_are_served_over_http():
+    metrics = Metrics(station='bench')
+    metrics.inc('rest_requests_total', endpoint='/box', status='404')
+    server = metrics.serve(port=0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics', timeout=5) as response:
+            assert b'rest_requests_total{station="bench",endpoint="/box",status="404"} 1' in response.read()
+    finally:
+        metrics.close()
+
+
+def test_events_are_written_in_order_once_the_trace_is_closed(tmp_path):
+    trace = TraceLog(str(tmp_path / 'trace.jsonl'))
+    metrics = Metrics(station='bench', trace=trace)
+    for index in range(100):
+        metrics.event('screen', index=index)
+    metrics.close()
+
+    events = [json.loads(line) for line in (tmp_path / 'trace.jsonl').read_text().splitlines()]
+    assert [event['index'] for event in events] == list(range(100))
+    assert events[0]['station'] == 'bench' and events[0]['kind'] == 'screen'
+
+
+def test_recording_an_event_does_not_wait_for_the_disk(tmp_path):
+    trace = TraceLog(str(tmp_path / 'trace.jsonl'))
+    handle, writers = trace._handler.handle, set()
+
+    def slow_handle(record):
+        writers.add(threading.current_thread().name)
+        time.sleep(0.05)
+        return handle(record)
+
+    trace._handler.handle = slow_handle
+    start = time.perf_counter()
+    for index in range(10):
+        trace.write({'index': index})
+    assert time.perf_counter() - start < 0.25
+    trace.close()
+
+    assert writers == {'trace-writer'}
+    assert len((tmp_path / 'trace.jsonl').read_text().splitlines()) == 10
@@ -0,0 +1,16 @@
+import os
+
+from mock_server import MockInventoryServer
+from rest import Rest
+
+
+def test_uploaded_picture_is_downloaded_unchanged(tmp_path):
+    picture = tmp_path / 'adapter.png'
+    picture.write_bytes(b'\x89PNG\r\n\x1a\n' + os.urandom(5000) + b'\r\n--')
+    with MockInventoryServer(items=5, boxes=5, locations=2) as server, Rest(server=server.url) as rest:
+        assert not isinstance(rest.upload_picture('1', str(picture)), str)
+        assert rest.download_picture('1', 'adapter.png') == picture.read_bytes()
+
+        chunks = [b'streamed ', b'picture']
+        assert not isinstance(rest.upload_stream('2', iter(chunks), 'b.png', '/item/{}/uploadPicture'), str)
+        assert rest.download_picture('2', 'b.png') == b'streamed picture'
@@ -0,0 +1,92 @@
+import threading
+
+from prefetch import Prefetcher
+from records import Box, Item, Location
+
+
+class FakeRest:
+    """Answers lookups only once all of them are running, so they must run in parallel."""
+
+    def __init__(self, lookups=2):
+        self.all_running = threading.Barrier(lookups, timeout=5)
+        self.release = threading.Event()
+
+    def find_item_by_id(self, item_id):
+        self.all_running.wait()
+        self.release.wait(5)
+        return Item.from_json({'item_id': item_id, 'item_name': 'Adapter', 'item_picture': 'adapter.png'})
+
+    def get_location_by_id(self, location_id):
+        self.all_running.wait()
+        self.release.wait(5)
+        return Location.from_json({'location_id': location_id, 'location_name': 'Shelf A'})
+
+
+class FakeImageCache:
+    def __init__(self):
+        self.prefetched = []
+
+    def prefetch(self, item_id, picture_name):
+        self.prefetched.append((item_id, picture_name))
+        return None  # already in memory
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def box(**fields):
+    return Box.from_json({'box_id': '1', 'box_rfid': 'tag', **fields})
+
+
+def test_item_and_location_are_looked_up_together_and_the_picture_follows_the_item():
+    rest, image_cache = FakeRest(), FakeImageCache()
+    prefetcher = Prefetcher(rest, image_cache)
+    prefetch = prefetcher.start(box(item_id='7', location_id='3'))
+    assert prefetch.result('item') is None  # still running; result() never blocks
+    rest.release.set()
+    prefetch.futures['picture'].result(5)
+    prefetch.futures['location'].result(5)
+    prefetcher.close()
+
+    assert prefetch.result('item').item_name == 'Adapter'
+    assert prefetch.result('location').location_name == 'Shelf A'
+    assert prefetch.result('picture') == 'adapter.png'
+    assert image_cache.prefetched == [('7', 'adapter.png')]
+    assert set(prefetch.futures) == {'item', 'picture', 'location'}
+
+
+def test_stats_tell_hidden_latency_from_waiting():
+    rest, clock = FakeRest(), Clock()
+    prefetcher = Prefetcher(rest, clock=clock)
+    prefetch = prefetcher.start(box(item_id='7', location_id='3'))
+    clock.now = 1.0
+    prefetch.result('item')  # the screen asks before the item is in
+    clock.now = 2.0
+    rest.release.set()
+    prefetch.futures['item'].result(5)
+    prefetch.futures['location'].result(5)
+    clock.now = 3.0
+    prefetch.result('item')
+    prefetch.result('location')
+    prefetcher.close()
+
+    stats = prefetcher.stats()
+    assert stats['item'] == {'count': 1, 'hidden': 0, 'hidden_s': 1.0, 'waited_s': 1.0}
+    assert stats['location'] == {'count': 1, 'hidden': 1, 'hidden_s': 2.0, 'waited_s': 0.0}
+
+
+def test_only_the_fields_a_box_has_are_looked_up():
+    rest = FakeRest(lookups=1)
+    rest.release.set()
+    prefetcher = Prefetcher(rest, FakeImageCache())
+    prefetch = prefetcher.start(box(location_id='3'))
+    prefetch.futures['location'].result(5)
+    prefetcher.close()
+
+    assert set(prefetch.futures) == {'location'}
+    assert prefetch.result('item') is None
@@ -0,0 +1,83 @@
+import zipfile
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from preprocess import Preprocessor, difference_hash, hamming_distances, resize_batch
+
+
+def scene(square=None, size=(160, 120)):
+    """A gray background with a red square at (top, left, side), if given."""
+    frame = np.full((size[1], size[0], 3), 120, dtype=np.uint8)
+    if square is not None:
+        top, left, side = square
+        frame[top:top + side, left:left + side] = (220, 30, 30)
+    return frame
+
+
+def save(tmp_path, name, frame):
+    path = tmp_path / name
+    Image.fromarray(frame).save(path)
+    return str(path)
+
+
+def test_reduction_averages_instead_of_skipping_pixels():
+    checkerboard = (np.indices((64, 64)).sum(axis=0) % 2 * 255).astype(np.uint8)
+    resized = resize_batch(checkerboard[np.newaxis], (16, 16))
+    assert resized.shape == (1, 16, 16)
+    assert resized.dtype == np.float32
+    assert np.allclose(resized, 127.5)
+
+
+def test_enlarging_interpolates_between_pixels():
+    resized = resize_batch(np.array([[[0, 100]]], dtype=np.uint8), (4, 1))
+    assert resized[0, 0].tolist() == [0, 25, 75, 100]
+
+
+def test_item_is_found_inside_its_margin():
+    preprocessor = Preprocessor(size=(160, 120), margin=4)
+    batch = np.stack([scene((40, 60, 30)), scene()]).astype(np.float32)
+    mask, boxes = preprocessor.segment(batch)
+
+    assert boxes[0].tolist() == [36, 74, 56, 94]
+    assert mask[0, 50, 70] and not mask[0, 10, 10]
+    assert boxes[1][0] == boxes[1][1]  # no item, an empty box
+
+
+def test_near_duplicate_hashes_are_close():
+    batch = np.stack([scene((40, 60, 30)), scene((41, 60, 30)), scene((40, 20, 60))]).astype(np.float32)
+    hashes = difference_hash(batch.mean(axis=3), np.array([[0, 120, 0, 160]] * 3))
+    distances = hamming_distances(hashes, hashes[0])
+    assert distances[1] <= 4 < distances[2]
+
+
+def test_empty_and_duplicate_frames_are_dropped(tmp_path):
+    paths = [save(tmp_path, 'a.png', scene((40, 60, 30))), save(tmp_path, 'b.png', scene((40, 60, 30))),
+             save(tmp_path, 'c.png', scene()), save(tmp_path, 'd.png', scene((20, 10, 50)))]
+    preprocessor = Preprocessor(size=(160, 120), batch_size=3)
+    results = list(preprocessor.process(paths))
+
+    assert [path for path, _ in results] == [paths[0], paths[3]]
+    with Image.open(BytesIO(results[0][1])) as crop:
+        assert crop.mode == 'RGBA'
+        assert crop.size == (46, 46)  # with the margin of 8 pixels
+    stats = preprocessor.last_stats
+    assert (stats['frames'], stats['kept'], stats['duplicates'], stats['empty']) == (4, 2, 1, 1)
+
+
+def test_iter_zip_names_the_crops_after_their_photos(tmp_path):
+    paths = [save(tmp_path, 'frame_0001.jpg', scene((40, 60, 30)))]
+    data = b''.join(Preprocessor(size=(160, 120)).iter_zip(paths, arcdir='2026-10-17'))
+
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        assert archive.namelist() == ['2026-10-17/frame_0001.png']
+        assert archive.read('2026-10-17/frame_0001.png').startswith(b'\x89PNG')
+
+
+@pytest.mark.parametrize('duplicate_distance, kept', [(4, 1), (-1, 2)])
+def test_duplicates_can_be_kept(tmp_path, duplicate_distance, kept):
+    paths = [save(tmp_path, f'{name}.png', scene((40, 60, 30))) for name in 'ab']
+    preprocessor = Preprocessor(size=(160, 120), duplicate_distance=duplicate_distance)
+    assert len(list(preprocessor.process(paths))) == kept
@@ -0,0 +1,39 @@
+import pytest
+
+from records import Box, Item, RestError, RestRequestError, unwrap
+
+
+def test_null_fields_read_like_the_json_response():
+    item = Item.from_json({'item_id': '1', 'item_name': 'FTDI adapter', 'item_picture': None})
+    assert item['item_picture'] is None
+    assert item.get('item_picture') is None
+    assert 'item_picture' in item
+    assert 'item_datasheet' in item
+    assert 'shelf' not in item
+    with pytest.raises(KeyError):
+        item['shelf']
+
+
+def test_unknown_fields_are_kept():
+    data = {'box_id': '7', 'box_rfid': 'ab12', 'shelf': 'A3'}
+    box = Box.from_json(data)
+    assert box.box_rfid == 'ab12'
+    assert box['shelf'] == 'A3' and 'shelf' in box
+    assert box.to_json() == data
+
+
+def test_invalid_records_are_errors():
+    assert Item.from_json({'item_name': 'x'}) == "Error - Invalid item record: missing item_id"
+    assert isinstance(Box.from_json(['box']), RestError)
+    assert [box.box_id for box in Box.decode([{'box_id': '1'}, {'box_id': '2'}])] == ['1', '2']
+    assert Box.decode("Error - GET request to /box/1: 404") == "Error - GET request to /box/1: 404"
+
+
+def test_errors_tell_whether_a_retry_may_help():
+    assert RestError("Error - x", status=None).retryable
+    assert RestError("Error - x", status=503).retryable
+    assert not RestError("Error - x", status=400).retryable
+    assert RestError("Error - x", status=404).not_found
+    with pytest.raises(RestRequestError) as raised:
+        unwrap(RestError("Error - x", status=409))
+    assert raised.value.status == 409
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from records import RestError
+from registration import Registration, Stage
+
+
+class FakeRest:
+    """Answers insert_new_item with the given results, one per call, and records the uploads."""
+
+    def __init__(self, *insert_results):
+        self.insert_results = list(insert_results)
+        self.inserts = 0
+        self.uploads = []
+        self.updates = []
+
+    def insert_new_item(self, item):
+        self.inserts += 1
+        return self.insert_results.pop(0)
+
+    def upload_picture(self, item_id, path, name):
+        self.uploads.append(('picture', item_id))
+        return {'item_id': item_id}
+
+    def upload_datasheet(self, item_id, path, name):
+        self.uploads.append(('datasheet', item_id))
+        return {'item_id': item_id}
+
+    def update_item(self, item):
+        self.updates.append(item)
+        return item
+
+
+@pytest.fixture
+def files(tmp_path):
+    picture, datasheet = tmp_path / 'picture.jpg', tmp_path / 'datasheet.pdf'
+    picture.write_bytes(b'jpeg')
+    datasheet.write_bytes(b'pdf')
+    return str(picture), str(datasheet)
+
+
+def register(rest, files):
+    registration = Registration(rest, {'item_name': 'FTDI 232 Adapter'}, *files, backoff=0).start()
+    assert registration.wait(5)
+    return registration
+
+
+def test_uploads_run_after_insert(files):
+    rest = FakeRest({'item_id': 7})
+    registration = register(rest, files)
+    assert registration.ok
+    assert registration.item_id == '7'
+    assert sorted(rest.uploads) == [('datasheet', '7'), ('picture', '7')]
+    assert registration.item['item_picture'] == os.path.basename(files[0])
+
+
+def test_insert_is_not_resent_after_it_may_have_reached_the_server(files):
+    read_timeout = RestError("Error - POST request to /item: Read timed out", status=None, sent=True)
+    rest = FakeRest(read_timeout, {'item_id': 7})
+    registration = register(rest, files)
+    assert rest.inserts == 1
+    assert registration.stages['insert'].state == Stage.FAILED
+    assert registration.stages['picture'].state == Stage.SKIPPED
+    assert rest.uploads == []
+
+
+def test_insert_is_resent_when_the_connection_failed(files):
+    refused = RestError("Error - POST request to /item: Connection refused", status=None, sent=False)
+    rest = FakeRest(refused, {'item_id': 7})
+    registration = register(rest, files)
+    assert rest.inserts == 2
+    assert registration.ok
+
+
+def test_missing_item_id_fails_the_insert(files):
+    rest = FakeRest({'item_name': 'FTDI 232 Adapter'})
+    registration = register(rest, files)
+    assert registration.item_id is None
+    assert registration.stages['insert'].state == Stage.FAILED
+    assert all(stage.state == Stage.SKIPPED for name, stage in registration.stages.items() if name != 'insert')
+    assert rest.uploads == []
+    assert not registration.ok
+
+
+def test_failed_upload_is_rolled_back(files):
+    rest = FakeRest({'item_id': 7})
+    rest.upload_datasheet = lambda item_id, path, name: RestError("Error - 500", status=500)
+    registration = register(rest, files)
+    assert registration.stages['datasheet'].state == Stage.ROLLED_BACK
+    assert registration.stages['datasheet'].attempts == 3
+    assert rest.updates[-1]['item_datasheet'] == ''
+
+
+def test_queued_uploads_count_as_registered(files, tmp_path):
+    from rest import Rest
+    from upload_queue import UploadQueue
+
+    queue = UploadQueue(str(tmp_path / 'uploads.sqlite3'), str(tmp_path / 'spool'))
+    with Rest(server='http://127.0.0.1:9/api/v3', upload_queue=queue) as client:
+        rest = FakeRest({'item_id': 7})
+        rest.upload_picture = client.upload_picture
+        rest.upload_datasheet = client.upload_datasheet
+        registration = register(rest, files)
+    assert registration.ok
+    assert {stage.state for name, stage in registration.stages.items() if name != 'insert'} == {Stage.QUEUED}
+    assert rest.updates == []
+    assert queue.counts() == {UploadQueue.PENDING: 2}
+    queue.close()
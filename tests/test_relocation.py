@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from mock_server import MockInventoryServer
+from relocation import BoxMove, Relocation
+from rest import Rest
+
+
+@pytest.fixture
+def server():
+    with MockInventoryServer(items=20, boxes=20, locations=5) as server:
+        yield server
+
+
+def test_move_is_written_when_the_cached_box_is_stale(server):
+    box = server.boxes['1']
+    target = box['location_id']
+    with Rest(server=server.url, max_retries=0) as rest:
+        assert rest.search_for_box_with_rfid(box['box_rfid']).get('location_id') == target
+        # Another station moves the box away and renames it after it was cached here.
+        box['location_id'] = str(int(target) % 5 + 1)
+        box['box_label_name'] = 'Renamed'
+
+        relocation = Relocation(rest, location_id=target)
+        move = relocation.scan(box['box_rfid'])
+        assert relocation.flush() == 1
+
+    assert move.state == BoxMove.MOVED
+    assert server.boxes['1']['location_id'] == target
+    assert server.boxes['1']['box_label_name'] == 'Renamed'
+
+
+def test_last_scan_of_a_box_wins(server):
+    box = server.boxes['2']
+    first, last = str(int(box['location_id']) % 5 + 1), str((int(box['location_id']) + 1) % 5 + 1)
+    with Rest(server=server.url, max_retries=0) as rest:
+        relocation = Relocation(rest, location_id=first)
+        relocation.scan(box['box_rfid'])
+        relocation.set_location(last)
+        move = relocation.scan(box['box_rfid'])
+        assert relocation.flush() == 1
+
+    assert move.state == BoxMove.MOVED
+    assert server.boxes['2']['location_id'] == last
+
+
+def test_failed_flush_fails_its_moves_and_flushing_goes_on(server):
+    boxes = server.boxes['3'], server.boxes['4']
+    target = next(str(i) for i in range(1, 6) if str(i) not in (boxes[0]['location_id'], boxes[1]['location_id']))
+
+    def broken(*args):
+        raise RuntimeError('store locked')
+
+    with Rest(server=server.url, max_retries=0) as rest:
+        relocation = Relocation(rest, location_id=target, flush_interval=0.01)
+        update_boxes, rest.update_boxes = rest.update_boxes, broken
+        first = relocation.scan(boxes[0]['box_rfid'])
+        relocation.start()
+        deadline = time.monotonic() + 5
+        while first.state != BoxMove.FAILED and time.monotonic() < deadline:
+            time.sleep(0.01)
+        rest.update_boxes = update_boxes
+        second = relocation.scan(boxes[1]['box_rfid'])
+        relocation.stop(5)
+
+    assert first.state == BoxMove.FAILED
+    assert 'store locked' in first.error
+    assert second.state == BoxMove.MOVED
+    assert relocation.done
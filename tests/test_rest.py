@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from mock_server import FaultConfig, MockInventoryServer
+from rest import Rest
+from search_index import ItemSearchIndex
+
+
+@pytest.fixture
+def server():
+    with MockInventoryServer(items=20, boxes=20, locations=5) as server:
+        yield server
+
+
+def test_refused_connection_is_marked_as_not_sent():
+    with Rest(server='http://127.0.0.1:9/api/v3', max_retries=0) as rest:
+        error = rest.insert_new_item({'item_name': 'x'})
+    assert isinstance(error, str)
+    assert error.status is None
+    assert error.sent is False
+
+
+def test_read_timeout_is_marked_as_sent(server):
+    server.faults = FaultConfig(latency=0.5)
+    with Rest(server=server.url, read_timeout=0.1, max_retries=0) as rest:
+        error = rest.insert_new_item({'item_name': 'x'})
+    assert isinstance(error, str)
+    assert error.sent is True
+
+
+def test_warm_up_opens_connections(server):
+    with Rest(server=server.url) as rest:
+        assert rest.warm_up(connections=2) == 2
+
+
+def test_warm_up_is_not_retried():
+    with Rest(server='http://127.0.0.1:9/api/v3', max_retries=3, backoff_factor=1) as rest:
+        start = time.perf_counter()
+        assert rest.warm_up(timeout=0.2) == 0
+        assert time.perf_counter() - start < 0.5
+
+
+def test_batch_looks_up_each_key_once(server):
+    with Rest(server=server.url) as rest:
+        requests = server.stats['requests']
+        boxes = rest.find_boxes_by_ids(['2', '1', '2', '1'])
+        assert list(boxes) == ['2', '1']
+        assert boxes['1'].box_id == '1'
+        assert server.stats['requests'] == requests + 2
+
+
+def test_batch_reports_a_failed_lookup_per_key(server):
+    def lookup(key):
+        if key == 'bad':
+            raise KeyError(key)
+        return key
+
+    with Rest(server=server.url) as rest:
+        results = rest._batch(lookup, ['ok', 'bad'])
+    assert results['ok'] == 'ok'
+    assert isinstance(results['bad'], str) and results['bad'].startswith('Error - ')
+
+
+def test_repeated_lookups_are_served_from_the_cache(server):
+    with Rest(server=server.url) as rest:
+        requests = server.stats['requests']
+        assert rest.find_box_by_id('1') == rest.find_box_by_id('1')
+        assert server.stats['requests'] == requests + 1
+        assert rest.cache_stats()['hits'] == 1
+        assert rest.cache_stats()['misses'] == 1
+
+
+def test_fresh_lookups_bypass_the_cache(server):
+    with Rest(server=server.url) as rest:
+        rest.find_box_by_id('1')
+        server.boxes['1']['box_label_name'] = 'Renamed'
+        assert rest.find_box_by_id('1').box_label_name == 'Box 1'
+        assert rest.find_box_by_id('1', fresh=True).box_label_name == 'Renamed'
+        assert rest.find_box_by_id('1').box_label_name == 'Renamed'
+
+
+def test_updates_invalidate_cached_lookups(server):
+    with Rest(server=server.url) as rest:
+        box = rest.find_box_by_id('1').to_json()
+        item = rest.find_item_by_id('1')
+        box['box_label_name'] = 'Updated'
+        rest.update_box(box)
+        assert rest.find_box_by_id('1').box_label_name == 'Updated'
+        assert rest.find_item_by_id('1') is item
+
+
+def test_inserted_items_are_indexed_with_the_assigned_id(server):
+    with Rest(server=server.url, search_index=ItemSearchIndex([])) as rest:
+        item = rest.insert_new_item({'item_name': 'FTDI adapter'})
+        assert [item_id for _, item_id, _ in rest.search_index.search('ftdi adapter')] == [item['item_id']]
+
+
+@pytest.mark.parametrize('error', [FileNotFoundError('picture.png'), ValueError('truncated image')])
+def test_failing_upload_stream_returns_an_error(server, error):
+    def chunks():
+        yield b'PK'
+        raise error
+
+    with Rest(server=server.url, max_retries=0) as rest:
+        result = rest.upload_stream('1', chunks(), 'pictures.zip', '/item/{}/uploadTrainingPicture')
+    assert isinstance(result, str) and result.startswith('Error - ')
+    assert str(error) in result
@@ -0,0 +1,50 @@
+import time
+
+from rfid_reader import ReplayTagSource, RfidReader, StdinTagSource
+
+
+def test_raising_on_tag_is_reported_and_polling_goes_on(root):
+    reader = RfidReader(StdinTagSource([]))
+    reader.feed('aa', now=0.0)
+    reader.feed('bb', now=0.0)
+    delivered = []
+
+    def on_tag(tag):
+        if tag == 'aa':
+            raise ValueError(tag)
+        delivered.append(tag)
+
+    reader.poll(root, on_tag)
+
+    assert delivered == ['bb']
+    assert len(root.reported) == 1 and isinstance(root.reported[0], ValueError)
+    assert root.jobs == [(reader.poll, (root, on_tag, None))]
+
+
+def test_replay_yields_the_recorded_tags(tmp_path):
+    replay = tmp_path / 'session.txt'
+    replay.write_text('# recorded at the station\n0.02 aa\n\nbb\n0.01 cc\n')
+    source = ReplayTagSource(str(replay), default_delay=0.02, speed=2)
+    start = time.perf_counter()
+    assert list(source.read_tags()) == ['aa', 'bb', 'cc']
+    assert time.perf_counter() - start >= 0.025
+
+
+def test_closed_replay_stops(tmp_path):
+    replay = tmp_path / 'session.txt'
+    replay.write_text('aa\nbb\n')
+    source = ReplayTagSource(str(replay), default_delay=10)
+    source.close()
+    assert list(source.read_tags()) == []
+
+
+def test_repeated_reads_are_debounced_and_old_tags_forgotten():
+    reader = RfidReader(StdinTagSource([]), debounce=1.0)
+    assert reader.feed('aa', now=0.0)
+    assert not reader.feed('aa', now=0.5)
+    assert reader.feed('bb', now=0.8)
+    assert not reader.feed('aa', now=1.2)  # the window restarts with every read
+    assert reader.feed('aa', now=2.5)
+    for index in range(1000):
+        reader.feed(f'tag{index}', now=10.0 + index)
+    assert list(reader._last_seen) == ['tag999']
@@ -0,0 +1,55 @@
+from scheduler import Scheduler
+
+
+def nothing(*args):
+    pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entering_a_screen_cancels_the_jobs_of_the_previous_one(root):
+    scheduler = Scheduler(root)
+    scheduler.enter('scanning')
+    scheduler.after(100, nothing)
+    scheduler.after(200, nothing)
+    scheduler.enter('localization')
+    kept = scheduler.after(100, nothing)
+
+    assert root.cancelled == [1, 2]
+    assert scheduler.pending_by_scope() == {'localization': 1}
+    scheduler.cancel(kept)
+    assert scheduler.pending() == 0
+
+
+def test_countdowns_share_one_tick(root):
+    clock, ticks = Clock(), []
+    scheduler = Scheduler(root, tick_ms=100, clock=clock)
+    scheduler.enter('localization')
+    scheduler.countdown(2, lambda count: ticks.append(('a', count)), lambda: ticks.append(('a', 'done')))
+    scheduler.countdown(3, lambda count: ticks.append(('b', count)))
+    assert len(root.jobs) == 1
+
+    for _ in range(3):
+        clock.now += 1.0
+        callback, args = root.jobs.pop()
+        callback(*args)
+
+    assert ticks == [('a', 2), ('b', 3), ('a', 1), ('b', 2), ('a', 'done'), ('b', 1)]
+    assert scheduler.pending() == 0
+    assert root.jobs == []  # the tick stops with the last countdown
+
+
+def test_leaving_the_screen_stops_its_countdown(root):
+    scheduler = Scheduler(root, clock=Clock())
+    scheduler.enter('scanning')
+    scheduler.countdown(3, nothing)
+    scheduler.enter('taking_pictures')
+
+    assert scheduler.pending() == 0
+    assert root.cancelled == [1]
@@ -0,0 +1,63 @@
+import pytest
+
+import screens
+from screens import ScreenManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeFrame:
+    def __init__(self, root, **options):
+        self.raised = 0
+
+    def grid(self, **options):
+        pass
+
+    def tkraise(self):
+        self.raised += 1
+
+
+@pytest.fixture
+def manager(root, monkeypatch):
+    monkeypatch.setattr(screens.ctk, 'CTkFrame', FakeFrame)
+    manager = ScreenManager(root, clock=Clock())
+    built = []
+    manager.register('starting', built.append)
+    manager.register('scanning', built.append)
+    manager.built = built
+    return manager
+
+
+def test_every_screen_is_built_once(manager):
+    starting = manager.show('starting')
+    manager.show('scanning')
+    assert manager.show('starting') is starting
+    assert manager.built == [starting, manager.frame('scanning')]
+    assert manager.current == 'starting'
+    assert starting.raised == 2
+
+
+def test_transition_is_timed_until_tk_is_idle(manager, root):
+    manager.show('starting')
+    manager._clock.now += 0.25  # the caller updates the labels of the page after show() returned
+    assert manager.transition_stats() == {}
+    root.run_idle()
+    assert manager.transition_stats()['starting']['max_ms'] == pytest.approx(250)
+
+
+def test_unpainted_transition_ends_with_the_next_one(manager, root):
+    manager.show('starting')
+    manager._clock.now += 0.1
+    manager.show('scanning')
+    manager._clock.now += 0.2
+    root.run_idle()
+    stats = manager.transition_stats()
+    assert stats['starting']['max_ms'] == pytest.approx(100)
+    assert stats['scanning']['max_ms'] == pytest.approx(200)
+    assert stats['scanning']['count'] == 1
@@ -0,0 +1,57 @@
+import random
+import time
+
+import pytest
+
+from search_index import ItemSearchIndex, edit_distance
+
+KINDS = ['adapter', 'cable', 'resistor', 'capacitor', 'sensor', 'module', 'board', 'connector', 'switch', 'relay',
+         'motor', 'driver', 'converter', 'display', 'battery', 'holder', 'header', 'socket', 'fuse', 'diode']
+BRANDS = ['ftdi', 'usb', 'arduino', 'raspberry', 'esp32', 'stm32', 'atmel', 'bosch', 'adafruit', 'sparkfun']
+
+
+@pytest.fixture(scope='module')
+def index():
+    rng = random.Random(0)
+    names = [f'{rng.choice(BRANDS)} {rng.choice(KINDS)} {rng.randint(1, 9999)}' for _ in range(30000)]
+    return ItemSearchIndex({'item_id': i, 'item_name': name} for i, name in enumerate(names))
+
+
+def best_of(runs, call):
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def test_swapped_characters_are_one_edit():
+    assert edit_distance('fdti', 'ftdi', 1) == 1
+    assert edit_distance('adaptr', 'adapter', 2) == 1
+    assert edit_distance('kitten', 'sitting', 2) == 3
+
+
+def test_typos_in_common_words_are_found(index):
+    results = index.search('fdti adaptr')
+    assert results
+    assert all(name.startswith('ftdi adapter ') for _, _, name in results)
+
+
+def test_exact_name_scores_highest(index):
+    name = index.search('usb cable')[0][2]
+    score, _, found = index.search(name)[0]
+    assert found == name
+    assert score == pytest.approx(1.1)
+
+
+def test_prefix_matches_stop_at_the_limit(index):
+    assert len(index._prefix_matches('a', 200)) == 200
+    assert best_of(10, lambda: index._prefix_matches('a', 200)) < 0.001
+
+
+def test_removed_items_are_not_found():
+    index = ItemSearchIndex([{'item_id': 1, 'item_name': 'FTDI adapter'}, {'item_id': 2, 'item_name': 'USB cable'}])
+    index.remove(1)
+    assert index.search('fdti adaptr') == []
+    assert [item_id for _, item_id, _ in index.search('usb cabel')] == ['2']
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from startup import StartupProfiler
+
+
+class Clock:
+    """A perf_counter that only moves when advanced."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_marks_and_phases_are_measured_from_the_start():
+    clock = Clock()
+    profiler = StartupProfiler(clock=clock)
+    clock.advance(0.2)
+    with profiler.phase('import rest'):
+        clock.advance(0.1)
+    with profiler.phase('import rest'):
+        clock.advance(0.05)
+    profiler.mark('first_paint')
+    clock.advance(1)
+    profiler.mark('first_paint')
+    assert profiler.marks == {'first_paint': pytest.approx(0.35)}
+    assert profiler.phases == {'import rest': pytest.approx(0.15)}
+
+
+def test_first_paint_over_the_budget_is_reported_once(tmp_path):
+    clock = Clock()
+    output = tmp_path / 'startup.json'
+    profiler = StartupProfiler(budget=0.5, output=str(output), clock=clock)
+    clock.advance(0.8)
+    profiler.mark('first_paint')
+    profiler.finish()
+    report = json.loads(output.read_text())
+    assert report['over_budget'] is True
+    assert report['marks'] == {'first_paint': pytest.approx(0.8)}
+
+    output.unlink()
+    profiler.finish()
+    assert not output.exists()
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from mock_server import MockInventoryServer
+from records import RestError
+from rest import Rest
+from upload_queue import UploadQueue, UploadWorker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = UploadQueue(str(tmp_path / 'uploads.sqlite3'), str(tmp_path / 'spool'))
+    yield queue
+    queue.close()
+
+
+@pytest.fixture
+def picture(tmp_path):
+    path = tmp_path / 'picture.jpg'
+    path.write_bytes(b'x' * 300_000)
+    return str(path)
+
+
+def test_progress_is_kept_in_memory(queue, picture):
+    upload_id = queue.enqueue(1, picture, '/item/{}/uploadPicture')
+    queue.report_progress(upload_id, 65536)
+    assert queue.get(upload_id)['bytes_sent'] == 65536
+    assert queue._connection.execute('SELECT bytes_sent FROM uploads WHERE id = ?', (upload_id,)).fetchone()[0] == 0
+
+
+def test_worker_drains_the_queue(queue, picture):
+    with MockInventoryServer(items=5, boxes=5, locations=2) as server, Rest(server=server.url, upload_queue=queue) as rest:
+        result = rest.upload_picture(1, picture)
+        assert result == {'upload_id': result['upload_id'], 'status': UploadQueue.PENDING}
+        progress = []
+        worker = UploadWorker(rest, queue, poll_interval=0.05,
+                              progress_callback=lambda upload_id, sent, total: progress.append(sent))
+        worker.start()
+        deadline = time.monotonic() + 5
+        while queue.counts().get(UploadQueue.DONE) != 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        worker.stop()
+        assert queue.get(result['upload_id'])['bytes_sent'] == 300_000
+        assert server.pictures['1'].count(b'x') == 300_000
+    assert progress[-1] == 300_000
+
+
+class FailingRest:
+    """Answers every upload with the same error after reading the file."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def upload_stream(self, item_id, chunks, file_name, endpoint, params=None, file_type=None):
+        for _ in chunks:
+            pass
+        return self.error
+
+
+@pytest.mark.parametrize('status, retried', [(413, False), (503, True), (None, True)])
+def test_only_retryable_errors_are_retried(queue, picture, status, retried):
+    upload_id = queue.enqueue(1, picture, '/item/{}/uploadPicture')
+    worker = UploadWorker(FailingRest(RestError("Error - upload failed", status=status)), queue)
+    worker.process(queue.claim())
+
+    upload = queue.get(upload_id)
+    assert upload['status'] == (UploadQueue.PENDING if retried else UploadQueue.FAILED)
+    assert upload['attempts'] == 1
+
+
+def test_queued_upload_wakes_the_idle_worker(queue, picture):
+    with MockInventoryServer(items=5, boxes=5, locations=2) as server, Rest(server=server.url, upload_queue=queue) as rest:
+        rest.upload_worker = UploadWorker(rest, queue, poll_interval=60)
+        rest.upload_worker.start()
+        time.sleep(0.1)  # the worker found nothing and waits for its next poll
+        upload_id = rest.upload_picture(1, picture)['upload_id']
+        deadline = time.monotonic() + 5
+        while queue.get(upload_id)['status'] != UploadQueue.DONE and time.monotonic() < deadline:
+            time.sleep(0.02)
+        rest.upload_worker.stop()
+        assert queue.get(upload_id)['status'] == UploadQueue.DONE
@@ -0,0 +1,325 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class UploadQueue:
+    """
+    A persistent queue of pending file uploads backed by SQLite.
+
+    Jobs survive crashes and restarts: a job that was in flight when the
+    process died is put back to 'pending' the next time the queue is opened.
+
+    Attributes
+    ----------
+    db_path : str
+        The path of the SQLite database.
+    spool_dir : str
+        The directory where archives built for queued uploads are kept.
+    """
+
+    PENDING, ACTIVE, DONE, FAILED = 'pending', 'active', 'done', 'failed'
+
+    def __init__(self, db_path='upload_queue.sqlite3', spool_dir='upload_spool'):
+        """
+        Opens (and if necessary creates) the queue.
+
+        Parameters
+        ----------
+        db_path : str, optional
+            The path of the SQLite database. Defaults to 'upload_queue.sqlite3'.
+        spool_dir : str, optional
+            The directory for archives built for queued uploads. Defaults to 'upload_spool'.
+        """
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        os.makedirs(spool_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._progress = {}  # upload ID -> bytes sent of the running attempt
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                item_id TEXT NOT NULL,
+                file_path TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                params TEXT NOT NULL,
+                delete_after INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                bytes_sent INTEGER NOT NULL DEFAULT 0,
+                total_bytes INTEGER NOT NULL,
+                error TEXT,
+                created REAL NOT NULL
+            )""")
+        self._connection.execute('CREATE INDEX IF NOT EXISTS uploads_status ON uploads (status, next_attempt)')
+        self._connection.execute('UPDATE uploads SET status = ? WHERE status = ?', (self.PENDING, self.ACTIVE))
+
+    def enqueue(self, item_id, file_path, endpoint, params=None, file_type='application/octet-stream',
+                file_name=None, delete_after=False):
+        """
+        Adds an upload to the queue.
+
+        Parameters
+        ----------
+        item_id : int
+            The ID of the item.
+        file_path : str
+            The path to the file to upload. It must stay in place until the upload is done.
+        endpoint : str
+            The API endpoint with a '{}' placeholder for the item ID.
+        params : dict, optional
+            Parameters to include in the request.
+        file_type : str, optional
+            The MIME type of the file. Defaults to 'application/octet-stream'.
+        file_name : str, optional
+            The file name sent to the server. Defaults to the base name of file_path.
+        delete_after : bool, optional
+            Whether the file is deleted once it has been uploaded. Defaults to False.
+
+        Returns
+        -------
+        int
+            The ID of the queued upload.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                'INSERT INTO uploads (item_id, file_path, file_name, file_type, endpoint, params, delete_after,'
+                ' status, total_bytes, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(item_id), file_path, file_name or os.path.basename(file_path), file_type, endpoint,
+                 json.dumps(params or {}), int(delete_after), self.PENDING, os.path.getsize(file_path), time.time()))
+            return cursor.lastrowid
+
+    def claim(self):
+        """
+        Marks the oldest due pending upload as active and returns it.
+
+        Returns
+        -------
+        dict or None
+            The upload, or None if nothing is due.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT * FROM uploads WHERE status = ? AND next_attempt <= ? ORDER BY id LIMIT 1',
+                (self.PENDING, time.time())).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE uploads SET status = ?, attempts = attempts + 1 WHERE id = ?',
+                                     (self.ACTIVE, row['id']))
+            job = dict(row)
+            job['params'] = json.loads(job['params'])
+            job['attempts'] += 1
+            return job
+
+    def report_progress(self, upload_id, bytes_sent):
+        """
+        Records how many bytes of a running upload have been sent.
+
+        Progress is only kept in memory: it is reported for every chunk, and an
+        interrupted upload starts over from the first byte anyway.
+        """
+        with self._lock:
+            self._progress[upload_id] = bytes_sent
+
+    def complete(self, upload_id):
+        """Marks an upload as done and removes its file if it was spooled."""
+        with self._lock:
+            self._progress.pop(upload_id, None)
+            row = self._connection.execute('SELECT file_path, delete_after FROM uploads WHERE id = ?',
+                                           (upload_id,)).fetchone()
+            self._connection.execute('UPDATE uploads SET status = ?, bytes_sent = total_bytes, error = NULL'
+                                     ' WHERE id = ?', (self.DONE, upload_id))
+        if row is not None and row['delete_after'] and os.path.exists(row['file_path']):
+            os.remove(row['file_path'])
+
+    def fail(self, upload_id, error, retry_at=None):
+        """
+        Records a failed attempt.
+
+        Parameters
+        ----------
+        upload_id : int
+            The ID of the upload.
+        error : str
+            The error message.
+        retry_at : float, optional
+            The time of the next attempt. The upload is given up when omitted.
+        """
+        status = self.FAILED if retry_at is None else self.PENDING
+        with self._lock:
+            self._progress.pop(upload_id, None)
+            self._connection.execute('UPDATE uploads SET status = ?, error = ?, next_attempt = ?, bytes_sent = 0'
+                                     ' WHERE id = ?', (status, error, retry_at or 0, upload_id))
+
+    def retry_failed(self):
+        """Puts every failed upload back into the queue and returns how many there were."""
+        with self._lock:
+            return self._connection.execute('UPDATE uploads SET status = ?, attempts = 0, next_attempt = 0'
+                                            ' WHERE status = ?', (self.PENDING, self.FAILED)).rowcount
+
+    def get(self, upload_id):
+        """Returns an upload as a dict, with the bytes_sent of a running attempt, or None if it does not exist."""
+        with self._lock:
+            row = self._connection.execute('SELECT * FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+            if row is None:
+                return None
+            upload = dict(row)
+            upload['bytes_sent'] = self._progress.get(upload_id, upload['bytes_sent'])
+        return upload
+
+    def counts(self):
+        """Returns the number of uploads per status."""
+        with self._lock:
+            rows = self._connection.execute('SELECT status, COUNT(*) FROM uploads GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class UploadWorker:
+    """
+    Drains an UploadQueue in the background with bounded concurrency.
+
+    Files are streamed to the server in chunks so progress can be reported
+    while an upload runs. The inventory API accepts an upload only as a single
+    request, so an interrupted transfer is resumed by sending the file again;
+    the queue guarantees it is never lost.
+
+    Attributes
+    ----------
+    rest : Rest
+        The client used for the uploads.
+    queue : UploadQueue
+        The queue being drained.
+    progress_callback : callable or None
+        Called as progress_callback(upload_id, bytes_sent, total_bytes) from a
+        worker thread; GUI code has to hand the values over to the Tk thread.
+    """
+
+    def __init__(self, rest, queue, max_concurrency=2, chunk_size=64 * 1024, max_attempts=5,
+                 backoff=2.0, max_backoff=300.0, poll_interval=1.0, progress_callback=None):
+        """
+        Initializes the worker; call start() to begin draining.
+
+        Parameters
+        ----------
+        rest : Rest
+            The client used for the uploads.
+        queue : UploadQueue
+            The queue to drain.
+        max_concurrency : int, optional
+            The number of uploads running at the same time. Defaults to 2.
+        chunk_size : int, optional
+            The number of bytes read and sent per chunk. Defaults to 64 KiB.
+        max_attempts : int, optional
+            How often an upload is tried before it is marked failed. Defaults to 5. Client
+            errors, which RestError.retryable rules out, fail at the first attempt.
+        backoff : float, optional
+            The delay in seconds before the first retry; it doubles each attempt. Defaults to 2.
+        max_backoff : float, optional
+            The longest delay between retries in seconds. Defaults to 300.
+        poll_interval : float, optional
+            Seconds an idle worker waits before looking for new uploads. Defaults to 1.
+        progress_callback : callable, optional
+            Called as progress_callback(upload_id, bytes_sent, total_bytes).
+        """
+        self.rest = rest
+        self.queue = queue
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.progress_callback = progress_callback
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Starts the worker threads."""
+        self._stopping.clear()
+        for index in range(self.max_concurrency):
+            thread = threading.Thread(target=self._run, name=f'upload-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stops the worker threads after their current upload."""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wakes idle workers after new uploads were queued."""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self.process(job)
+
+    def _read_chunks(self, job):
+        sent = 0
+        with open(job['file_path'], 'rb') as file:
+            while True:
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    break
+                sent += len(chunk)
+                yield chunk
+                self.queue.report_progress(job['id'], sent)
+                if self.progress_callback is not None:
+                    self.progress_callback(job['id'], sent, job['total_bytes'])
+
+    def process(self, job):
+        """
+        Uploads a single claimed job and records the outcome.
+
+        Parameters
+        ----------
+        job : dict
+            An upload returned by UploadQueue.claim().
+
+        Returns
+        -------
+        dict or str
+            The response JSON if the upload succeeded, otherwise an error message.
+        """
+        if not os.path.isfile(job['file_path']):
+            result = f"Error: The file {job['file_path']} does not exist."
+            self.queue.fail(job['id'], result)
+            return result
+        try:
+            result = self.rest.upload_stream(job['item_id'], self._read_chunks(job), job['file_name'],
+                                             job['endpoint'], params=job['params'], file_type=job['file_type'])
+        except Exception as e:
+            result = f"Error - upload {job['id']}: {e}"
+
+        if isinstance(result, str):
+            # A RestError without retryable, e.g. 400 or 413, would fail the same way every time
+            if job['attempts'] >= self.max_attempts or not getattr(result, 'retryable', True):
+                self.queue.fail(job['id'], result)
+            else:
+                delay = min(self.backoff * 2 ** (job['attempts'] - 1), self.max_backoff)
+                self.queue.fail(job['id'], result, retry_at=time.time() + delay)
+        else:
+            self.queue.complete(job['id'])
+        return result